@@ -0,0 +1,489 @@
+"""Prebuilt, precompressed static assets.
+
+    python -m app.assets [--check]
+
+Builds ``static/dist/app.<hash>.css`` from ``static/styles.css`` plus the
+utility classes the templates actually use (a Tailwind-compatible subset
+with the brand colours, see ``COLORS``), minified, with ``.gz`` and ``.br``
+(when the ``brotli`` package is installed) variants next to it, and records
+the hashed name in ``static/dist/manifest.json``. Templates link it through
+``asset_url('app.css')``. Re-run after changing templates or styles.css;
+``--check`` only reports whether the committed build is up to date.
+
+``PrecompressedStaticFiles`` serves hashed files with an immutable one-year
+cache and picks the ``.br`` / ``.gz`` variant the client accepts; other
+static files are revalidated on every use (``no-cache`` + ETag).
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are built / served
+    brotli = None
+
+
+BASE_DIR = Path(__file__).resolve().parent
+TEMPLATES_DIR = BASE_DIR / "templates"
+STATIC_DIR = BASE_DIR / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST = DIST_DIR / "manifest.json"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+_HASHED = re.compile(r"\.[0-9a-f]{10}\.[a-z0-9]+$")
+
+
+# --- Utility CSS --------------------------------------------------------------
+
+COLORS = {
+    "white": "#fff",
+    "black": "#000",
+    "brand": "#1781ea",
+    "brand2": "#1059a8",
+}
+_PALETTE = {
+    "gray": "f9fafb f3f4f6 e5e7eb d1d5db 9ca3af 6b7280 4b5563 374151 1f2937 111827",
+    "red": "fef2f2 fee2e2 fecaca fca5a5 f87171 ef4444 dc2626 b91c1c 991b1b 7f1d1d",
+    "amber": "fffbeb fef3c7 fde68a fcd34d fbbf24 f59e0b d97706 b45309 92400e 78350f",
+    "green": "f0fdf4 dcfce7 bbf7d0 86efac 4ade80 22c55e 16a34a 15803d 166534 14532d",
+    "emerald": "ecfdf5 d1fae5 a7f3d0 6ee7b7 34d399 10b981 059669 047857 065f46 064e3b",
+    "sky": "f0f9ff e0f2fe bae6fd 7dd3fc 38bdf8 0ea5e9 0284c7 0369a1 075985 0c4a6e",
+    "blue": "eff6ff dbeafe bfdbfe 93c5fd 60a5fa 3b82f6 2563eb 1d4ed8 1e40af 1e3a8a",
+    "violet": "f5f3ff ede9fe ddd6fe c4b5fd a78bfa 8b5cf6 7c3aed 6d28d9 5b21b6 4c1d95",
+}
+for _name, _hexes in _PALETTE.items():
+    for _shade, _hex in zip((50, 100, 200, 300, 400, 500, 600, 700, 800, 900), _hexes.split()):
+        COLORS[f"{_name}-{_shade}"] = "#" + _hex
+
+SCREENS = {"sm": "640px", "md": "768px", "lg": "1024px", "xl": "1280px"}
+PSEUDO = {"hover": ":hover", "focus": ":focus", "focus-within": ":focus-within", "active": ":active"}
+
+FONT_SIZES = {
+    "xs": (".75rem", "1rem"),
+    "sm": (".875rem", "1.25rem"),
+    "base": ("1rem", "1.5rem"),
+    "lg": ("1.125rem", "1.75rem"),
+    "xl": ("1.25rem", "1.75rem"),
+    "2xl": ("1.5rem", "2rem"),
+    "3xl": ("1.875rem", "2.25rem"),
+}
+FONT_WEIGHTS = {"normal": "400", "medium": "500", "semibold": "600", "bold": "700"}
+MONO = 'ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,"Liberation Mono","Courier New",monospace'
+RADII = {"": ".25rem", "sm": ".125rem", "md": ".375rem", "lg": ".5rem", "xl": ".75rem", "2xl": "1rem", "full": "9999px"}
+MAX_W = {"sm": "24rem", "md": "28rem", "lg": "32rem", "xl": "36rem", "2xl": "42rem", "3xl": "48rem", "4xl": "56rem", "full": "100%"}
+SHADOWS = {
+    "sm": "0 1px 2px 0 rgb(0 0 0/.05)",
+    "": "0 1px 3px 0 rgb(0 0 0/.1),0 1px 2px -1px rgb(0 0 0/.1)",
+    "md": "0 4px 6px -1px rgb(0 0 0/.1),0 2px 4px -2px rgb(0 0 0/.1)",
+    "lg": "0 10px 15px -3px rgb(0 0 0/.1),0 4px 6px -4px rgb(0 0 0/.1)",
+}
+DISPLAY = {
+    "block": "block", "inline-block": "inline-block", "inline": "inline", "flex": "flex",
+    "inline-flex": "inline-flex", "grid": "grid", "table": "table", "hidden": "none",
+}
+STATIC = {
+    "static": "position:static", "relative": "position:relative", "absolute": "position:absolute",
+    "fixed": "position:fixed", "sticky": "position:sticky",
+    "flex-1": "flex:1 1 0%", "flex-auto": "flex:1 1 auto", "flex-none": "flex:none",
+    "shrink-0": "flex-shrink:0", "grow": "flex-grow:1",
+    "flex-row": "flex-direction:row", "flex-col": "flex-direction:column", "flex-wrap": "flex-wrap:wrap",
+    "items-start": "align-items:flex-start", "items-center": "align-items:center", "items-end": "align-items:flex-end",
+    "justify-start": "justify-content:flex-start", "justify-center": "justify-content:center",
+    "justify-end": "justify-content:flex-end", "justify-between": "justify-content:space-between",
+    "list-none": "list-style-type:none", "cursor-pointer": "cursor:pointer",
+    "overflow-hidden": "overflow:hidden", "overflow-auto": "overflow:auto", "overflow-x-auto": "overflow-x:auto",
+    "truncate": "overflow:hidden;text-overflow:ellipsis;white-space:nowrap",
+    "whitespace-nowrap": "white-space:nowrap", "whitespace-pre-wrap": "white-space:pre-wrap",
+    "break-words": "overflow-wrap:break-word",
+    "align-top": "vertical-align:top", "align-middle": "vertical-align:middle",
+    "text-left": "text-align:left", "text-center": "text-align:center", "text-right": "text-align:right",
+    "font-mono": f"font-family:{MONO}", "tabular-nums": "font-variant-numeric:tabular-nums",
+    "underline": "text-decoration-line:underline", "no-underline": "text-decoration-line:none",
+    "min-h-screen": "min-height:100vh", "w-full": "width:100%", "h-full": "height:100%",
+    "mx-auto": "margin-left:auto;margin-right:auto",
+}
+
+# Emission order, mirroring Tailwind's core plugin order so later groups win on conflicts.
+ORDER = [
+    "position", "inset", "z", "col", "margin", "line-clamp", "display", "height", "min-height", "width",
+    "max-width", "flex", "cursor", "list", "grid-cols", "flex-layout", "gap", "space", "overflow",
+    "whitespace", "rounded", "border-width", "border-color", "bg", "padding", "text-align", "align",
+    "font-family", "font-size", "font-weight", "numeric", "leading", "text-color", "decoration",
+    "opacity", "shadow", "ring",
+]
+_STATIC_GROUP = {
+    "position": ("static", "relative", "absolute", "fixed", "sticky"),
+    "flex": ("flex-1", "flex-auto", "flex-none", "shrink-0", "grow"),
+    "flex-layout": (
+        "flex-row", "flex-col", "flex-wrap", "items-start", "items-center", "items-end",
+        "justify-start", "justify-center", "justify-end", "justify-between",
+    ),
+    "list": ("list-none",), "cursor": ("cursor-pointer",),
+    "overflow": ("overflow-hidden", "overflow-auto", "overflow-x-auto", "truncate"),
+    "whitespace": ("whitespace-nowrap", "whitespace-pre-wrap", "break-words"),
+    "align": ("align-top", "align-middle"),
+    "text-align": ("text-left", "text-center", "text-right"),
+    "font-family": ("font-mono",), "numeric": ("tabular-nums",),
+    "decoration": ("underline", "no-underline"),
+    "min-height": ("min-h-screen",), "width": ("w-full",), "height": ("h-full",), "margin": ("mx-auto",),
+}
+_GROUP_OF = {name: group for group, names in _STATIC_GROUP.items() for name in names}
+
+_SIDES = {"": ("",), "x": ("-left", "-right"), "y": ("-top", "-bottom"), "t": ("-top",), "r": ("-right",), "b": ("-bottom",), "l": ("-left",)}
+_SIDE_RANK = {"": 0, "x": 1, "y": 1, "t": 2, "r": 2, "b": 2, "l": 2}
+
+
+def _space(v: str) -> Optional[str]:
+    """Tailwind spacing scale: 1 = .25rem, ``px``, ``0.5`` ..."""
+    if v == "px":
+        return "1px"
+    if v == "0":
+        return "0px"
+    try:
+        n = float(v)
+    except ValueError:
+        return None
+    if n < 0 or n * 4 != int(n * 4):
+        return None
+    return f"{n / 4:g}rem".lstrip("0") if n < 4 else f"{n / 4:g}rem"
+
+
+def _arbitrary(v: str) -> Optional[str]:
+    m = re.fullmatch(r"\[([#.%\w(),-]+)\]", v)
+    return m.group(1).replace("_", " ") if m else None
+
+
+def utility(name: str) -> Optional[tuple[str, int, str]]:
+    """``(group, rank, declarations)`` for a base utility class, or None if unknown."""
+    if name in DISPLAY:
+        return "display", 0, f"display:{DISPLAY[name]}"
+    if name in STATIC:
+        return _GROUP_OF.get(name, "display"), 0, STATIC[name]
+    neg = name.startswith("-")
+    body = name[1:] if neg else name
+
+    m = re.fullmatch(r"(m|p)([xytrbl]?)-(.+)", body)
+    if m:
+        kind, side, v = m.groups()
+        size = _space(v) or _arbitrary(v)
+        if size is None or (neg and kind == "p"):
+            return None
+        prop = "margin" if kind == "m" else "padding"
+        size = f"-{size}" if neg else size
+        return prop, _SIDE_RANK[side], ";".join(f"{prop}{s}:{size}" for s in _SIDES[side])
+    if neg:
+        return None
+    m = re.fullmatch(r"(top|right|bottom|left|inset)-(.+)", body)
+    if m:
+        size = _space(m.group(2)) or ("100%" if m.group(2) == "full" else None)
+        if size is None:
+            return None
+        props = ("top", "right", "bottom", "left") if m.group(1) == "inset" else (m.group(1),)
+        return "inset", 0 if m.group(1) == "inset" else 1, ";".join(f"{p}:{size}" for p in props)
+    m = re.fullmatch(r"z-(\d+)", body)
+    if m:
+        return "z", 0, f"z-index:{m.group(1)}"
+    m = re.fullmatch(r"col-span-(\d+|full)", body)
+    if m:
+        v = m.group(1)
+        return "col", 0, "grid-column:1/-1" if v == "full" else f"grid-column:span {v}/span {v}"
+    m = re.fullmatch(r"col-start-(\d+)", body)
+    if m:
+        return "col", 1, f"grid-column-start:{m.group(1)}"
+    m = re.fullmatch(r"grid-cols-(\d+)", body)
+    if m:
+        return "grid-cols", 0, f"grid-template-columns:repeat({m.group(1)},minmax(0,1fr))"
+    m = re.fullmatch(r"line-clamp-(\d+)", body)
+    if m:
+        return "line-clamp", 0, f"overflow:hidden;display:-webkit-box;-webkit-box-orient:vertical;-webkit-line-clamp:{m.group(1)}"
+    m = re.fullmatch(r"(w|h)-(.+)", body)
+    if m:
+        size = _space(m.group(2)) or _arbitrary(m.group(2))
+        if size is None:
+            return None
+        return ("width", 1, f"width:{size}") if m.group(1) == "w" else ("height", 1, f"height:{size}")
+    m = re.fullmatch(r"max-w-(.+)", body)
+    if m and m.group(1) in MAX_W:
+        return "max-width", 0, f"max-width:{MAX_W[m.group(1)]}"
+    m = re.fullmatch(r"gap-([xy]-)?(.+)", body)
+    if m:
+        size = _space(m.group(2))
+        if size is None:
+            return None
+        prop = {"x-": "column-gap", "y-": "row-gap"}.get(m.group(1) or "", "gap")
+        return "gap", 0 if prop == "gap" else 1, f"{prop}:{size}"
+    m = re.fullmatch(r"space-([xy])-(.+)", body)
+    if m:
+        size = _space(m.group(2))
+        if size is None:
+            return None
+        prop = "margin-top" if m.group(1) == "y" else "margin-left"
+        return "space", 0, f"&>:not([hidden])~:not([hidden]){{{prop}:{size}}}"
+    m = re.fullmatch(r"rounded(?:-(.+))?", body)
+    if m and (m.group(1) or "") in RADII:
+        return "rounded", 0, f"border-radius:{RADII[m.group(1) or '']}"
+    m = re.fullmatch(r"border(?:-([xytrbl]))?(?:-(\d+))?", body)
+    if m:
+        side, width = m.group(1) or "", m.group(2) or "1"
+        return "border-width", _SIDE_RANK[side], ";".join(f"border{s}-width:{width}px" for s in _SIDES[side])
+    m = re.fullmatch(r"(bg|text|border|ring)-(.+)", body)
+    if m:
+        kind, v = m.groups()
+        if kind == "text" and v in FONT_SIZES:
+            size, leading = FONT_SIZES[v]
+            return "font-size", 0, f"font-size:{size};line-height:{leading}"
+        if kind == "text" and _arbitrary(v) and not _arbitrary(v).startswith("#"):
+            return "font-size", 0, f"font-size:{_arbitrary(v)}"
+        color = COLORS.get(v) or (_arbitrary(v) if (_arbitrary(v) or "").startswith("#") else None)
+        if color is None:
+            return None
+        return {
+            "bg": ("bg", 0, f"background-color:{color}"),
+            "text": ("text-color", 0, f"color:{color}"),
+            "border": ("border-color", 0, f"border-color:{color}"),
+            "ring": ("ring", 0, f"--tw-ring-color:{color}"),
+        }[kind]
+    m = re.fullmatch(r"font-(\w+)", body)
+    if m and m.group(1) in FONT_WEIGHTS:
+        return "font-weight", 0, f"font-weight:{FONT_WEIGHTS[m.group(1)]}"
+    m = re.fullmatch(r"leading-(\d+|none|tight|snug|normal|relaxed)", body)
+    if m:
+        v = m.group(1)
+        named = {"none": "1", "tight": "1.25", "snug": "1.375", "normal": "1.5", "relaxed": "1.625"}
+        return "leading", 0, f"line-height:{named.get(v) or _space(v)}"
+    m = re.fullmatch(r"opacity-(\d+)", body)
+    if m and int(m.group(1)) <= 100:
+        return "opacity", 0, f"opacity:{int(m.group(1)) / 100:g}"
+    m = re.fullmatch(r"shadow(?:-(.+))?", body)
+    if m and (m.group(1) or "") in SHADOWS:
+        return "shadow", 0, f"box-shadow:{SHADOWS[m.group(1) or '']}"
+    return None
+
+
+def _escape(cls: str) -> str:
+    return re.sub(r"([^\w-])", r"\\\1", cls)
+
+
+def _rule(selector: str, decls: str) -> str:
+    if decls.startswith("&"):
+        inner, rest = decls[1:].split("{", 1)
+        return f"{selector}{inner}{{{rest}"
+    return f"{selector}{{{decls}}}"
+
+
+def candidates(text: str) -> set[str]:
+    """Every class-like token in a template, like Tailwind's content scanner."""
+    return set(re.findall(r"[^<>\"'`\s{}()=,|]*[^<>\"'`\s{}()=,|:.]", text))
+
+
+def build_css(classes: set[str]) -> str:
+    """CSS for the known utilities in ``classes``: base rules first, then pseudo, then per breakpoint."""
+    base: list[tuple[int, int, str, str]] = []
+    screens: dict[str, list[tuple[int, int, str, str]]] = {s: [] for s in SCREENS}
+    for cls in classes:
+        *variants, name = cls.split(":")
+        if len(variants) > 2:
+            continue
+        screen = next((v for v in variants if v in SCREENS), None)
+        pseudo = [v for v in variants if v != screen]
+        if len(pseudo) > 1 or (pseudo and pseudo[0] not in PSEUDO):
+            continue
+        u = utility(name)
+        if u is None:
+            continue
+        group, rank, decls = u
+        selector = "." + _escape(cls) + (PSEUDO[pseudo[0]] if pseudo else "")
+        item = (ORDER.index(group), rank + (10 if pseudo else 0), selector, decls)
+        (screens[screen] if screen else base).append(item)
+    out = [_rule(sel, decls) for _, _, sel, decls in sorted(base)]
+    for screen, items in screens.items():
+        if items:
+            rules = "".join(_rule(sel, decls) for _, _, sel, decls in sorted(items))
+            out.append(f"@media (min-width:{SCREENS[screen]}){{{rules}}}")
+    return "".join(out)
+
+
+# condensed Tailwind preflight (what the CDN build injected before the utilities)
+PREFLIGHT = """
+*,::before,::after{box-sizing:border-box;border:0 solid #e5e7eb}
+html{line-height:1.5;-webkit-text-size-adjust:100%;tab-size:4;font-family:ui-sans-serif,system-ui,sans-serif,"Apple Color Emoji","Segoe UI Emoji","Segoe UI Symbol","Noto Color Emoji"}
+body{margin:0;line-height:inherit}
+hr{height:0;color:inherit;border-top-width:1px}
+h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}
+a{color:inherit;text-decoration:inherit}
+b,strong{font-weight:bolder}
+code,kbd,samp,pre{font-family:{mono};font-size:1em}
+small{font-size:80%}
+table{text-indent:0;border-color:inherit;border-collapse:collapse}
+button,input,optgroup,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;line-height:inherit;color:inherit;margin:0;padding:0}
+button,select{text-transform:none}
+button,[type=button],[type=reset],[type=submit]{-webkit-appearance:button;background-color:transparent;background-image:none}
+summary{display:list-item}
+blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}
+fieldset{margin:0;padding:0}
+legend{padding:0}
+ol,ul,menu{list-style:none;margin:0;padding:0}
+textarea{resize:vertical}
+input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}
+button,[role=button]{cursor:pointer}
+img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}
+img,video{max-width:100%;height:auto}
+[hidden]{display:none}
+""".replace("{mono}", MONO)
+
+
+def minify(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>~])\s*", r"\1", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+# --- Build -------------------------------------------------------------------
+
+def _sources() -> tuple[str, set[str]]:
+    classes: set[str] = set()
+    for path in sorted(TEMPLATES_DIR.glob("**/*.html")):
+        classes |= candidates(path.read_text(encoding="utf-8"))
+    legacy = (STATIC_DIR / "styles.css").read_text(encoding="utf-8") if (STATIC_DIR / "styles.css").exists() else ""
+    return legacy, classes
+
+
+def render() -> str:
+    """The minified stylesheet for the current templates."""
+    legacy, classes = _sources()
+    return minify(legacy) + minify(PREFLIGHT) + build_css(classes)
+
+
+def _write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build(dist: Path = DIST_DIR) -> dict[str, str]:
+    """Write hashed, precompressed assets and the manifest; returns the manifest."""
+    data = render().encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    name = f"app.{digest}.css"
+    dist.mkdir(parents=True, exist_ok=True)
+    _write(dist / name, data)
+    _write(dist / (name + ".gz"), gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(dist / (name + ".br"), brotli.compress(data, quality=11))
+    manifest = {"app.css": f"dist/{name}"}
+    keep = {name, name + ".gz", name + ".br", MANIFEST.name}
+    for old in dist.iterdir():
+        if old.name not in keep and _HASHED.search(old.name.removesuffix(".gz").removesuffix(".br")):
+            old.unlink()
+    _write(dist / MANIFEST.name, (json.dumps(manifest, indent=2) + "\n").encode("utf-8"))
+    _manifest_cache.clear()
+    return manifest
+
+
+_manifest_cache: dict[str, tuple[float, dict]] = {}
+
+
+def _manifest() -> dict:
+    try:
+        mtime = MANIFEST.stat().st_mtime
+    except OSError:
+        return {}
+    cached = _manifest_cache.get("m")
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        data = json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = {}
+    _manifest_cache["m"] = (mtime, data)
+    return data
+
+
+def asset_url(name: str) -> str:
+    """URL of the built (hashed) asset ``name``; unbuilt names are served as-is from /static."""
+    return "/static/" + _manifest().get(name, name)
+
+
+# --- Serving -----------------------------------------------------------------
+
+def _accepts(header: str, coding: str) -> bool:
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() != coding:
+            continue
+        m = re.search(r"q=([0-9.]+)", params)
+        return not m or float(m.group(1)) > 0
+    return False
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves ``.br`` / ``.gz`` siblings and caches hashed files forever."""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        path = str(full_path)
+        hashed = bool(_HASHED.search(os.path.basename(path)))
+        response: Optional[Response] = None
+        if hashed:
+            accept = request_headers.get("accept-encoding", "")
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            for coding, ext in (("br", ".br"), ("gzip", ".gz")):
+                if _accepts(accept, coding):
+                    try:
+                        variant = os.stat(path + ext)
+                    except OSError:
+                        continue
+                    response = FileResponse(path + ext, status_code=status_code, stat_result=variant, media_type=media_type)
+                    response.headers["content-encoding"] = coding
+                    break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        if hashed:
+            response.headers["cache-control"] = IMMUTABLE
+            response.headers["vary"] = "Accept-Encoding"
+        else:
+            response.headers["cache-control"] = "no-cache"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--check", action="store_true", help="exit 1 if the built CSS is missing or stale")
+    args = ap.parse_args(argv)
+    if args.check:
+        data = render().encode("utf-8")
+        name = f"dist/app.{hashlib.sha256(data).hexdigest()[:10]}.css"
+        ok = _manifest().get("app.css") == name and (STATIC_DIR / name).exists()
+        print("up to date" if ok else f"stale: run python -m app.assets (expected {name})")
+        return 0 if ok else 1
+    manifest = build()
+    path = STATIC_DIR / manifest["app.css"]
+    sizes = [f"{path.name} {path.stat().st_size}B"]
+    for ext in (".gz", ".br"):
+        if path.with_name(path.name + ext).exists():
+            sizes.append(f"{ext} {path.with_name(path.name + ext).stat().st_size}B")
+    print(", ".join(sizes) + ("" if brotli is not None else " (brotli not installed: no .br)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,27 @@
+import asyncio
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Optional
 
 from fastapi import Depends, HTTPException, Request, status
-from itsdangerous import BadSignature, Signer
 from passlib.context import CryptContext
-from sqlalchemy import select
-from sqlalchemy.orm import Session
 
-from .db import get_session
+from . import metrics
+from .db import SessionLocal
 from .models import User
 
 
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
 # Use PBKDF2-SHA256 to avoid platform-specific bcrypt issues/warnings.
 # You can later add "bcrypt" to schemes for backward-compat if needed.
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
@@ -24,18 +35,160 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
-def get_current_user(
-    request: Request, db: Session = Depends(get_session)
-) -> Optional[User]:
+# --- Password hashing pool ---
+# PBKDF2 is deliberately slow; keep it off the event loop and bound the backlog
+# so a login burst degrades into fast 503s instead of a frozen server.
+class HashingOverloaded(Exception):
+    pass
+
+
+HASH_WORKERS = max(1, _int_env("SYNO_HASH_WORKERS", 2))
+HASH_QUEUE_MAX = max(0, _int_env("SYNO_HASH_QUEUE_MAX", 32))
+
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="syno-hash")
+_hash_pending = 0
+
+HASH_QUEUE_DEPTH = metrics.gauge("syno_hash_queue_depth", "Password hash jobs waiting or running")
+HASH_REJECTED = metrics.counter("syno_hash_rejected_total", "Password hash jobs rejected (pool full)", ["op"])
+HASH_SECONDS = metrics.histogram("syno_hash_seconds", "Password hash job latency incl. queueing", ["op"])
+
+
+async def _run_hashing(op: str, fn, *args):
+    global _hash_pending
+    if _hash_pending >= HASH_WORKERS + HASH_QUEUE_MAX:
+        HASH_REJECTED.inc(op=op)
+        raise HashingOverloaded(op)
+    _hash_pending += 1
+    HASH_QUEUE_DEPTH.set(_hash_pending)
+    t0 = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+        HASH_QUEUE_DEPTH.set(_hash_pending)
+        HASH_SECONDS.observe(time.perf_counter() - t0, op=op)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing("hash", hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await _run_hashing("verify", verify_password, password, password_hash)
+
+
+def hash_pool_stats() -> dict:
+    return {
+        "workers": HASH_WORKERS,
+        "queue_max": HASH_QUEUE_MAX,
+        "pending": _hash_pending,
+        "rejected": int(sum(v for _, v in HASH_REJECTED.samples())),
+    }
+
+
+# --- Identity cache ---
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only view of the logged-in user, safe to share across requests.
+
+    Handlers that need to write must load the ORM row with ``db.get(User, user.id)``.
+    """
+
+    id: int
+    username: str
+    prompt_preset: Optional[str]
+    is_admin: bool
+
+
+def _parse_admin_users() -> frozenset[str]:
+    admins = os.getenv("SYNO_ADMIN_USERS", "").split(",")
+    return frozenset(a.strip() for a in admins if a.strip())
+
+
+_ADMIN_USERS: frozenset[str] = _parse_admin_users()
+
+
+class IdentityCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._items: OrderedDict[int, tuple[float, UserSnapshot]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        with self._lock:
+            hit = self._items.get(user_id)
+            if not hit:
+                return None
+            expires, snap = hit
+            if expires < time.monotonic():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return snap
+
+    def put(self, snap: UserSnapshot) -> None:
+        with self._lock:
+            self._items[snap.id] = (time.monotonic() + self.ttl, snap)
+            self._items.move_to_end(snap.id)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+identity_cache = IdentityCache(
+    max_entries=_int_env("SYNO_IDENTITY_CACHE_SIZE", 1024),
+    ttl=float(_int_env("SYNO_IDENTITY_TTL", 60)),
+)
+
+
+def load_admin_users() -> frozenset[str]:
+    """(Re)read SYNO_ADMIN_USERS; called once at startup."""
+    global _ADMIN_USERS
+    _ADMIN_USERS = _parse_admin_users()
+    identity_cache.clear()
+    return _ADMIN_USERS
+
+
+def invalidate_user(user_id: int) -> None:
+    identity_cache.invalidate(int(user_id))
+
+
+def snapshot_user(user: User) -> UserSnapshot:
+    snap = UserSnapshot(
+        id=int(user.id),
+        username=user.username,
+        prompt_preset=user.prompt_preset,
+        is_admin=is_admin_username(user.username),
+    )
+    identity_cache.put(snap)
+    return snap
+
+
+def get_current_user(request: Request) -> Optional[UserSnapshot]:
     user_id = request.session.get("user_id")
     if not user_id:
         return None
-    user = db.get(User, int(user_id))
-    return user
+    snap = identity_cache.get(int(user_id))
+    if snap is not None:
+        return snap
+    db = SessionLocal()
+    try:
+        user = db.get(User, int(user_id))
+        return snapshot_user(user) if user else None
+    finally:
+        db.close()
 
 
 def require_user(
-    user: Optional[User] = Depends(get_current_user),
+    user: Optional[UserSnapshot] = Depends(get_current_user),
 ):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
@@ -43,18 +196,16 @@ def require_user(
 
 
 def is_admin_username(username: str) -> bool:
-    admins = os.getenv("SYNO_ADMIN_USERS", "").split(",")
-    admins = [a.strip() for a in admins if a.strip()]
-    return username in admins
+    return username in _ADMIN_USERS
 
 
-def get_is_admin(user: Optional[User] = Depends(get_current_user)) -> bool:
+def get_is_admin(user: Optional[UserSnapshot] = Depends(get_current_user)) -> bool:
     if not user:
         return False
-    return is_admin_username(user.username)
+    return user.is_admin
 
 
-def require_admin(user: Optional[User] = Depends(get_current_user)):
-    if not user or not is_admin_username(user.username):
+def require_admin(user: Optional[UserSnapshot] = Depends(get_current_user)):
+    if not user or not user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
     return user
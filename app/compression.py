@@ -0,0 +1,145 @@
+"""Response compression negotiated per request (brotli, then gzip).
+
+Compresses text-like responses (HTML, CSS, JS, JSON, XML, SVG, plain text)
+of at least SYNO_COMPRESS_MIN_BYTES (default 1024) when the client accepts
+it; brotli needs the optional ``brotli`` package. Streamed bodies are
+compressed chunk by chunk with a sync flush after each one, so every chunk
+the app sends still reaches the client immediately. Responses that already
+carry a Content-Encoding (precompressed static files) pass through.
+SYNO_COMPRESS=0 disables it.
+"""
+from __future__ import annotations
+
+import os
+import re
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+_COMPRESSIBLE = re.compile(r"^(text/(?!event-stream)|application/(json|javascript|xml|xhtml\+xml|[\w.+-]*\+json)|image/svg\+xml)")
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _bool_env(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0") in ("1", "true", "True", "yes", "on")
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The preferred coding we support (``br`` > ``gzip``) with a non-zero q, or None."""
+    offered: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        m = re.search(r"q=([0-9.]+)", params)
+        try:
+            offered[token.strip()] = float(m.group(1)) if m else 1.0
+        except ValueError:
+            continue
+    for coding in (("br",) if brotli is not None else ()) + ("gzip",):
+        q = offered[coding] if coding in offered else offered.get("*", 0.0)
+        if q > 0:
+            return coding
+    return None
+
+
+class _Encoder:
+    def __init__(self, coding: str, gzip_level: int, br_quality: int) -> None:
+        self.coding = coding
+        if coding == "br":
+            self._br = brotli.Compressor(quality=br_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        if self.coding == "br":
+            out = self._br.process(data)
+            return out + (self._br.finish() if last else self._br.flush())
+        out = self._gz.compress(data)
+        return out + self._gz.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Pure ASGI gzip/brotli with a size threshold and per-chunk flushing."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        gzip_level: int = 6,
+        br_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.enabled = _bool_env("SYNO_COMPRESS", True)
+        self.minimum_size = _int_env("SYNO_COMPRESS_MIN_BYTES", 1024) if minimum_size is None else minimum_size
+        self.gzip_level = gzip_level
+        self.br_quality = br_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enabled or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                ctype = headers.get("content-type", "")
+                eligible = "content-encoding" not in headers and bool(_COMPRESSIBLE.match(ctype)) and message["status"] not in (204, 206, 304)
+                if eligible:
+                    headers.add_vary_header("Accept-Encoding")
+                passthrough = not eligible or int(headers.get("content-length") or self.minimum_size) < self.minimum_size
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message  # held until the first body tells us the size
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not more and len(body) < self.minimum_size:
+                    await send(start)
+                    start = None
+                    passthrough = True
+                    await send(message)
+                    return
+                encoder = _Encoder(coding, self.gzip_level, self.br_quality)
+                headers["Content-Encoding"] = coding
+                del headers["Content-Length"]
+                if not more:
+                    out = encoder.chunk(body, last=True)
+                    headers["Content-Length"] = str(len(out))
+                    await send(start)
+                    start = None
+                    await send({"type": "http.response.body", "body": out, "more_body": False})
+                    return
+                await send(start)
+                start = None
+            assert encoder is not None
+            await send({"type": "http.response.body", "body": encoder.chunk(body, last=not more), "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
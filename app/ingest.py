@@ -0,0 +1,283 @@
+"""Bulk question ingestion.
+
+    python -m app.ingest questions.jsonl [--batch 100] [--concurrency 8] [--author alice]
+
+Each input line is a JSON object with ``title`` and optional ``content``.
+The file is streamed; questions are inserted in batches and answers are
+generated under a global concurrency cap at ``backfill`` priority, so live
+traffic on the same process/provider keeps precedence.
+
+Progress is kept in a checkpoint file (default ``<input>.ckpt``): the
+number of input lines consumed plus the ids whose generation has not
+finished yet. Re-running the same command resumes from there without
+inserting duplicates; pending questions that already got answers are not
+generated again. Throughput (questions/min, LLM calls/min) is printed
+periodically and at the end.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Iterator, Optional
+
+from sqlalchemy import func
+
+from .db import SessionLocal, init_db
+from .models import Answer, Question, User
+from .services import scheduler
+from .services.generate import generate_for_question
+from .services.llm import LLM_CALLS
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class Checkpoint:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.line = 0
+        self.pending: set[int] = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.line = int(data.get("line", 0))
+            self.pending = {int(i) for i in data.get("pending", [])}
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"line": self.line, "pending": sorted(self.pending)}, f)
+        os.replace(tmp, self.path)
+
+
+def _llm_calls() -> int:
+    return int(sum(v for labels, v in LLM_CALLS.samples() if labels.get("outcome") != "cancelled"))
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.calls_at_start = _llm_calls()
+        self.inserted = 0
+        self.generated = 0
+        self.answers = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def line(self) -> str:
+        minutes = max(1e-9, (time.monotonic() - self.started) / 60.0)
+        calls = _llm_calls() - self.calls_at_start
+        return (
+            f"inserted={self.inserted} generated={self.generated} answers={self.answers} "
+            f"failed={self.failed} skipped={self.skipped} "
+            f"| {self.generated / minutes:.1f} questions/min, {calls / minutes:.1f} LLM calls/min"
+        )
+
+
+def _read(path: str, start: int) -> Iterator[tuple[int, Optional[dict]]]:
+    """Yield (line number, parsed row or None) for lines after ``start``."""
+    with open(path, encoding="utf-8") as f:
+        for n, raw in enumerate(f, 1):
+            if n <= start:
+                continue
+            raw = raw.strip()
+            if not raw:
+                yield n, None
+                continue
+            try:
+                row = json.loads(raw)
+            except ValueError:
+                yield n, None
+                continue
+            yield n, row if isinstance(row, dict) and str(row.get("title") or "").strip() else None
+
+
+def _answer_counts(ids: list[int]) -> dict[int, int]:
+    if not ids:
+        return {}
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Answer.question_id, func.count(Answer.id))
+            .filter(Answer.question_id.in_(ids))
+            .group_by(Answer.question_id)
+            .all()
+        )
+        return {int(qid): int(n) for qid, n in rows}
+    finally:
+        db.close()
+
+
+def _insert(rows: list[dict], author_id: Optional[int]) -> list[int]:
+    db = SessionLocal()
+    try:
+        qs = [
+            Question(
+                title=str(r["title"]).strip()[:200],
+                content=(str(r["content"]).strip() or None) if r.get("content") else None,
+                author_id=author_id,
+            )
+            for r in rows
+        ]
+        db.add_all(qs)
+        db.commit()
+        return [q.id for q in qs]
+    finally:
+        db.close()
+
+
+async def ingest(
+    path: str,
+    batch: int = 100,
+    concurrency: int = 8,
+    checkpoint: Optional[str] = None,
+    author: Optional[str] = None,
+    generate: bool = True,
+    report_every: float = 10.0,
+) -> Stats:
+    init_db()
+    ckpt = Checkpoint(checkpoint or path + ".ckpt")
+    stats = Stats()
+    author_id = None
+    if author:
+        db = SessionLocal()
+        try:
+            u = db.query(User).filter(User.username == author).first()
+            if u is None:
+                raise SystemExit(f"unknown author: {author}")
+            author_id = u.id
+        finally:
+            db.close()
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+    running: set[asyncio.Task] = set()
+
+    async def gen(qid: int) -> None:
+        async with sem:
+            try:
+                await generate_for_question(qid, priority=scheduler.BACKFILL)
+            except Exception as e:
+                stats.failed += 1
+                print(f"question {qid}: generation failed: {e}", file=sys.stderr)
+            else:
+                # per-persona failures are swallowed by the job: count what was written
+                written = _answer_counts([qid]).get(qid, 0)
+                if written:
+                    stats.generated += 1
+                    stats.answers += written
+                else:
+                    stats.failed += 1
+                    print(f"question {qid}: no answers written", file=sys.stderr)
+        ckpt.pending.discard(qid)
+
+    def launch(ids: list[int]) -> None:
+        for qid in ids:
+            t = asyncio.ensure_future(gen(qid))
+            running.add(t)
+            t.add_done_callback(running.discard)
+
+    last_report = time.monotonic()
+
+    def maybe_report(force: bool = False) -> None:
+        nonlocal last_report
+        if force or time.monotonic() - last_report >= report_every:
+            ckpt.save()
+            print(stats.line(), flush=True)
+            last_report = time.monotonic()
+
+    try:
+        # finish what a previous run left behind
+        if generate and ckpt.pending:
+            # generated but not yet checkpointed when the last run stopped
+            answered = set(_answer_counts(sorted(ckpt.pending)))
+            ckpt.pending -= answered
+            print(
+                f"resuming {len(ckpt.pending)} pending generations from line {ckpt.line}"
+                f" ({len(answered)} already answered)",
+                flush=True,
+            )
+            launch(sorted(ckpt.pending))
+
+        rows: list[dict] = []
+        last_line = ckpt.line
+        for n, row in _read(path, ckpt.line):
+            last_line = n
+            if row is None:
+                stats.skipped += 1
+            else:
+                rows.append(row)
+            if len(rows) < batch:
+                continue
+            ids = _insert(rows, author_id)
+            stats.inserted += len(ids)
+            rows = []
+            ckpt.line = last_line
+            if generate:
+                ckpt.pending.update(ids)
+                launch(ids)
+            ckpt.save()
+            # backpressure: keep at most a couple of batches queued behind the cap
+            while generate and len(running) > max(batch, concurrency) * 2:
+                await asyncio.wait(set(running), return_when=asyncio.FIRST_COMPLETED)
+                maybe_report()
+            maybe_report()
+        if rows:
+            ids = _insert(rows, author_id)
+            stats.inserted += len(ids)
+            if generate:
+                ckpt.pending.update(ids)
+                launch(ids)
+        ckpt.line = last_line
+        ckpt.save()
+        while running:
+            await asyncio.wait(set(running), timeout=report_every)
+            maybe_report()
+    finally:
+        for t in running:
+            t.cancel()
+        ckpt.save()
+    maybe_report(force=True)
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.ingest", description="Bulk-import questions from JSONL")
+    ap.add_argument("path", help="JSONL file, one {\"title\", \"content\"} object per line")
+    ap.add_argument("--batch", type=int, default=100, help="questions per insert (default 100)")
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=_int_env("SYNO_INGEST_CONCURRENCY", 8),
+        help="questions generated at once (default SYNO_INGEST_CONCURRENCY or 8)",
+    )
+    ap.add_argument("--checkpoint", help="checkpoint file (default <path>.ckpt)")
+    ap.add_argument("--author", help="username to attribute the questions to")
+    ap.add_argument("--no-generate", action="store_true", help="insert only, skip answer generation")
+    ap.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(
+            ingest(
+                args.path,
+                batch=max(1, args.batch),
+                concurrency=args.concurrency,
+                checkpoint=args.checkpoint,
+                author=args.author,
+                generate=not args.no_generate,
+                report_every=args.report_every,
+            )
+        )
+    except KeyboardInterrupt:
+        print("interrupted; re-run the same command to resume", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
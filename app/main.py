@@ -1,43 +1,89 @@
-﻿import os
+﻿import hmac
+import os
+import uuid
 from datetime import datetime
 from pathlib import Path
 
 from fastapi import Depends, FastAPI, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from starlette.middleware.sessions import SessionMiddleware
-from .db import init_db
-from .auth import get_current_user, hash_password, verify_password, require_admin
+from .db import engine, init_db
+from .sessions import ServerSessionMiddleware, regenerate as regenerate_session, store as session_store
+from . import metrics
+from .profiling import SQLProfilerMiddleware, install as install_sql_profiler, registry as perf_registry
+from .assets import PrecompressedStaticFiles, asset_url
+from .compression import CompressionMiddleware
+from .rendering import flush, stream_template
+from .auth import (
+    HashingOverloaded,
+    get_current_user,
+    hash_password_async,
+    verify_password_async,
+    require_admin,
+    invalidate_user,
+    load_admin_users,
+    snapshot_user,
+)
 from .db import get_session
 from .models import User, Question, Answer, Vote, VoteTarget, Comment, Persona, PersonaHub
-from sqlalchemy.orm import Session
-from fastapi import BackgroundTasks
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
 from .services.generate import (
+    default_personas,
+    flight_key,
     generate_for_question,
     generate_user_personas_for_question,
     generate_comments_for_question,
+    regenerate_question,
+    regen_below,
+    regen_targets,
+    run_single_flight,
 )
+from .services.context import snippet_tokens
+from .services import idempotency, jobs, load, progress, quota, scheduler, scoring, tracing
 
 
 BASE_DIR = Path(__file__).resolve().parent
 TEMPLATES_DIR = BASE_DIR / "templates"
 STATIC_DIR = BASE_DIR / "static"
 
+NOTICES = {
+    "busy": "系统繁忙，暂不接受重新生成，请稍后再试。",
+    "rate": "操作过于频繁，请稍后再试。",
+    "quota": "今日生成额度已用完，明天再来吧。",
+    "nothing": "没有需要重新生成的答案。",
+}
+
+
+def _limited(url: str, e: quota.RateLimited) -> RedirectResponse:
+    sep = "&" if "?" in url else "?"
+    return RedirectResponse(url=f"{url}{sep}notice={e.reason}", status_code=302, headers={"Retry-After": str(e.retry_after)})
+
 
 def create_app() -> FastAPI:
     app = FastAPI(title="Syno", version="0.1.0")
 
     secret_key = os.getenv("SYNO_SECRET_KEY", "dev-secret-change-me")
-    app.add_middleware(SessionMiddleware, secret_key=secret_key)
-
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+    session_max_age = int(os.getenv("SYNO_SESSION_MAX_AGE", str(14 * 24 * 60 * 60)))
+    app.add_middleware(ServerSessionMiddleware, secret_key=secret_key, max_age=session_max_age)
+    # outermost, so session loading counts towards the request's DB time
+    app.add_middleware(SQLProfilerMiddleware)
+    # compress what the profiler and the app produced
+    app.add_middleware(CompressionMiddleware)
+    install_sql_profiler(engine)
+
+    app.mount("/static", PrecompressedStaticFiles(directory=str(STATIC_DIR)), name="static")
     templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+    templates.env.globals["asset_url"] = asset_url
+    templates.env.globals["flush"] = flush
 
     @app.on_event("startup")
     async def _startup() -> None:
         # Initialize database tables
         init_db()
+        session_store.purge_expired(session_max_age)
+        load_admin_users()
+        quota.load_tiers()
         # Purge legacy consensus data (feature removed)
         try:
             from .db import SessionLocal as _SL
@@ -77,7 +123,8 @@ def create_app() -> FastAPI:
             qs_sorted = [q for _, q in scores][:50]
         else:
             qs_sorted = qs[:50]
-        return templates.TemplateResponse(
+        return stream_template(
+            templates,
             "index.html",
             {"request": request, "questions": qs_sorted, "user": user},
         )
@@ -140,10 +187,10 @@ def create_app() -> FastAPI:
         src = None
         if pid:
             src = db.query(Persona).filter(Persona.id == pid, Persona.user_id == user.id).one_or_none()
-        pname = (name or (src.name if src else "鎴戠殑浜烘牸")).strip()[:50]
+        pname = (name or (src.name if src else "我的人格")).strip()[:50]
         pprompt = (prompt or (src.prompt if src else (user.prompt_preset or ""))).strip()
         if not pprompt:
-            pprompt = "锛堢┖锛?
+            pprompt = "（空）"
         hub = PersonaHub(source_user_id=user.id, name=pname, prompt=pprompt)
         db.add(hub)
         db.commit()
@@ -186,27 +233,54 @@ def create_app() -> FastAPI:
     @app.get("/ask", response_class=HTMLResponse)
     async def ask_get(request: Request, user=Depends(get_current_user)):
         cfg = request.session.get("llm_cfg") or {}
-        return templates.TemplateResponse("ask.html", {"request": request, "user": user, "llm_cfg": cfg})
+        return templates.TemplateResponse("ask.html", {"request": request, "user": user, "llm_cfg": cfg, "idem_key": uuid.uuid4().hex})
 
     @app.post("/ask")
     async def ask_post(
         request: Request,
-        background_tasks: BackgroundTasks,
         title: str = Form(...),
         content: str | None = Form(None),
+        idem_key: str | None = Form(None),
         db: Session = Depends(get_session),
         user=Depends(get_current_user),
     ):
+        # double-submits resolve to the question created by the first one
+        scope = f"u{user.id}" if user else f"ip:{request.client.host if request.client else '-'}"
+        keys = idempotency.submission_keys(scope, idem_key, title, content)
+        seen = idempotency.lookup(keys)
+        if seen is not None:
+            return RedirectResponse(url=f"/q/{seen}", status_code=302)
+        try:
+            ticket = quota.admit(user, request.client.host if request.client else None, "ask")
+        except quota.RateLimited as e:
+            cfg = request.session.get("llm_cfg") or {}
+            return templates.TemplateResponse(
+                "ask.html",
+                {"request": request, "user": user, "llm_cfg": cfg, "idem_key": idem_key or uuid.uuid4().hex, "error": NOTICES[e.reason]},
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)},
+            )
         q = Question(title=title.strip(), content=(content or None), author_id=(user.id if user else None))
         db.add(q)
         db.commit()
         db.refresh(q)
+        idempotency.remember(keys, q.id)
         user_preset = getattr(user, "prompt_preset", None) if user else None
         override_cfg = request.session.get("llm_cfg")
-        background_tasks.add_task(generate_for_question, q.id, user_preset, override_cfg)
+        run_single_flight(
+            flight_key(q.id, "ask", default_personas(user_preset)),
+            "answer",
+            lambda job: generate_for_question(q.id, user_preset, override_cfg, job_id=job, ticket=ticket),
+        )
         # also generate with user's active personas if logged in
         if user:
-            background_tasks.add_task(generate_user_personas_for_question, q.id, int(user.id), override_cfg)
+            run_single_flight(
+                flight_key(q.id, "mine", ["active"], int(user.id)),
+                "answer",
+                lambda job: generate_user_personas_for_question(
+                    q.id, int(user.id), override_cfg, job_id=job, priority=scheduler.BACKGROUND, ticket=ticket
+                ),
+            )
         return RedirectResponse(url=f"/q/{q.id}", status_code=302)
 
     @app.get("/login", response_class=HTMLResponse)
@@ -221,13 +295,26 @@ def create_app() -> FastAPI:
         db: Session = Depends(get_session),
     ):
         user = db.query(User).filter(User.username == username).first()
-        if not user or not verify_password(password, user.password_hash):
+        # hand the connection back to the pool while the hash runs
+        db.close()
+        try:
+            ok = bool(user) and await verify_password_async(password, user.password_hash)
+        except HashingOverloaded:
             return templates.TemplateResponse(
                 "login.html",
-                {"request": request, "error": "鐢ㄦ埛鍚嶆垨瀵嗙爜閿欒"},
+                {"request": request, "error": "登录请求过多，请稍后再试"},
+                status_code=503,
+                headers={"Retry-After": "2"},
+            )
+        if not ok:
+            return templates.TemplateResponse(
+                "login.html",
+                {"request": request, "error": "用户名或密码错误"},
                 status_code=400,
             )
+        regenerate_session(request)
         request.session["user_id"] = int(user.id)
+        snapshot_user(user)
         return RedirectResponse(url="/", status_code=302)
 
     @app.get("/signup", response_class=HTMLResponse)
@@ -245,19 +332,41 @@ def create_app() -> FastAPI:
         if exists:
             return templates.TemplateResponse(
                 "signup.html",
-                {"request": request, "error": "鐢ㄦ埛鍚嶅凡瀛樺湪"},
+                {"request": request, "error": "用户名已存在"},
                 status_code=400,
             )
-        user = User(username=username, password_hash=hash_password(password))
+        db.rollback()  # release the connection while hashing
+        try:
+            password_hash = await hash_password_async(password)
+        except HashingOverloaded:
+            return templates.TemplateResponse(
+                "signup.html",
+                {"request": request, "error": "注册请求过多，请稍后再试"},
+                status_code=503,
+                headers={"Retry-After": "2"},
+            )
+        user = User(username=username, password_hash=password_hash)
         db.add(user)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # taken by a concurrent signup while we were hashing
+            db.rollback()
+            return templates.TemplateResponse(
+                "signup.html",
+                {"request": request, "error": "用户名已存在"},
+                status_code=400,
+            )
         db.refresh(user)
+        regenerate_session(request)
         request.session["user_id"] = int(user.id)
+        snapshot_user(user)
         return RedirectResponse(url="/", status_code=302)
 
     @app.post("/logout")
     async def logout(request: Request):
         request.session.clear()
+        regenerate_session(request)
         return RedirectResponse(url="/", status_code=302)
 
     # --- AI settings ---
@@ -269,7 +378,8 @@ def create_app() -> FastAPI:
         if has_key:
             cfg = {**cfg, "api_key": ""}
         # defaults for context cfg
-        # Default both to 鍏辫瘑+Top-K锛岄伩鍏嶇敤鎴峰拷鐣ュ紑鍏?        cfg.setdefault("answer_ctx", cfg.get("answer_ctx", "both"))
+        # Default both to 共识+Top-K，避免用户忽略开关
+        cfg.setdefault("answer_ctx", cfg.get("answer_ctx", "both"))
         cfg.setdefault("comment_ctx", cfg.get("comment_ctx", "both"))
         cfg.setdefault("ctx_topk", cfg.get("ctx_topk", 2))
         cfg.setdefault("ctx_snippet", cfg.get("ctx_snippet", 200))
@@ -288,6 +398,11 @@ def create_app() -> FastAPI:
         comment_ctx: str = Form("consensus"),
         ctx_topk: int = Form(2),
         ctx_snippet: int = Form(200),
+        model_eval: str | None = Form(None),
+        model_comment: str | None = Form(None),
+        provider_eval: str | None = Form(None),
+        provider_comment: str | None = Form(None),
+        fake_profile: str | None = Form(None),
         user=Depends(get_current_user),
     ):
         cfg = {
@@ -301,7 +416,14 @@ def create_app() -> FastAPI:
             "answer_ctx": answer_ctx,
             "comment_ctx": comment_ctx,
             "ctx_topk": ctx_topk,
-            "ctx_snippet": ctx_snippet,
+            "ctx_snippet": snippet_tokens(ctx_snippet),
+            # per-task routing (empty = same as main provider/model)
+            "model_eval": (model_eval or "").strip() or None,
+            "model_comment": (model_comment or "").strip() or None,
+            "provider_eval": provider_eval or None,
+            "provider_comment": provider_comment or None,
+            # fake provider behaviour for offline load tests
+            "fake_profile": (fake_profile or "").strip() or None,
         }
         request.session["llm_cfg"] = cfg
         return templates.TemplateResponse("ai_settings.html", {"request": request, "cfg": {**cfg, "api_key": ""}, "has_key": bool(cfg["api_key"]), "saved": True, "user": user})
@@ -310,15 +432,16 @@ def create_app() -> FastAPI:
     async def ai_settings_test(request: Request, user=Depends(get_current_user)):
         # quick round-trip test
         override_cfg = request.session.get("llm_cfg")
-        title = "Syno 杩炴帴鎬ф祴璇?
-        content = "璇疯緭鍑轰竴娈典笉瓒呰繃30瀛楃殑涓枃鐭彞锛岃瘉鏄庢帴鍙ｅ彲鐢ㄣ€?
+        title = "Syno 连接性测试"
+        content = "请输出一段不超过30字的中文短句，证明接口可用。"
         from .services.llm import LLMClient, config_from_dict
         client = LLMClient(config_from_dict(override_cfg))
+        scheduler.bind(scheduler.INTERACTIVE, getattr(user, "id", None))
         try:
-            text = await client.generate_answer("娴嬭瘯鍛?, title, content)
+            text = await client.generate_answer("测试员", title, content)
             ok = True
         except Exception as e:
-            text = f"璋冪敤澶辫触锛歿e}"
+            text = f"调用失败：{e}"
             ok = False
         cfg = {**(override_cfg or {}), "api_key": ""}
         return templates.TemplateResponse("ai_settings.html", {"request": request, "cfg": cfg, "has_key": bool((override_cfg or {}).get("api_key")), "user": user, "test_result": text, "test_ok": ok})
@@ -333,14 +456,18 @@ def create_app() -> FastAPI:
     async def me_prompt_post(request: Request, preset: str = Form(""), db: Session = Depends(get_session), user=Depends(get_current_user)):
         if not user:
             return RedirectResponse(url="/login", status_code=302)
-        user.prompt_preset = (preset or None)
-        db.add(user)
+        u = db.get(User, user.id)
+        if not u:
+            return RedirectResponse(url="/login", status_code=302)
+        u.prompt_preset = (preset or None)
+        db.add(u)
         db.commit()
-        db.refresh(user)
-        return templates.TemplateResponse("me_prompt.html", {"request": request, "user": user, "saved": True})
+        db.refresh(u)
+        invalidate_user(u.id)
+        return templates.TemplateResponse("me_prompt.html", {"request": request, "user": snapshot_user(u), "saved": True})
 
     @app.get("/q/{qid}", response_class=HTMLResponse)
-    async def question_detail(request: Request, qid: int, db: Session = Depends(get_session), user=Depends(get_current_user)):
+    async def question_detail(request: Request, qid: int, notice: str | None = None, db: Session = Depends(get_session), user=Depends(get_current_user)):
         q = db.get(Question, qid)
         if not q:
             return RedirectResponse(url="/", status_code=302)
@@ -356,7 +483,14 @@ def create_app() -> FastAPI:
             for a in answers
         }
         # comments: load question's top-level and second-level
-        comments = db.query(Comment).filter(Comment.target_type == VoteTarget.question, Comment.target_id == q.id).order_by(Comment.created_at.asc()).all()
+        # authors loaded up front: the page is streamed after the session is closed
+        comments = (
+            db.query(Comment)
+            .options(selectinload(Comment.author))
+            .filter(Comment.target_type == VoteTarget.question, Comment.target_id == q.id)
+            .order_by(Comment.created_at.asc())
+            .all()
+        )
         # group by parent
         top = [c for c in comments if c.parent_id is None]
         children = {}
@@ -370,48 +504,81 @@ def create_app() -> FastAPI:
             my_personas = db.query(Persona).filter(Persona.user_id == user.id).order_by(Persona.id.desc()).all()
 
         # Can we generate consensus?
-        return templates.TemplateResponse(
+        return stream_template(
+            templates,
             "question_detail.html",
             {
                 "request": request,
                 "question": q,
                 "answers": answers,
+                "regen_below": regen_below(),
                 "q_score": q_score,
                 "a_scores": a_scores,
                 "comments_top": top,
                 "comments_children": children,
                 "my_personas": my_personas,
+                "gen_status": progress.snapshot(q.id),
+                "notice": NOTICES.get(notice or ""),
                 "user": user,
             },
         )
 
+    @app.get("/q/{qid}/status")
+    async def question_status(qid: int, since: int = 0, wait: float = 0):
+        # long-poll: returns once the status version moves past `since` (max 25s)
+        snap = await progress.wait(qid, since, max(0.0, min(wait, 25.0)))
+        return JSONResponse(snap, headers={"Cache-Control": "no-store"})
+
     @app.post("/q/{qid}/regen")
     async def question_regen(
         request: Request,
         qid: int,
-        background_tasks: BackgroundTasks,
+        answer_ids: list[str] | None = Form(None),
+        below: int | None = Form(None),
         db: Session = Depends(get_session),
         user=Depends(get_current_user),
     ):
         q = db.get(Question, qid)
         if not q:
             return RedirectResponse(url="/", status_code=302)
-        # clear old answers/consensus
-        db.query(Answer).filter(Answer.question_id == q.id).delete()
-        db.query(Consensus).filter(Consensus.question_id == q.id).delete()
-        db.commit()
+        if load.applies(load.REFUSE_REGEN, load.level()):
+            return RedirectResponse(url=f"/q/{q.id}?notice=busy", status_code=302)
+        # only the chosen answers, or those below the quality threshold
+        targets = [a.id for a in regen_targets(db, q.id, answer_ids, below)]
+        # a first run that produced nothing leaves no answers to swap: generate the defaults again
+        empty = not targets and not db.query(Answer.id).filter(Answer.question_id == q.id).first()
+        if not targets and not empty:
+            return RedirectResponse(url=f"/q/{q.id}?notice=nothing", status_code=302)
+        try:
+            ticket = quota.admit(user, request.client.host if request.client else None, "regen")
+        except quota.RateLimited as e:
+            return _limited(f"/q/{q.id}", e)
         user_preset = getattr(user, "prompt_preset", None) if user else None
         override_cfg = request.session.get("llm_cfg")
-        background_tasks.add_task(generate_for_question, q.id, user_preset, override_cfg)
-        if user:
-            background_tasks.add_task(generate_user_personas_for_question, q.id, int(user.id), override_cfg)
+        user_id = int(user.id) if user else None
+        if empty:
+            # same key as the initial run, so it coalesces with one still in flight
+            run_single_flight(
+                flight_key(q.id, "ask", default_personas(user_preset)),
+                "answer",
+                lambda job: generate_for_question(q.id, user_preset, override_cfg, job_id=job, ticket=ticket),
+            )
+            return RedirectResponse(url=f"/q/{q.id}", status_code=302)
+        # the swap happens inside the job, after any in-flight run has finished writing
+        key = flight_key(q.id, "regen", [str(t) for t in targets])
+        run_single_flight(
+            key,
+            "answer",
+            lambda job: regenerate_question(
+                q.id, user_preset, override_cfg, user_id, job_id=job, flight=key, ticket=ticket, answer_ids=targets
+            ),
+        )
         return RedirectResponse(url=f"/q/{q.id}", status_code=302)
 
     @app.post("/q/{qid}/answer/mine")
     async def question_answer_mine(
         request: Request,
         qid: int,
-        background_tasks: BackgroundTasks,
         db: Session = Depends(get_session),
         user=Depends(get_current_user),
         persona_ids: list[str] | None = Form(None),
@@ -421,8 +588,18 @@ def create_app() -> FastAPI:
         q = db.get(Question, qid)
         if not q:
             return RedirectResponse(url="/", status_code=302)
+        try:
+            ticket = quota.admit(user, None, "answer")
+        except quota.RateLimited as e:
+            return _limited(f"/q/{q.id}", e)
         override_cfg = request.session.get("llm_cfg")
-        background_tasks.add_task(generate_user_personas_for_question, q.id, int(user.id), override_cfg, persona_ids)
+        run_single_flight(
+            flight_key(q.id, "mine", persona_ids or ["active"], int(user.id)),
+            "answer",
+            lambda job: generate_user_personas_for_question(
+                q.id, int(user.id), override_cfg, persona_ids, job_id=job, ticket=ticket
+            ),
+        )
         return RedirectResponse(url=f"/q/{q.id}", status_code=302)
 
     # Personas management
@@ -512,7 +689,7 @@ def create_app() -> FastAPI:
         db: Session = Depends(get_session),
         user=Depends(get_current_user),
     ):
-        # 绂佹鎵嬪伐璇勮锛氱粺涓€閫氳繃 AI 鐢熸垚
+        # 禁止手工评论：统一通过 AI 生成
         referer = request.headers.get("referer") or "/"
         return RedirectResponse(url=referer, status_code=302)
 
@@ -520,22 +697,27 @@ def create_app() -> FastAPI:
     async def comment_ai(
         request: Request,
         qid: int,
-        background_tasks: BackgroundTasks,
         user=Depends(get_current_user),
         persona_id: str | None = Form(None),
     ):
         if not user:
             return RedirectResponse(url="/login", status_code=302)
+        try:
+            ticket = quota.admit(user, None, "comment")
+        except quota.RateLimited as e:
+            return _limited(f"/q/{qid}", e)
         override_cfg = request.session.get("llm_cfg")
-        # 鐩存帴绛夊緟鐢熸垚锛岀偣鍑诲悗鍗冲彲鐪嬪埌缁撴灉
-        await generate_comments_for_question(qid, int(user.id), None, override_cfg, persona_id)
+        # 后台生成，页面通过 /q/{qid}/status 轮询进度
+        job = progress.enqueue(qid, "comment")
+        jobs.spawn(
+            generate_comments_for_question(qid, int(user.id), None, override_cfg, persona_id, job_id=job, ticket=ticket)
+        )
         return RedirectResponse(url=f"/q/{qid}", status_code=302)
 
     @app.post("/comment/{cid}/reply/ai")
     async def comment_reply_ai(
         request: Request,
         cid: int,
-        background_tasks: BackgroundTasks,
         db: Session = Depends(get_session),
         user=Depends(get_current_user),
         persona_id: str | None = Form(None),
@@ -545,15 +727,33 @@ def create_app() -> FastAPI:
         c = db.get(Comment, cid)
         if not c:
             return RedirectResponse(url="/", status_code=302)
+        try:
+            ticket = quota.admit(user, None, "comment")
+        except quota.RateLimited as e:
+            return _limited(f"/q/{c.target_id}", e)
         override_cfg = request.session.get("llm_cfg")
-        await generate_comments_for_question(int(c.target_id), int(user.id), int(cid), override_cfg, persona_id)
+        job = progress.enqueue(int(c.target_id), "comment")
+        jobs.spawn(
+            generate_comments_for_question(
+                int(c.target_id), int(user.id), int(cid), override_cfg, persona_id, job_id=job, ticket=ticket
+            )
+        )
         return RedirectResponse(url=f"/q/{c.target_id}", status_code=302)
 
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics_endpoint(request: Request):
+        # Prometheus scrape target; set SYNO_METRICS_TOKEN to require "Authorization: Bearer <token>"
+        token = os.getenv("SYNO_METRICS_TOKEN")
+        if token and not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}"):
+            return PlainTextResponse("unauthorized\n", status_code=401)
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
     # --- Admin (requires SYNO_ADMIN_USERS contain username) ---
     @app.get("/admin", response_class=HTMLResponse)
     async def admin_index(request: Request, tab: str = "questions", q: str | None = None, db: Session = Depends(get_session), user=Depends(require_admin)):
         headers = []
         rows = []
+        jobs_view: list[dict] = []
         query_str = (q or "").strip()
         if tab == "users":
             items = db.query(User).order_by(User.id.desc()).all()
@@ -589,6 +789,31 @@ def create_app() -> FastAPI:
                 body = (p.prompt or '')
                 short = body[:120] + ('…' if len(body) > 120 else '')
                 rows.append({"cells": [p.id, p.user_id, p.name, ("启用" if getattr(p, 'is_active', 1) else "停用"), short], "delete_action": f"/admin/delete/persona/{p.id}"})
+        elif tab == "scoring":
+            rep = scoring.report()
+            headers = ["项目", "数值"]
+            rows = [
+                {"cells": ["模式", rep["mode"]], "delete_action": None},
+                {"cells": ["模糊区间", "%g – %g" % rep["band"]], "delete_action": None},
+                {"cells": ["已评分答案", rep["scored"]], "delete_action": None},
+                {"cells": ["调用 LLM 评审", rep["judged"]], "delete_action": None},
+                {"cells": ["节省评审调用", f"{rep['saved']}（{rep['saved_ratio']:.0%}）"], "delete_action": None},
+            ]
+            rows += [{"cells": [k, v], "delete_action": None} for k, v in sorted(rep["by_reason"].items())]
+        elif tab == "trace":
+            if query_str.isdigit():
+                for job in tracing.jobs_for_question(int(query_str)):
+                    total = job["total"] or 1e-9
+                    for sp in job["spans"]:
+                        sp["left"] = min(100.0, sp["start"] / total * 100)
+                        sp["width"] = max(0.5, min(100.0 - sp["left"], sp["duration"] / total * 100))
+                    job["when"] = datetime.fromtimestamp(job["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+                    jobs_view.append(job)
+            else:
+                headers = ["问题", "类型", "任务", "开始时间", "总耗时"]
+                for sp in tracing.recent_jobs():
+                    when = datetime.fromtimestamp(sp.get("ts", 0)).strftime("%Y-%m-%d %H:%M:%S")
+                    rows.append({"cells": [sp["question"], sp["kind"], sp["job"], when, f"{sp['duration']:.2f}s"], "delete_action": None})
         elif tab == "hub":
             items = db.query(PersonaHub).order_by(PersonaHub.id.desc()).limit(200).all()
             if query_str:
@@ -608,7 +833,20 @@ def create_app() -> FastAPI:
                 short = body[:120] + ('…' if len(body) > 120 else '')
                 rows.append({"cells": [qq.id, qq.title, short, getattr(qq, 'created_at', '')], "delete_action": f"/admin/delete/question/{qq.id}"})
 
-        return templates.TemplateResponse("admin_index.html", {"request": request, "user": user, "tab": tab, "q": query_str, "headers": headers, "rows": rows})
+        return stream_template(templates, "admin_index.html", {"request": request, "user": user, "tab": tab, "q": query_str, "headers": headers, "rows": rows, "jobs": jobs_view})
+
+    @app.get("/admin/perf", response_class=HTMLResponse)
+    async def admin_perf(request: Request, user=Depends(require_admin)):
+        headers = ["路由", "样本", "查询数 avg / p95", "DB 耗时 avg", "总耗时 p95", "疑似 N+1", "最慢语句"]
+        rows = []
+        for r in perf_registry.summary():
+            dup = f"{r['n_plus_one'][1]} 次请求：{r['n_plus_one'][0][:120]}" if r["n_plus_one"] else ""
+            slow = f"{r['slowest'][0] * 1000:.1f}ms {r['slowest'][1][:120]}" if r["slowest"] else ""
+            rows.append({
+                "cells": [r["route"], r["samples"], f"{r['avg_queries']:.1f} / {r['p95_queries']:g}", f"{r['avg_db_ms']:.1f}ms", f"{r['p95_total_ms']:.0f}ms", dup, slow],
+                "delete_action": None,
+            })
+        return stream_template(templates, "admin_index.html", {"request": request, "user": user, "tab": "perf", "q": None, "headers": headers, "rows": rows})
 
     @app.post("/admin/delete/question/{qid}")
     async def admin_delete_question(request: Request, qid: int, db: Session = Depends(get_session), user=Depends(require_admin)):
@@ -0,0 +1,182 @@
+"""In-process metrics registry (counters, gauges, histograms with labels).
+
+Dependency-free on purpose; values are read back by admin views and the
+metrics endpoint.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Iterable, Optional
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+REGISTRY: dict[str, "Metric"] = {}
+
+
+def _key(labelnames: tuple[str, ...], labels: dict) -> tuple[str, ...]:
+    return tuple(str(labels.get(n, "")) for n in labelnames)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(self.labelnames, labels), 0.0)
+
+    def samples(self) -> list[tuple[dict, float]]:
+        with _lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, k)), v) for k, v in items]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        with _lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            self._values[_key(self.labelnames, labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        with _lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Optional[Iterable[float]] = None,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+        # key -> [bucket counts..., count, sum]
+        self._hist: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            h = self._hist.get(k)
+            if h is None:
+                h = self._hist[k] = [0.0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                h[i] += 1
+            h[-2] += 1
+            h[-1] += value
+
+    def count(self, **labels) -> int:
+        h = self._hist.get(_key(self.labelnames, labels))
+        return int(h[-2]) if h else 0
+
+    def total(self, **labels) -> float:
+        h = self._hist.get(_key(self.labelnames, labels))
+        return h[-1] if h else 0.0
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Bucket upper bound covering quantile ``q`` (coarse, like Prometheus)."""
+        h = self._hist.get(_key(self.labelnames, labels))
+        if not h or not h[-2]:
+            return None
+        rank = q * h[-2]
+        seen = 0.0
+        for bound, n in zip(self.buckets, h):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def series(self) -> list[tuple[dict, list[float]]]:
+        with _lock:
+            items = [(k, list(v)) for k, v in self._hist.items()]
+        return [(dict(zip(self.labelnames, k)), v) for k, v in items]
+
+
+def _register(metric: Metric) -> Metric:
+    with _lock:
+        existing = REGISTRY.get(metric.name)
+        if existing is not None:
+            return existing
+        REGISTRY[metric.name] = metric
+    return metric
+
+
+def counter(name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+    return _register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+
+def gauge(name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return _register(Gauge(name, help, labelnames))  # type: ignore[return-value]
+
+
+def histogram(
+    name: str, help: str, labelnames: Iterable[str] = (), buckets: Optional[Iterable[float]] = None
+) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict, extra: Optional[tuple[str, str]] = None) -> str:
+    items = [(k, str(v)) for k, v in labels.items()]
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format (0.0.4)."""
+    with _lock:
+        metrics = sorted(REGISTRY.values(), key=lambda m: m.name)
+    out: list[str] = []
+    for m in metrics:
+        out.append(f"# HELP {m.name} {m.help}")
+        out.append(f"# TYPE {m.name} {m.kind}")
+        if isinstance(m, Histogram):
+            for labels, h in m.series():
+                cumulative = 0.0
+                for bound, n in zip(m.buckets, h):
+                    cumulative += n
+                    out.append(f"{m.name}_bucket{_labels(labels, ('le', _num(bound)))} {_num(cumulative)}")
+                out.append(f"{m.name}_bucket{_labels(labels, ('le', '+Inf'))} {_num(h[-2])}")
+                out.append(f"{m.name}_sum{_labels(labels)} {_num(h[-1])}")
+                out.append(f"{m.name}_count{_labels(labels)} {_num(h[-2])}")
+        else:
+            for labels, v in m.samples():
+                out.append(f"{m.name}{_labels(labels)} {_num(v)}")
+    return "\n".join(out) + "\n"
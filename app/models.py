@@ -139,3 +139,20 @@ class PersonaHub(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
 
     owner: Mapped[User] = relationship("User")
+
+
+class ServerSession(Base):
+    __tablename__ = "server_sessions"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    data: Mapped[str] = mapped_column(Text)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class UsageQuota(Base):
+    __tablename__ = "usage_quotas"
+
+    subject: Mapped[str] = mapped_column(String(80), primary_key=True)  # u:<id> or ip:<addr>
+    cls: Mapped[str] = mapped_column(String(20), primary_key=True)
+    day: Mapped[str] = mapped_column(String(10), primary_key=True)  # UTC YYYY-MM-DD
+    used: Mapped[int] = mapped_column(Integer, default=0)
@@ -0,0 +1,248 @@
+"""Request-level SQL profiling.
+
+SQLAlchemy cursor events are attributed to the request being served (via a
+context variable): query count, DB time, slowest statements and statements
+repeated within one request (likely N+1). Sampled requests get a
+``Server-Timing`` header and feed a rolling per-route summary shown at
+``/admin/perf``. Unsampled requests only pay for one context-variable lookup
+per query.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+_WS = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize(statement: str) -> str:
+    """Collapse whitespace and expanded IN-lists so repeats compare equal."""
+    return _IN_LIST.sub("(?…)", _WS.sub(" ", statement).strip())
+
+
+class RequestProfile:
+    __slots__ = ("task", "queries", "db_time", "statements", "slowest", "closed")
+
+    def __init__(self, task: Optional[asyncio.Task]) -> None:
+        self.task = task
+        self.queries = 0
+        self.db_time = 0.0
+        # normalized statement -> [count, total seconds]
+        self.statements: dict[str, list[float]] = {}
+        self.slowest: list[tuple[float, str]] = []
+        self.closed = False
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.db_time += elapsed
+        key = normalize(statement)
+        entry = self.statements.get(key)
+        if entry is None:
+            self.statements[key] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+        self.slowest.append((elapsed, key))
+        if len(self.slowest) > 6:
+            self.slowest.sort(reverse=True)
+            del self.slowest[3:]
+
+    def duplicates(self, threshold: int) -> list[tuple[str, int]]:
+        return sorted(
+            ((s, int(c)) for s, (c, _) in self.statements.items() if c >= threshold),
+            key=lambda x: -x[1],
+        )
+
+    def top(self, n: int = 3) -> list[tuple[float, str]]:
+        return sorted(self.slowest, reverse=True)[:n]
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("syno_sql_profile", default=None)
+
+
+def _owns(profile: RequestProfile) -> bool:
+    """True for the request task itself and threadpool work done on its behalf.
+
+    Background jobs spawned during the request inherit the context variable
+    but run in their own task; their queries are not charged to the request.
+    """
+    if profile.closed:
+        return False
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return True  # no loop in this thread: run_in_threadpool for the request
+    return task is None or task is profile.task
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("syno_t0", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is None:
+        return
+    starts = conn.info.get("syno_t0")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if _owns(profile):
+        profile.record(statement, elapsed)
+
+
+_installed: set[int] = set()
+
+
+def install(engine: Engine) -> None:
+    if id(engine) in _installed:
+        return
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "after_cursor_execute", _after)
+    _installed.add(id(engine))
+
+
+class RouteStats:
+    """Rolling window of sampled requests for one route."""
+
+    def __init__(self, window: int) -> None:
+        self.samples: deque[tuple[int, float, float]] = deque(maxlen=window)  # queries, db s, total s
+        self.n_plus_one: Counter[str] = Counter()
+        self.slowest: tuple[float, str] = (0.0, "")
+        self.seen = 0
+
+    def add(self, profile: RequestProfile, total: float, dup_threshold: int) -> None:
+        self.seen += 1
+        self.samples.append((profile.queries, profile.db_time, total))
+        for stmt, _ in profile.duplicates(dup_threshold):
+            self.n_plus_one[stmt] += 1
+        if len(self.n_plus_one) > 20:
+            self.n_plus_one = Counter(dict(self.n_plus_one.most_common(10)))
+        for elapsed, stmt in profile.top(1):
+            if elapsed >= self.slowest[0]:
+                self.slowest = (elapsed, stmt)
+
+
+def _pct(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(p * len(s)))]
+
+
+class PerfRegistry:
+    def __init__(self, window: int = 200, max_routes: int = 200) -> None:
+        self.window = window
+        self.max_routes = max_routes
+        self._routes: OrderedDict[str, RouteStats] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, route: str, profile: RequestProfile, total: float, dup_threshold: int) -> None:
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats(self.window)
+                while len(self._routes) > self.max_routes:
+                    self._routes.popitem(last=False)
+            stats.add(profile, total, dup_threshold)
+
+    def summary(self) -> list[dict]:
+        with self._lock:
+            items = list(self._routes.items())
+        out = []
+        for route, st in items:
+            qs = [s[0] for s in st.samples]
+            db = [s[1] for s in st.samples]
+            total = [s[2] for s in st.samples]
+            n = len(qs) or 1
+            dup = st.n_plus_one.most_common(1)
+            out.append(
+                {
+                    "route": route,
+                    "samples": len(qs),
+                    "avg_queries": sum(qs) / n,
+                    "p95_queries": _pct(qs, 0.95),
+                    "avg_db_ms": sum(db) / n * 1000,
+                    "p95_total_ms": _pct(total, 0.95) * 1000,
+                    "n_plus_one": dup[0] if dup else None,
+                    "slowest": st.slowest if st.slowest[1] else None,
+                }
+            )
+        out.sort(key=lambda r: -r["avg_queries"] * r["samples"])
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+registry = PerfRegistry(window=_int_env("SYNO_PERF_WINDOW", 200))
+
+
+def _route_name(scope: Scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "?")
+    return f"{scope.get('method', 'GET')} {path}"
+
+
+class SQLProfilerMiddleware:
+    """Profile a sample of requests (SYNO_PERF_SAMPLE, 0..1) and add Server-Timing."""
+
+    def __init__(self, app: ASGIApp, sample: Optional[float] = None, dup_threshold: Optional[int] = None) -> None:
+        self.app = app
+        self.sample = _float_env("SYNO_PERF_SAMPLE", 0.1) if sample is None else sample
+        self.dup_threshold = _int_env("SYNO_PERF_DUP_THRESHOLD", 5) if dup_threshold is None else dup_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.sample <= 0 or random.random() >= self.sample:
+            await self.app(scope, receive, send)
+            return
+        profile = RequestProfile(asyncio.current_task())
+        token = _current.set(profile)
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries", '
+                    f"app;dur={(time.perf_counter() - t0) * 1000:.1f}",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.closed = True
+            _current.reset(token)
+            registry.add(_route_name(scope), profile, time.perf_counter() - t0, self.dup_threshold)
@@ -0,0 +1,85 @@
+"""Streamed template rendering.
+
+``stream_template`` sends a page while Jinja is still rendering it: output
+is flushed in chunks of about SYNO_STREAM_CHUNK bytes (default 32768) and
+at every ``{{ flush() }}`` in the templates (after the header, after the
+question), so the browser can fetch CSS and paint the top of the page
+before the rest is rendered. SYNO_STREAM_TEMPLATES=0 falls back to the
+buffered ``TemplateResponse``.
+
+Rendering happens after the handler returned, when its DB session is
+already closed: everything a streamed template reads must be loaded up
+front (e.g. ``selectinload`` for relationships).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import AsyncIterator, Iterator, Mapping, Optional
+
+from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+from starlette.responses import Response, StreamingResponse
+
+
+FLUSH = Markup("<!--flush-->")
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _bool_env(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0") in ("1", "true", "True", "yes", "on")
+
+
+def flush() -> Markup:
+    """Template global: mark a point where the output rendered so far is sent."""
+    return FLUSH
+
+
+async def _chunks(pieces: Iterator[str], size: int) -> AsyncIterator[bytes]:
+    buf: list[str] = []
+    n = 0
+    for piece in pieces:
+        if piece == FLUSH:
+            if buf:
+                yield "".join(buf).encode("utf-8")
+                buf, n = [], 0
+                # let the event loop write the chunk (and serve others) before rendering on
+                await asyncio.sleep(0)
+            continue
+        buf.append(piece)
+        n += len(piece)
+        if n >= size:
+            yield "".join(buf).encode("utf-8")
+            buf, n = [], 0
+            await asyncio.sleep(0)
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def stream_template(
+    templates: Jinja2Templates,
+    name: str,
+    context: Mapping,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    if not _bool_env("SYNO_STREAM_TEMPLATES", True):
+        return templates.TemplateResponse(name, dict(context), status_code=status_code, headers=headers)
+    template = templates.get_template(name)
+    ctx = dict(context)
+    request = ctx.get("request")
+    for processor in templates.context_processors:
+        ctx.update(processor(request))
+    pieces = template.generate(ctx)
+    return StreamingResponse(
+        _chunks(pieces, max(1024, _int_env("SYNO_STREAM_CHUNK", 32768))),
+        status_code=status_code,
+        headers=headers,
+        media_type="text/html; charset=utf-8",
+    )
@@ -0,0 +1,130 @@
+"""Token-aware prompt budgeting.
+
+Token counts are estimated from character classes per model family (CJK
+characters vs. everything else), which is close enough to size prompts
+without shipping a tokenizer. ``fit`` trims the variable parts of a prompt
+in priority order until the whole message fits the task's input budget.
+"""
+from __future__ import annotations
+
+import math
+import os
+from typing import Optional
+
+
+# family -> (tokens per CJK character, characters per token for other text)
+FAMILIES = {
+    "openai": (1.0, 4.0),
+    "claude": (1.2, 3.5),
+    "qwen": (0.7, 3.8),
+    "deepseek": (0.7, 3.8),
+    "glm": (0.7, 3.8),
+    "moonshot": (0.8, 3.8),
+    "default": (1.3, 3.5),
+}
+_MARKERS = (
+    ("gpt", "openai"),
+    ("claude", "claude"),
+    ("qwen", "qwen"),
+    ("deepseek", "deepseek"),
+    ("glm", "glm"),
+    ("moonshot", "moonshot"),
+    ("kimi", "moonshot"),
+)
+
+ELLIPSIS = "…"
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def family(model: Optional[str]) -> str:
+    m = (model or "").lower()
+    if m.rsplit("/", 1)[-1].startswith(("o1", "o3", "o4")):
+        return "openai"
+    for marker, fam in _MARKERS:
+        if marker in m:
+            return fam
+    return "default"
+
+
+def _is_cjk(ch: str) -> bool:
+    o = ord(ch)
+    return (
+        0x3000 <= o <= 0x9FFF
+        or 0xF900 <= o <= 0xFAFF
+        or 0xFF00 <= o <= 0xFFEF
+        or 0xAC00 <= o <= 0xD7AF
+        or 0x20000 <= o <= 0x2FA1F
+    )
+
+
+def estimate(text: Optional[str], model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    per_cjk, chars_per_token = FAMILIES[family(model)]
+    cjk = sum(1 for ch in text if _is_cjk(ch))
+    return math.ceil(cjk * per_cjk + (len(text) - cjk) / chars_per_token)
+
+
+def trim(text: Optional[str], max_tokens: int, model: Optional[str] = None) -> str:
+    """Longest prefix of ``text`` (plus an ellipsis) that fits ``max_tokens``."""
+    t = (text or "").strip()
+    if estimate(t, model) <= max_tokens:
+        return t
+    if max_tokens <= 1:
+        return ""
+    per_cjk, chars_per_token = FAMILIES[family(model)]
+    other = 1.0 / chars_per_token
+    room = max_tokens - estimate(ELLIPSIS, model)
+    cost = 0.0
+    for i, ch in enumerate(t):
+        cost += per_cjk if _is_cjk(ch) else other
+        if math.ceil(cost) > room:
+            return t[:i].rstrip() + ELLIPSIS
+    return t
+
+
+def input_budget(task: str) -> int:
+    """Input token budget for ``task`` (SYNO_PROMPT_BUDGET_<TASK>, else SYNO_PROMPT_BUDGET)."""
+    defaults = {"answer": 2000, "comment": 1200, "eval": 3000}
+    base = _int_env("SYNO_PROMPT_BUDGET", defaults.get(task, 2000))
+    return _int_env(f"SYNO_PROMPT_BUDGET_{task.upper()}", base)
+
+
+def fit(
+    budget: int,
+    fixed: str,
+    parts: list[tuple[str, Optional[str], int]],
+    model: Optional[str] = None,
+) -> tuple[dict[str, str], int, list[str]]:
+    """Trim ``parts`` so ``fixed`` + parts fit ``budget`` tokens.
+
+    ``parts`` are ``(name, text, floor)`` listed from first-to-trim to
+    last-to-trim. A first pass trims each part down to its floor; if that is
+    not enough a second pass ignores the floors. Returns the trimmed texts,
+    the final token estimate and the names of the parts that were cut.
+    """
+    out = {name: (text or "").strip() for name, text, _ in parts}
+    sizes = {name: estimate(out[name], model) for name in out}
+    fixed_tokens = estimate(fixed, model)
+    over = fixed_tokens + sum(sizes.values()) - budget
+    cut: list[str] = []
+    for use_floor in (True, False):
+        for name, _, floor in parts:
+            if over <= 0:
+                break
+            keep = max(floor if use_floor else 0, sizes[name] - over)
+            if keep >= sizes[name]:
+                continue
+            out[name] = trim(out[name], keep, model)
+            new = estimate(out[name], model)
+            over -= sizes[name] - new
+            sizes[name] = new
+            if name not in cut:
+                cut.append(name)
+    return out, fixed_tokens + sum(sizes.values()), cut
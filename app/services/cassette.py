@@ -0,0 +1,137 @@
+"""Record/replay of LLM interactions for repeatable benchmarks.
+
+SYNO_LLM_CASSETTE_MODE=record appends every successful provider call to the
+JSONL file SYNO_LLM_CASSETTE (request, response, provider, model, latency).
+SYNO_LLM_CASSETTE_MODE=replay serves those responses instead of calling a
+provider, after sleeping the recorded latency times SYNO_LLM_CASSETTE_SCALE
+(1 = original timing, 0 = instant). A request with no recording fails.
+
+Requests are keyed by task plus the call arguments with whitespace
+normalized, so the provider and model may change between runs. Repeated
+identical requests replay their recordings in order, cycling when exhausted.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Optional
+
+from .. import metrics
+
+
+CASSETTE = metrics.counter("syno_llm_cassette_total", "Cassette lookups and recordings", ["mode", "result"])
+
+_WS = re.compile(r"\s+")
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+def mode() -> str:
+    m = os.getenv("SYNO_LLM_CASSETTE_MODE", "off").strip().lower()
+    return m if m in ("record", "replay") and path() else "off"
+
+
+def path() -> str:
+    return os.getenv("SYNO_LLM_CASSETTE", "./syno-cassette.jsonl")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return _WS.sub(" ", value).strip()
+    return value
+
+
+def key(task: str, args: tuple) -> str:
+    payload = json.dumps([task, [_normalize(a) for a in args]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+_lock = threading.Lock()
+
+
+def record(task: str, args: tuple, response: Any, provider: str, model: str, latency: float) -> None:
+    entry = {
+        "key": key(task, args),
+        "task": task,
+        "request": list(args),
+        "response": response,
+        "provider": provider,
+        "model": model,
+        "latency": round(latency, 4),
+    }
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _lock:
+        with open(path(), "a", encoding="utf-8") as f:
+            f.write(line)
+    CASSETTE.inc(mode="record", result="recorded")
+
+
+class Tape:
+    def __init__(self, file: str) -> None:
+        self.file = file
+        self.entries: dict[str, list[dict]] = {}
+        self.cursor: dict[str, int] = {}
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    continue
+                self.entries.setdefault(e["key"], []).append(e)
+
+    def next(self, k: str) -> Optional[dict]:
+        items = self.entries.get(k)
+        if not items:
+            return None
+        with _lock:
+            i = self.cursor.get(k, 0)
+            self.cursor[k] = i + 1
+        return items[i % len(items)]
+
+
+_tapes: dict[str, Tape] = {}
+
+
+def tape() -> Tape:
+    p = path()
+    with _lock:
+        t = _tapes.get(p)
+    if t is None:
+        t = Tape(p)
+        with _lock:
+            _tapes.setdefault(p, t)
+    return _tapes[p]
+
+
+def rewind() -> None:
+    """Forget loaded tapes so the next replay starts from the first recording."""
+    with _lock:
+        _tapes.clear()
+
+
+async def replay(task: str, args: tuple) -> Any:
+    entry = tape().next(key(task, args))
+    if entry is None:
+        CASSETTE.inc(mode="replay", result="miss")
+        raise CassetteMiss(f"no recording for {task} request")
+    CASSETTE.inc(mode="replay", result="hit")
+    delay = entry.get("latency", 0.0) * _float_env("SYNO_LLM_CASSETTE_SCALE", 1.0)
+    if delay > 0:
+        await asyncio.sleep(delay)
+    return entry["response"]
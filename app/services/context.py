@@ -6,6 +6,8 @@ from typing import Optional
 from sqlalchemy.orm import Session
 
 from ..models import Answer, Consensus, Question
+from . import budget, tracing
+from .llm import config_from_dict, get_default_config
 
 
 def _env(name: str, default: str) -> str:
@@ -23,21 +25,32 @@ def _int_env(name: str, default: int) -> int:
         return default
 
 
+# bounds of ctx_snippet in tokens; keep in sync with the ai_settings.html field
+SNIPPET_MIN_TOKENS = 40
+SNIPPET_MAX_TOKENS = 800
+
+
+def snippet_tokens(value: int) -> int:
+    return max(SNIPPET_MIN_TOKENS, min(SNIPPET_MAX_TOKENS, int(value)))
+
+
 def ctx_from_dict(d: Optional[dict]):
     return {
         # 默认仅使用 Top-K，已移除共识生成
         "answer_ctx": (d or {}).get("answer_ctx") or _env("SYNO_ANSWER_CONTEXT", "topk"),
         "comment_ctx": (d or {}).get("comment_ctx") or _env("SYNO_COMMENT_CONTEXT", "topk"),
         "ctx_topk": int((d or {}).get("ctx_topk") or _int_env("SYNO_CONTEXT_TOPK", 2)),
-        "ctx_snippet": int((d or {}).get("ctx_snippet") or _int_env("SYNO_CONTEXT_SNIPPET", 200)),
+        "ctx_snippet": snippet_tokens((d or {}).get("ctx_snippet") or _int_env("SYNO_CONTEXT_SNIPPET", 200)),
     }
 
 
-def _snip(text: str, limit: int) -> str:
-    t = (text or "").strip()
-    if len(t) <= limit:
-        return t
-    return t[: limit - 1] + "…"
+def _snip(text: str, limit: int, model: Optional[str] = None) -> str:
+    """Cut ``text`` to about ``limit`` tokens for ``model``."""
+    return budget.trim(text, limit, model)
+
+
+def _model_for(override_cfg: Optional[dict], task: str) -> str:
+    return (config_from_dict(override_cfg) or get_default_config()).for_task(task).model
 
 
 def build_answer_background(db: Session, q: Question, override_cfg: Optional[dict]) -> str:
@@ -50,16 +63,18 @@ def build_answer_background(db: Session, q: Question, override_cfg: Optional[dic
     if mode in ("consensus", "both"):
         pass
     if mode in ("topk", "both"):
-        ans = (
-            db.query(Answer)
-            .filter(Answer.question_id == q.id)
-            .order_by(Answer.quality_score.desc())
-            .limit(topk)
-            .all()
-        )
-        if ans:
-            bullets = [f"• {a.persona}：{_snip(a.content, sn)}" for a in ans]
-            parts.append("参考要点：\n" + "\n".join(bullets))
+        with tracing.span("context", task="answer"):
+            ans = (
+                db.query(Answer)
+                .filter(Answer.question_id == q.id)
+                .order_by(Answer.quality_score.desc())
+                .limit(topk)
+                .all()
+            )
+            if ans:
+                model = _model_for(override_cfg, "answer")
+                bullets = [f"• {a.persona}：{_snip(a.content, sn, model)}" for a in ans]
+                parts.append("参考要点：\n" + "\n".join(bullets))
     return "\n\n".join(parts).strip()
 
 
@@ -72,14 +87,16 @@ def build_comment_background(db: Session, q: Question, override_cfg: Optional[di
     if mode in ("consensus", "both"):
         pass
     if mode in ("topk", "both"):
-        ans = (
-            db.query(Answer)
-            .filter(Answer.question_id == q.id)
-            .order_by(Answer.quality_score.desc())
-            .limit(topk)
-            .all()
-        )
-        if ans:
-            bullets = [f"• {a.persona}：{_snip(a.content, sn)}" for a in ans]
-            parts.append("参考要点：\n" + "\n".join(bullets))
+        with tracing.span("context", task="comment"):
+            ans = (
+                db.query(Answer)
+                .filter(Answer.question_id == q.id)
+                .order_by(Answer.quality_score.desc())
+                .limit(topk)
+                .all()
+            )
+            if ans:
+                model = _model_for(override_cfg, "comment")
+                bullets = [f"• {a.persona}：{_snip(a.content, sn, model)}" for a in ans]
+                parts.append("参考要点：\n" + "\n".join(bullets))
     return "\n\n".join(parts).strip()
@@ -0,0 +1,102 @@
+"""Per-job deadlines propagated to LLM calls and the final DB commit."""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from ..db import engine
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class Deadline:
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def cap(self, timeout: float) -> float:
+        return min(timeout, self.remaining())
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("syno_deadline", default=None)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+def start_job() -> Deadline:
+    """New deadline (SYNO_GEN_DEADLINE seconds) bound to the current task."""
+    d = Deadline(_float_env("SYNO_GEN_DEADLINE", 60.0))
+    _current.set(d)
+    return d
+
+
+def call_timeout(default: float) -> float:
+    """Timeout for one outbound call: ``default`` capped by the job deadline."""
+    d = _current.get()
+    return d.cap(default) if d else default
+
+
+async def gather_within(deadline: Deadline, coros: list[Awaitable]) -> list:
+    """Run ``coros`` concurrently until the deadline.
+
+    Stragglers are cancelled; failed or cancelled entries come back as None so
+    whatever did finish can still be committed.
+    """
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    if not tasks:
+        return []
+    _, pending = await asyncio.wait(tasks, timeout=deadline.remaining() or 0.001)
+    for t in pending:
+        t.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    out = []
+    for t in tasks:
+        if t.cancelled() or t.exception() is not None:
+            out.append(None)
+        else:
+            out.append(t.result())
+    return out
+
+
+def commit_within(db: Session, deadline: Deadline) -> None:
+    """Commit with lock waits bounded by the deadline (plus a small grace)."""
+    grace = _float_env("SYNO_GEN_COMMIT_GRACE", 5.0)
+    budget_ms = int(max(deadline.remaining(), grace) * 1000)
+    bind = db.get_bind()
+    if bind is not None and bind.dialect.name == "sqlite":
+        conn = db.connection()
+        # the pragma sticks to the pooled connection; _restore_busy_timeout undoes it on check-in
+        conn.info.setdefault(_BUSY_KEY, conn.execute(text("PRAGMA busy_timeout")).scalar())
+        conn.execute(text(f"PRAGMA busy_timeout = {budget_ms}"))
+    db.commit()
+
+
+_BUSY_KEY = "syno_busy_timeout"
+
+
+@event.listens_for(engine, "checkin")
+def _restore_busy_timeout(dbapi_connection, record) -> None:
+    previous = record.info.pop(_BUSY_KEY, None)
+    if previous is not None and dbapi_connection is not None:
+        dbapi_connection.execute(f"PRAGMA busy_timeout = {int(previous)}")
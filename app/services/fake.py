@@ -0,0 +1,172 @@
+"""Behaviour of the offline ``fake`` provider: latency, failures, pacing, usage.
+
+By default the fake provider answers instantly and never fails. For load
+tests it can behave like a real vendor; settings come from SYNO_FAKE_* and
+can be overridden per session with a profile string from the /ai page::
+
+    latency=lognormal:0.8,0.5;error=0.02;429=0.05;retry_after=2;chunk=16;chunk_delay=0.03
+
+Latency is the time to the first chunk: ``fixed:S``, ``lognormal:MEDIAN,SIGMA``
+or ``heavytail:MIN,ALPHA`` (Pareto; most calls near MIN, a few very slow).
+With ``chunk`` > 0 the output is paced out in chunks of that many characters,
+``chunk_delay`` seconds apart, so long answers take longer.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import random
+from dataclasses import dataclass, replace
+from types import SimpleNamespace
+from typing import AsyncIterator, Optional
+
+from . import budget
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class RateLimitError(Exception):
+    """Simulated HTTP 429; ``retry_after`` mirrors the Retry-After header."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"429 Too Many Requests (retry after {retry_after:g}s)")
+        self.retry_after = retry_after
+        self.headers = {"retry-after": f"{retry_after:g}"}
+
+
+class InternalServerError(Exception):
+    """Simulated HTTP 500."""
+
+    status_code = 500
+
+
+@dataclass(frozen=True)
+class FakeProfile:
+    latency: str = "fixed:0"
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 2.0
+    chunk_chars: int = 0
+    chunk_delay: float = 0.0
+    max_latency: float = 120.0
+    tokens: bool = True
+
+    @property
+    def active(self) -> bool:
+        return (
+            self.latency not in ("", "0", "fixed:0")
+            or self.error_rate > 0
+            or self.rate_limit_rate > 0
+            or (self.chunk_chars > 0 and self.chunk_delay > 0)
+        )
+
+
+_KEYS = {
+    "latency": ("latency", str),
+    "error": ("error_rate", float),
+    "429": ("rate_limit_rate", float),
+    "retry_after": ("retry_after", float),
+    "chunk": ("chunk_chars", int),
+    "chunk_delay": ("chunk_delay", float),
+    "max_latency": ("max_latency", float),
+    "tokens": ("tokens", lambda v: v not in ("0", "false", "off", "no")),
+}
+
+
+def from_env() -> FakeProfile:
+    return FakeProfile(
+        latency=os.getenv("SYNO_FAKE_LATENCY", "fixed:0"),
+        error_rate=_float_env("SYNO_FAKE_ERROR_RATE", 0.0),
+        rate_limit_rate=_float_env("SYNO_FAKE_429_RATE", 0.0),
+        retry_after=_float_env("SYNO_FAKE_RETRY_AFTER", 2.0),
+        chunk_chars=_int_env("SYNO_FAKE_CHUNK_CHARS", 0),
+        chunk_delay=_float_env("SYNO_FAKE_CHUNK_DELAY", 0.0),
+        max_latency=_float_env("SYNO_FAKE_MAX_LATENCY", 120.0),
+        tokens=os.getenv("SYNO_FAKE_TOKENS", "1") in ("1", "true", "True", "yes", "on"),
+    )
+
+
+def profile(spec: Optional[str] = None) -> FakeProfile:
+    """Env settings overlaid with ``key=value;...`` from ``spec`` (unknown keys ignored)."""
+    p = from_env()
+    if not spec:
+        return p
+    changes = {}
+    for item in spec.split(";"):
+        key, _, value = item.partition("=")
+        field = _KEYS.get(key.strip().lower())
+        if field is None or not value.strip():
+            continue
+        try:
+            changes[field[0]] = field[1](value.strip())
+        except ValueError:
+            continue
+    return replace(p, **changes)
+
+
+_rng = random.Random(os.getenv("SYNO_FAKE_SEED") or None)
+
+
+def sample_latency(p: FakeProfile, rng: random.Random = _rng) -> float:
+    kind, _, args = p.latency.partition(":")
+    try:
+        vals = [float(x) for x in args.split(",") if x.strip()] if args else [float(kind)]
+    except ValueError:
+        return 0.0
+    kind = kind.strip().lower()
+    if kind == "lognormal":
+        median, sigma = (vals + [0.5])[:2]
+        value = rng.lognormvariate(math.log(max(median, 1e-6)), sigma)
+    elif kind in ("heavytail", "pareto"):
+        minimum, alpha = (vals + [1.5])[:2]
+        value = minimum * rng.paretovariate(max(alpha, 0.1))
+    else:  # fixed:S or a bare number
+        value = vals[0] if vals else 0.0
+    return max(0.0, min(p.max_latency, value))
+
+
+def chunks(text: str, size: int) -> list[str]:
+    if size <= 0 or not text:
+        return [text]
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+async def stream(p: FakeProfile, text: str, rng: random.Random = _rng) -> AsyncIterator[str]:
+    """Yield ``text`` the way a vendor would: fail or wait for the first chunk, then pace the rest."""
+    if p.rate_limit_rate > 0 and rng.random() < p.rate_limit_rate:
+        raise RateLimitError(p.retry_after)
+    first = sample_latency(p, rng)
+    if first > 0:
+        await asyncio.sleep(first)
+    if p.error_rate > 0 and rng.random() < p.error_rate:
+        raise InternalServerError("500 Internal Server Error (injected)")
+    for i, chunk in enumerate(chunks(text, p.chunk_chars)):
+        if i and p.chunk_delay > 0:
+            await asyncio.sleep(p.chunk_delay)
+        yield chunk
+
+
+async def respond(p: FakeProfile, text: str) -> str:
+    """Non-streaming call: same timing and failures as ``stream``, whole text at the end."""
+    return "".join([c async for c in stream(p, text)])
+
+
+def usage(prompt: str, completion: str, model: Optional[str] = None) -> SimpleNamespace:
+    """``resp``-shaped object whose ``usage`` carries estimated token counts."""
+    pt, ct = budget.estimate(prompt, model), budget.estimate(completion, model)
+    return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=pt, completion_tokens=ct, total_tokens=pt + ct))
@@ -1,14 +1,16 @@
 import asyncio
 import os
-from typing import Optional
+import weakref
+from typing import Awaitable, Callable, Iterable, Optional
 
 from sqlalchemy.orm import Session
 
 from ..db import SessionLocal
-from ..models import Answer, Question, User, Persona, Comment, VoteTarget
+from ..models import Answer, Question, User, Persona, Comment, Vote, VoteTarget
 from .dedupe import content_hash, is_duplicate
 from .llm import LLMClient, config_from_dict
-from .context import build_answer_background, build_comment_background
+from .context import build_answer_background, build_comment_background, ctx_from_dict
+from . import deadline, jobs, load, progress, quota, scheduler, scoring, tracing
 
 
 PERSONAS = ["学者", "工程师", "创作者"]
@@ -31,43 +33,136 @@ def _default_persona_prompt() -> str:
     )
 
 
+# --- Single-flight registry ---
+# key: (question_id, trigger, user_id, persona set) -> (job_id, task)
+_inflight: dict[tuple, tuple[str, asyncio.Task]] = {}
+
+
+def flight_key(
+    question_id: int, trigger: str, personas: Iterable[str], user_id: Optional[int] = None
+) -> tuple:
+    return (int(question_id), trigger, user_id, tuple(sorted({str(p) for p in personas})))
+
+
+def run_single_flight(key: tuple, kind: str, make: Callable[[str], Awaitable]) -> tuple[str, bool]:
+    """Start ``make(job_id)`` unless an identical run is already in flight.
+
+    Returns ``(job_id, started)``; a coalesced caller gets the running job's id
+    and can follow it on /q/{qid}/status.
+    """
+    hit = _inflight.get(key)
+    if hit is not None and not hit[1].done():
+        return hit[0], False
+    job_id = progress.enqueue(key[0], kind)
+    task = jobs.spawn(make(job_id), name=f"gen:{key[0]}:{key[1]}")
+    _inflight[key] = (job_id, task)
+
+    def _release(t: asyncio.Task) -> None:
+        if _inflight.get(key, (None, None))[1] is t:
+            _inflight.pop(key, None)
+
+    task.add_done_callback(_release)
+    return job_id, True
+
+
+def inflight_for_question(question_id: int, exclude: Optional[tuple] = None) -> list[asyncio.Task]:
+    """Running generation flights for the question; regen flights are never included.
+
+    Regens wait on these, so listing other regens here would let two of them
+    await each other forever; they are serialized by ``_regen_lock`` instead.
+    """
+    return [
+        task
+        for key, (_, task) in list(_inflight.items())
+        if key[0] == question_id and key[1] != "regen" and key != exclude and not task.done()
+    ]
+
+
+# one lock per question while any regen holds or waits for it
+_regen_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _regen_lock(question_id: int) -> asyncio.Lock:
+    lock = _regen_locks.get(question_id)
+    if lock is None:
+        lock = _regen_locks[question_id] = asyncio.Lock()
+    return lock
+
+
+def default_personas(user_preset: Optional[str]) -> list[str]:
+    personas = list(PERSONAS)
+    if user_preset:
+        personas.append("我的人格")
+    return personas
+
+
 async def generate_for_question(
     question_id: int,
     user_preset: Optional[str] = None,
     override_cfg: Optional[dict] = None,
+    job_id: Optional[str] = None,
+    priority: str = scheduler.BACKGROUND,
+    ticket: Optional[quota.Ticket] = None,
 ) -> None:
+    job_deadline = deadline.start_job()
+    trace: Optional[tracing.Trace] = None
     db: Session = SessionLocal()
     try:
         q = db.get(Question, question_id)
         if not q:
             return
+        scheduler.bind(priority, q.author_id)
 
         cfg = config_from_dict(override_cfg) or None
         client = LLMClient(cfg)
-        personas = list(PERSONAS)
-        if user_preset:
-            personas.append("我的人格")
+        lvl = load.level()
+        personas = load.shed_personas(default_personas(user_preset), lvl)
+        if ticket is not None:
+            personas = personas[: ticket.take(len(personas))]
+        use_context = not load.applies(load.NO_CONTEXT, lvl)
+        judge = not load.applies(load.HEURISTIC_SCORE, lvl)
+        job_id = progress.start(question_id, job_id, "answer", personas)
+        trace = tracing.start(question_id, job_id, "answer")
 
         accepted_texts: list[str] = []
         answers_to_create: list[Answer] = []
 
         async def gen_one(persona: str):
+            progress.mark(question_id, job_id, persona, progress.RUNNING)
+            tracing.persona(persona)
             preset = user_preset if persona == "我的人格" else None
-            background = build_answer_background(db, q, override_cfg)
-            merged = q.content or ""
-            if background:
-                merged = (merged + "\n\n[背景]\n" + background).strip()
+            background = build_answer_background(db, q, override_cfg) if use_context else ""
             txt = await client.generate_answer(
-                persona=persona, title=q.title, content=(merged or None), user_preset=preset
+                persona=persona,
+                title=q.title,
+                content=(q.content or None),
+                user_preset=preset,
+                background=(background or None),
             )
-            score = await client.evaluate_quality(q.title, q.content or "", txt)
-            return persona, txt, score
+            return persona, txt
 
-        gens = await asyncio.gather(*[gen_one(p) for p in personas])
-        for persona, txt, score in gens:
-            if not txt or is_duplicate(txt, accepted_texts):
+        gens = [g for g in await deadline.gather_within(job_deadline, [gen_one(p) for p in personas]) if g]
+        kept: list[tuple[str, str]] = []
+        for persona, txt in gens:
+            with tracing.span("dedupe", persona=persona):
+                dup = not txt or is_duplicate(txt, accepted_texts)
+            if dup:
                 continue
             accepted_texts.append(txt)
+            kept.append((persona, txt))
+
+        existing = [s for (s,) in db.query(Answer.quality_score).filter(Answer.question_id == q.id).all()]
+        with tracing.span("score"):
+            scores = await scoring.score_answers(
+                client,
+                q.title,
+                q.content or "",
+                [t for _, t in kept],
+                existing,
+                ctx_from_dict(override_cfg)["ctx_topk"],
+                judge=judge,
+            )
+        for (persona, txt), score in zip(kept, scores):
             ans = Answer(
                 question_id=q.id,
                 persona=persona,
@@ -79,9 +174,14 @@ async def generate_for_question(
 
         for a in answers_to_create:
             db.add(a)
-        db.commit()
+        with tracing.span("commit"):
+            deadline.commit_within(db, job_deadline)
+        for persona, _ in gens:
+            progress.mark(question_id, job_id, persona, progress.DONE)
     finally:
         db.close()
+        progress.settle(question_id, job_id)
+        tracing.finish(trace)
 
 
 async def generate_user_personas_for_question(
@@ -89,13 +189,19 @@ async def generate_user_personas_for_question(
     user_id: int,
     override_cfg: Optional[dict] = None,
     persona_ids: Optional[list[str]] = None,
+    job_id: Optional[str] = None,
+    priority: str = scheduler.INTERACTIVE,
+    ticket: Optional[quota.Ticket] = None,
 ) -> None:
+    job_deadline = deadline.start_job()
+    trace: Optional[tracing.Trace] = None
     db: Session = SessionLocal()
     try:
         q = db.get(Question, question_id)
         user = db.get(User, user_id)
         if not q or not user:
             return
+        scheduler.bind(priority, user_id)
         personas = (
             db.query(Persona)
             .filter(Persona.user_id == user_id, Persona.is_active == 1)
@@ -123,27 +229,53 @@ async def generate_user_personas_for_question(
 
         cfg = config_from_dict(override_cfg) or None
         client = LLMClient(cfg)
+        lvl = load.level()
+        personas = load.shed_personas(personas, lvl)
+        if ticket is not None:
+            personas = personas[: ticket.take(len(personas))]
+        use_context = not load.applies(load.NO_CONTEXT, lvl)
+        judge = not load.applies(load.HEURISTIC_SCORE, lvl)
+        job_id = progress.start(question_id, job_id, "answer", [(p.id, p.name) for p in personas])
+        trace = tracing.start(question_id, job_id, "answer")
 
-        existing = [a.content for a in db.query(Answer).filter(Answer.question_id == q.id).all()]
-        accepted = list(existing)
+        existing = db.query(Answer).filter(Answer.question_id == q.id).all()
+        accepted = [a.content for a in existing]
         created: list[Answer] = []
 
         async def gen(p: Persona):
-            background = build_answer_background(db, q, override_cfg)
-            merged = q.content or ""
-            if background:
-                merged = (merged + "\n\n[背景]\n" + background).strip()
+            progress.mark(question_id, job_id, p.id, progress.RUNNING)
+            tracing.persona(p.name)
+            background = build_answer_background(db, q, override_cfg) if use_context else ""
             txt = await client.generate_answer(
-                persona=p.name, title=q.title, content=(merged or None), user_preset=p.prompt
+                persona=p.name,
+                title=q.title,
+                content=(q.content or None),
+                user_preset=p.prompt,
+                background=(background or None),
             )
-            score = await client.evaluate_quality(q.title, q.content or "", txt)
-            return p, txt, score
+            return p, txt
 
-        gens = await asyncio.gather(*[gen(p) for p in personas])
-        for p, txt, score in gens:
-            if not txt or is_duplicate(txt, accepted):
+        gens = [g for g in await deadline.gather_within(job_deadline, [gen(p) for p in personas]) if g]
+        kept: list[tuple[Persona, str]] = []
+        for p, txt in gens:
+            with tracing.span("dedupe", persona=p.name):
+                dup = not txt or is_duplicate(txt, accepted)
+            if dup:
                 continue
             accepted.append(txt)
+            kept.append((p, txt))
+
+        with tracing.span("score"):
+            scores = await scoring.score_answers(
+                client,
+                q.title,
+                q.content or "",
+                [t for _, t in kept],
+                [a.quality_score for a in existing],
+                ctx_from_dict(override_cfg)["ctx_topk"],
+                judge=judge,
+            )
+        for (p, txt), score in zip(kept, scores):
             a = Answer(
                 question_id=q.id,
                 persona=f"{p.name}（@{user.username}）",
@@ -154,9 +286,14 @@ async def generate_user_personas_for_question(
             created.append(a)
         for a in created:
             db.add(a)
-        db.commit()
+        with tracing.span("commit"):
+            deadline.commit_within(db, job_deadline)
+        for p, _ in gens:
+            progress.mark(question_id, job_id, p.id, progress.DONE)
     finally:
         db.close()
+        progress.settle(question_id, job_id)
+        tracing.finish(trace)
 
 
 async def generate_comments_for_question(
@@ -165,13 +302,19 @@ async def generate_comments_for_question(
     parent_id: Optional[int] = None,
     override_cfg: Optional[dict] = None,
     persona_id: Optional[str] = None,
+    job_id: Optional[str] = None,
+    priority: str = scheduler.INTERACTIVE,
+    ticket: Optional[quota.Ticket] = None,
 ) -> None:
+    job_deadline = deadline.start_job()
+    trace: Optional[tracing.Trace] = None
     db: Session = SessionLocal()
     try:
         q = db.get(Question, question_id)
         user = db.get(User, user_id)
         if not q or not user:
             return
+        scheduler.bind(priority, user_id)
         personas = (
             db.query(Persona)
             .filter(Persona.user_id == user_id, Persona.is_active == 1)
@@ -188,28 +331,33 @@ async def generate_comments_for_question(
             prompt = user.prompt_preset or _default_persona_prompt()
             personas = [Persona(id=0, user_id=user_id, name="默认人格", prompt=prompt, is_active=1)]  # type: ignore
         personas = personas[: _comment_personas_max()]
+        if ticket is not None:
+            personas = personas[: ticket.take(len(personas))]
         cfg = config_from_dict(override_cfg) or None
         client = LLMClient(cfg)
+        use_context = not load.applies(load.NO_CONTEXT, load.level())
+        job_id = progress.start(question_id, job_id, "comment", [(p.id, p.name) for p in personas])
+        trace = tracing.start(question_id, job_id, "comment")
         parent_text = None
         if parent_id:
             pc = db.get(Comment, parent_id)
             parent_text = pc.content if pc else None
 
         async def gen(p: Persona):
-            background = build_comment_background(db, q, override_cfg)
-            merged = q.content or ""
-            if background:
-                merged = (merged + "\n\n[背景]\n" + background).strip()
+            progress.mark(question_id, job_id, p.id, progress.RUNNING)
+            tracing.persona(p.name)
+            background = build_comment_background(db, q, override_cfg) if use_context else ""
             txt = await client.generate_comment(
                 persona=p.name,
                 title=q.title,
-                content=(merged or None),
+                content=(q.content or None),
                 reply_to=parent_text,
                 user_preset=p.prompt,
+                background=(background or None),
             )
             return p, txt
 
-        results = await asyncio.gather(*[gen(p) for p in personas])
+        results = [r for r in await deadline.gather_within(job_deadline, [gen(p) for p in personas]) if r]
         for p, txt in results:
             if not txt:
                 continue
@@ -221,7 +369,164 @@ async def generate_comments_for_question(
                 content=f"（{p.name}）{txt}",
             )
             db.add(c)
-        db.commit()
+        with tracing.span("commit"):
+            deadline.commit_within(db, job_deadline)
+        for p, _ in results:
+            progress.mark(question_id, job_id, p.id, progress.DONE)
     finally:
         db.close()
+        progress.settle(question_id, job_id)
+        tracing.finish(trace)
+
+
+def regen_below() -> int:
+    try:
+        return int(os.getenv("SYNO_REGEN_BELOW", "60"))
+    except Exception:
+        return 60
 
+
+def regen_targets(
+    db: Session, question_id: int, answer_ids: Optional[list] = None, below: Optional[int] = None
+) -> list[Answer]:
+    """Answers to regenerate: the chosen ids, else those scoring below the threshold."""
+    query = db.query(Answer).filter(Answer.question_id == question_id)
+    if answer_ids:
+        ids = [int(i) for i in answer_ids if str(i).isdigit()]
+        return query.filter(Answer.id.in_(ids)).order_by(Answer.id.asc()).all()
+    threshold = regen_below() if below is None else int(below)
+    return query.filter(Answer.quality_score < threshold).order_by(Answer.id.asc()).all()
+
+
+def _persona_for_label(db: Session, label: str, user_preset: Optional[str]) -> tuple[str, Optional[str]]:
+    """Persona name and preset that produced an answer labelled ``label``."""
+    if label == "我的人格":
+        return label, user_preset
+    if label.endswith("）") and "（@" in label:
+        name, _, username = label[:-1].partition("（@")
+        owner = db.query(User).filter(User.username == username).first()
+        if owner:
+            p = (
+                db.query(Persona)
+                .filter(Persona.user_id == owner.id, Persona.name == name)
+                .order_by(Persona.id.desc())
+                .first()
+            )
+            if p:
+                return name, p.prompt
+            if name == "默认人格":
+                return name, owner.prompt_preset or _default_persona_prompt()
+        return name, None
+    return label, None
+
+
+async def regenerate_question(
+    question_id: int,
+    user_preset: Optional[str] = None,
+    override_cfg: Optional[dict] = None,
+    user_id: Optional[int] = None,
+    job_id: Optional[str] = None,
+    flight: Optional[tuple] = None,
+    ticket: Optional[quota.Ticket] = None,
+    answer_ids: Optional[list] = None,
+    below: Optional[int] = None,
+) -> None:
+    """Regenerate selected (or low-scoring) answers and swap them in with one commit.
+
+    Untouched answers keep their ids and votes. A replacement that fails or
+    duplicates another answer leaves the old answer in place.
+    """
+    async with _regen_lock(question_id):
+        pending = inflight_for_question(question_id, exclude=flight)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        await _regenerate(question_id, user_preset, override_cfg, user_id, job_id, ticket, answer_ids, below)
+
+
+async def _regenerate(
+    question_id: int,
+    user_preset: Optional[str],
+    override_cfg: Optional[dict],
+    user_id: Optional[int],
+    job_id: Optional[str],
+    ticket: Optional[quota.Ticket],
+    answer_ids: Optional[list],
+    below: Optional[int],
+) -> None:
+    job_deadline = deadline.start_job()
+    trace: Optional[tracing.Trace] = None
+    db: Session = SessionLocal()
+    try:
+        q = db.get(Question, question_id)
+        if not q:
+            return
+        scheduler.bind(scheduler.BACKGROUND, user_id)
+        targets = regen_targets(db, question_id, answer_ids, below)
+        lvl = load.level()
+        targets = load.shed_personas(targets, lvl)
+        if ticket is not None:
+            targets = targets[: ticket.take(len(targets))]
+        use_context = not load.applies(load.NO_CONTEXT, lvl)
+        judge = not load.applies(load.HEURISTIC_SCORE, lvl)
+        client = LLMClient(config_from_dict(override_cfg) or None)
+        job_id = progress.start(question_id, job_id, "answer", [(a.id, a.persona) for a in targets])
+        trace = tracing.start(question_id, job_id, "answer")
+        background = build_answer_background(db, q, override_cfg) if use_context else ""
+
+        async def gen(a: Answer):
+            progress.mark(question_id, job_id, a.id, progress.RUNNING)
+            tracing.persona(a.persona)
+            name, preset = _persona_for_label(db, a.persona, user_preset)
+            txt = await client.generate_answer(
+                persona=name,
+                title=q.title,
+                content=(q.content or None),
+                user_preset=preset,
+                background=(background or None),
+            )
+            return a, txt
+
+        gens = [g for g in await deadline.gather_within(job_deadline, [gen(a) for a in targets]) if g]
+        target_ids = [a.id for a in targets]
+        kept = db.query(Answer).filter(Answer.question_id == q.id, ~Answer.id.in_(target_ids)).all()
+        accepted = [a.content for a in kept]
+        swaps: list[tuple[Answer, str]] = []
+        for old, txt in gens:
+            with tracing.span("dedupe", persona=old.persona):
+                dup = not txt or is_duplicate(txt, accepted)
+            if dup:
+                continue
+            accepted.append(txt)
+            swaps.append((old, txt))
+
+        with tracing.span("score"):
+            scores = await scoring.score_answers(
+                client,
+                q.title,
+                q.content or "",
+                [t for _, t in swaps],
+                [a.quality_score for a in kept],
+                ctx_from_dict(override_cfg)["ctx_topk"],
+                judge=judge,
+            )
+        for (old, txt), score in zip(swaps, scores):
+            db.add(
+                Answer(
+                    question_id=q.id,
+                    persona=old.persona,
+                    content=txt,
+                    content_hash=content_hash(txt),
+                    quality_score=int(score),
+                )
+            )
+            db.query(Vote).filter(Vote.target_type == VoteTarget.answer, Vote.target_id == old.id).delete()
+            db.delete(old)
+        done_ids = [old.id for old, _ in gens]
+        with tracing.span("commit"):
+            deadline.commit_within(db, job_deadline)
+        for old_id in done_ids:
+            progress.mark(question_id, job_id, old_id, progress.DONE)
+    finally:
+        db.close()
+        progress.settle(question_id, job_id)
+        tracing.finish(trace)
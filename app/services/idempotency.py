@@ -0,0 +1,70 @@
+"""Short-lived idempotency keys for form submissions (e.g. double-clicked /ask)."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha1
+from typing import Optional
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class IdempotencyCache:
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[object]:
+        with self._lock:
+            hit = self._items.get(key)
+            if not hit:
+                return None
+            expires, value = hit
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            return value
+
+    def put(self, key: str, value: object, ttl: float) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+# explicit keys (hidden form field) vs. content fingerprints (no key sent)
+KEY_TTL = _int_env("SYNO_IDEMPOTENCY_TTL", 600)
+FINGERPRINT_TTL = _int_env("SYNO_IDEMPOTENCY_FINGERPRINT_TTL", 30)
+
+submissions = IdempotencyCache()
+
+
+def submission_keys(scope: str, idem_key: Optional[str], *fields: Optional[str]) -> list[tuple[str, float]]:
+    """Cache keys (with TTL) under which a submission is remembered."""
+    digest = sha1("\x1f".join((f or "").strip() for f in fields).encode("utf-8")).hexdigest()
+    keys = [(f"{scope}:fp:{digest}", float(FINGERPRINT_TTL))]
+    if idem_key:
+        keys.insert(0, (f"{scope}:key:{idem_key.strip()[:64]}", float(KEY_TTL)))
+    return keys
+
+
+def lookup(keys: list[tuple[str, float]]) -> Optional[object]:
+    for key, _ in keys:
+        value = submissions.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def remember(keys: list[tuple[str, float]], value: object) -> None:
+    for key, ttl in keys:
+        submissions.put(key, value, ttl)
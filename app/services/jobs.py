@@ -0,0 +1,29 @@
+"""Fire-and-forget generation jobs detached from the HTTP request."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable
+
+
+log = logging.getLogger("syno.jobs")
+
+_tasks: set[asyncio.Task] = set()
+
+
+def _done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.error("background job %s failed", task.get_name(), exc_info=task.exception())
+
+
+def spawn(coro: Awaitable, name: str | None = None) -> asyncio.Task:
+    """Schedule ``coro`` on the running loop and keep a strong reference to it."""
+    task = asyncio.get_running_loop().create_task(coro, name=name)  # type: ignore[arg-type]
+    _tasks.add(task)
+    task.add_done_callback(_done)
+    return task
+
+
+def pending() -> int:
+    return len(_tasks)
@@ -1,9 +1,21 @@
+import asyncio
+import json
+import logging
 import os
-from dataclasses import dataclass
-from typing import Optional
+import time
+import weakref
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Awaitable, Optional
 
+from .. import metrics
+from . import budget, cassette, deadline, fake, providers, scheduler, tracing
 
-@dataclass
+
+log = logging.getLogger("syno.llm")
+
+
+@dataclass(frozen=True)
 class LLMConfig:
     # provider: fake | openai | compat
     provider: str
@@ -13,6 +25,47 @@ class LLMConfig:
     base_url: Optional[str] = None
     api_key: Optional[str] = None
     temperature: float = 0.4
+    # per-task routing (None = use provider/model above); provider_* takes fake | openai | compat preset name
+    model_answer: Optional[str] = None
+    model_comment: Optional[str] = None
+    model_eval: Optional[str] = None
+    provider_answer: Optional[str] = None
+    provider_comment: Optional[str] = None
+    provider_eval: Optional[str] = None
+    # fake provider behaviour, "latency=lognormal:0.8,0.5;error=0.02;429=0.05" (see services/fake.py)
+    fake_profile: Optional[str] = None
+
+    def for_task(self, task: str) -> "LLMConfig":
+        return route_for_task(self, task)
+
+
+TASKS = ("answer", "comment", "eval")
+_ROUTE_FIELDS = tuple(f"{kind}_{t}" for kind in ("model", "provider") for t in TASKS)
+
+
+# Built-in base_url presets for popular OpenAI-compatible vendors
+PRESET_BASE_URLS = {
+    # Aggregators
+    "openrouter": "https://openrouter.ai/api/v1",
+    # Vendors
+    "groq": "https://api.groq.com/openai/v1",
+    "deepseek": "https://api.deepseek.com",
+    "dashscope": "https://dashscope.aliyuncs.com/compatible-mode/v1",  # Qwen
+    "qwen": "https://dashscope.aliyuncs.com/compatible-mode/v1",
+    "xai": "https://api.x.ai/v1",  # Grok (verify your account + model)
+    "ollama": "http://localhost:11434/v1",
+    "zhipu": "https://open.bigmodel.cn/api/paas/v4",
+    "moonshot": "https://api.moonshot.cn/v1",  # Kimi
+    "siliconflow": "https://api.siliconflow.cn/v1",
+    "doubao": "https://ark.cn-beijing.volces.com/v1",
+    # For Gemini, consider using OpenRouter (gemini-* models) or a provider that exposes OpenAI compatibility.
+}
+
+
+def preset_base_url(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    return PRESET_BASE_URLS.get(name.lower())
 
 
 def get_default_config() -> LLMConfig:
@@ -26,27 +79,6 @@ def get_default_config() -> LLMConfig:
     except Exception:
         temperature = 0.4
 
-    # Built-in base_url presets for popular OpenAI-compatible vendors
-    PRESET_BASE_URLS = {
-        # Aggregators
-        "openrouter": "https://openrouter.ai/api/v1",
-        # Vendors
-        "groq": "https://api.groq.com/openai/v1",
-        "deepseek": "https://api.deepseek.com",
-        "dashscope": "https://dashscope.aliyuncs.com/compatible-mode/v1",  # Qwen
-        "qwen": "https://dashscope.aliyuncs.com/compatible-mode/v1",
-        "xai": "https://api.x.ai/v1",  # Grok (verify your account + model)
-        "ollama": "http://localhost:11434/v1",
-        "zhipu": "https://open.bigmodel.cn/api/paas/v4",
-        "moonshot": "https://api.moonshot.cn/v1",  # Kimi
-        "siliconflow": "https://api.siliconflow.cn/v1",
-        "doubao": "https://ark.cn-beijing.volces.com/v1",
-        # For Gemini, consider using OpenRouter (gemini-* models) or a provider that exposes OpenAI compatibility.
-    }
-    def preset_base_url(name: Optional[str]) -> Optional[str]:
-        if not name:
-            return None
-        return PRESET_BASE_URLS.get(name.lower())
     if provider not in {"fake", "openai", "compat"}:
         provider = "fake"
     if provider == "compat" and not base_url and compat_name:
@@ -59,12 +91,25 @@ def get_default_config() -> LLMConfig:
         base_url=base_url,
         api_key=api_key,
         temperature=temperature,
+        **_task_routes_from_env(),
     )
 
 
-def config_from_dict(d: Optional[dict]) -> Optional[LLMConfig]:
-    if not d:
-        return None
+def _task_routes_from_env() -> dict:
+    # SYNO_LLM_MODEL_EVAL / SYNO_LLM_MODEL_COMMENT / SYNO_LLM_PROVIDER_EVAL ...
+    routes = {}
+    for t in TASKS:
+        routes[f"model_{t}"] = os.getenv(f"SYNO_LLM_MODEL_{t.upper()}") or None
+        routes[f"provider_{t}"] = (os.getenv(f"SYNO_LLM_PROVIDER_{t.upper()}") or "").lower() or None
+    return routes
+
+
+_CONFIG_FIELDS = ("provider", "model", "compat_name", "base_url", "api_key", "temperature", "fake_profile") + _ROUTE_FIELDS
+_CONFIG_CACHE: dict[str, LLMConfig] = {}
+_CONFIG_CACHE_MAX = 256
+
+
+def _parse_config(d: dict) -> Optional[LLMConfig]:
     try:
         # try fill preset base_url if compat
         base_url = d.get("base_url")
@@ -73,6 +118,7 @@ def config_from_dict(d: Optional[dict]) -> Optional[LLMConfig]:
         if provider == "compat" and not base_url and compat_name:
             base_url = preset_base_url(compat_name)
 
+        env_routes = _task_routes_from_env()
         return LLMConfig(
             provider=d.get("provider", "fake"),
             model=d.get("model", "gpt-4o-mini"),
@@ -80,14 +126,215 @@ def config_from_dict(d: Optional[dict]) -> Optional[LLMConfig]:
             base_url=base_url,
             api_key=d.get("api_key"),
             temperature=float(d.get("temperature", 0.4)),
+            fake_profile=d.get("fake_profile") or None,
+            **{k: (d.get(k) or env_routes[k]) for k in _ROUTE_FIELDS},
         )
     except Exception:
         return None
 
 
+def config_from_dict(d: Optional[dict]) -> Optional[LLMConfig]:
+    """Session dict -> LLMConfig, parsed once per distinct setting."""
+    if not d:
+        return None
+    key = json.dumps({k: d.get(k) for k in _CONFIG_FIELDS}, sort_keys=True, default=str)
+    cfg = _CONFIG_CACHE.get(key)
+    if cfg is None:
+        cfg = _parse_config(d)
+        if cfg is None:
+            return None
+        if len(_CONFIG_CACHE) >= _CONFIG_CACHE_MAX:
+            _CONFIG_CACHE.pop(next(iter(_CONFIG_CACHE)))
+        _CONFIG_CACHE[key] = cfg
+    return cfg
+
+
+def _llm_timeout() -> float:
+    try:
+        return float(os.getenv("SYNO_LLM_TIMEOUT", "30"))
+    except Exception:
+        return 30.0
+
+
+def _provider_entry(entry: str, primary: LLMConfig) -> Optional[LLMConfig]:
+    # "provider[:model]" where provider is fake | openai | a compat preset name (groq, deepseek, ...)
+    name, _, model = entry.strip().partition(":")
+    name = name.strip().lower()
+    model = model.strip() or primary.model
+    if not name:
+        return None
+    if name == "fake":
+        return LLMConfig(provider="fake", model=model, temperature=primary.temperature, fake_profile=primary.fake_profile)
+    if name == "openai":
+        return LLMConfig(
+            provider="openai",
+            model=model,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            temperature=primary.temperature,
+        )
+    base_url = preset_base_url(name)
+    if not base_url:
+        return None
+    return LLMConfig(
+        provider="compat",
+        model=model,
+        compat_name=name,
+        base_url=base_url,
+        api_key=os.getenv(f"SYNO_LLM_API_KEY_{name.upper()}"),
+        temperature=primary.temperature,
+    )
+
+
+@lru_cache(maxsize=128)
+def fallback_chain(primary: LLMConfig) -> tuple[LLMConfig, ...]:
+    """Primary provider followed by SYNO_LLM_FALLBACK entries (e.g. "openai:gpt-4o-mini,fake")."""
+    chain = [primary]
+    for entry in os.getenv("SYNO_LLM_FALLBACK", "").split(","):
+        cfg = _provider_entry(entry, primary)
+        if cfg is not None and all(provider_label(c) != provider_label(cfg) for c in chain):
+            chain.append(cfg)
+    return tuple(chain)
+
+
+@lru_cache(maxsize=256)
+def route_for_task(cfg: LLMConfig, task: str) -> LLMConfig:
+    """Config actually used for ``task`` (answer/comment/eval; consensus follows answer)."""
+    t = "answer" if task == "consensus" else task
+    model = getattr(cfg, f"model_{t}", None)
+    provider = getattr(cfg, f"provider_{t}", None)
+    base = replace(cfg, **{k: None for k in _ROUTE_FIELDS})
+    if provider and provider not in (cfg.provider, (cfg.compat_name or "").lower()):
+        routed = _provider_entry(f"{provider}:{model or ''}", base)
+        if routed is not None:
+            return routed
+    return replace(base, model=model) if model else base
+
+
+def provider_label(cfg: LLMConfig) -> str:
+    if cfg.provider == "compat":
+        return f"compat:{cfg.compat_name or cfg.base_url or '-'}"
+    return cfg.provider
+
+
+# AsyncOpenAI clients are pooled per endpoint/key (and event loop) so calls reuse connections;
+# a loop's clients go away with the loop.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, object]]" = weakref.WeakKeyDictionary()
+
+
+def openai_client(cfg: LLMConfig):
+    from openai import AsyncOpenAI  # lazy import
+
+    pool = _clients.setdefault(asyncio.get_running_loop(), {})
+    key = (cfg.base_url, cfg.api_key)
+    client = pool.get(key)
+    if client is None:
+        client = pool[key] = AsyncOpenAI(api_key=cfg.api_key, base_url=cfg.base_url, max_retries=0)
+    return client
+
+
+def _hedging_enabled() -> bool:
+    return os.getenv("SYNO_LLM_HEDGE", "0") in ("1", "true", "True", "yes", "on")
+
+
+LLM_TIMEOUTS = metrics.counter(
+    "syno_llm_timeouts_total", "LLM calls that hit their timeout or job deadline", ["provider", "task"]
+)
+LLM_FALLBACKS = metrics.counter(
+    "syno_llm_fallbacks_total", "Calls retried on the next provider after an error", ["from_provider", "to_provider", "task"]
+)
+LLM_HEDGES = metrics.counter(
+    "syno_llm_hedges_total", "Hedged second requests and which side won", ["provider", "outcome"]
+)
+
+
+LLM_LATENCY = metrics.histogram(
+    "syno_llm_latency_seconds", "Successful LLM call latency", ["provider", "model", "task"]
+)
+LLM_CALLS = metrics.counter(
+    "syno_llm_calls_total", "LLM provider attempts", ["provider", "model", "task", "outcome"]
+)
+LLM_TOKENS = metrics.counter(
+    "syno_llm_tokens_total", "Tokens reported by the provider (resp.usage)", ["provider", "model", "task", "kind"]
+)
+LLM_ERRORS = metrics.counter(
+    "syno_llm_errors_total", "Failed LLM provider attempts by error class", ["provider", "model", "task", "error"]
+)
+LLM_REQUESTS = metrics.histogram(
+    "syno_llm_request_seconds",
+    "End-to-end LLMClient calls (queueing, failover and hedging included)",
+    ["task", "outcome"],
+)
+LLM_DEGRADED = metrics.counter(
+    "syno_llm_degraded_total", "Calls answered with the caller's fallback value instead of a model result", ["task", "reason"]
+)
+
+
+def _error_class(e: BaseException) -> str:
+    if isinstance(e, LLMTimeout):
+        return "timeout"
+    if isinstance(e, LLMBadOutput):
+        return "bad_output"
+    return type(e).__name__
+
+
+def _record_usage(cfg: LLMConfig, task: str, resp) -> None:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return
+    label = provider_label(cfg)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        n = getattr(usage, kind, None)
+        if n:
+            LLM_TOKENS.inc(n, provider=label, model=cfg.model, task=task, kind=kind.split("_")[0])
+
+
+PROMPT_TOKENS = metrics.histogram(
+    "syno_llm_prompt_tokens",
+    "Estimated input tokens per call after budgeting",
+    ["provider", "model", "task"],
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+PROMPT_TRIMS = metrics.counter(
+    "syno_llm_prompt_trims_total", "Prompt parts cut to fit the input budget", ["task", "part"]
+)
+
+
+class LLMTimeout(Exception):
+    pass
+
+
+class LLMDeadline(LLMTimeout):
+    """The job's own deadline ran out; not held against the provider."""
+
+
+class LLMUnavailable(Exception):
+    pass
+
+
+class LLMBadOutput(Exception):
+    pass
+
+
 class LLMClient:
-    def __init__(self, cfg: Optional[LLMConfig] = None) -> None:
+    def __init__(self, cfg: Optional[LLMConfig] = None, providers: Optional[list[LLMConfig]] = None) -> None:
         self.cfg = cfg or get_default_config()
+        self._explicit = providers is not None
+        self.providers = list(providers or fallback_chain(route_for_task(self.cfg, "answer")))
+
+    def _chain(self, task: str) -> list[LLMConfig]:
+        if self._explicit:
+            return self.providers
+        return list(fallback_chain(route_for_task(self.cfg, task)))
+
+    def _timeout(self) -> float:
+        # per-call timeout, capped by the job deadline if one is active
+        return max(0.001, deadline.call_timeout(_llm_timeout()))
+
+    @staticmethod
+    def _check_deadline(task: str) -> None:
+        d = deadline.current()
+        if d is not None and d.expired:
+            raise LLMDeadline(f"{task}: job deadline passed")
 
     async def generate_answer(
         self,
@@ -95,25 +342,16 @@ class LLMClient:
         title: str,
         content: Optional[str] = None,
         user_preset: Optional[str] = None,
+        background: Optional[str] = None,
     ) -> str:
-        if self.cfg.provider == "fake":
-            return self._fake_answer(persona, title, content, user_preset)
-        elif self.cfg.provider in {"openai", "compat"}:
-            return await self._openai_like_answer(persona, title, content, user_preset)
-        else:
-            return self._fake_answer(persona, title, content, user_preset)
+        return await self._run("answer", persona, title, content, user_preset, background)
 
     async def summarize_consensus(
         self,
         title: str,
         answers: list[str],
     ) -> dict:
-        if self.cfg.provider == "fake":
-            return self._fake_consensus(title, answers)
-        elif self.cfg.provider in {"openai", "compat"}:
-            return await self._openai_like_consensus(title, answers)
-        else:
-            return self._fake_consensus(title, answers)
+        return await self._run("consensus", title, answers)
 
     async def generate_comment(
         self,
@@ -122,17 +360,197 @@ class LLMClient:
         content: Optional[str] = None,
         reply_to: Optional[str] = None,
         user_preset: Optional[str] = None,
+        background: Optional[str] = None,
     ) -> str:
-        if self.cfg.provider == "fake":
-            return self._fake_comment(persona, title, content, reply_to, user_preset)
-        elif self.cfg.provider in {"openai", "compat"}:
-            return await self._openai_like_comment(persona, title, content, reply_to, user_preset)
-        else:
-            return self._fake_comment(persona, title, content, reply_to, user_preset)
+        return await self._run("comment", persona, title, content, reply_to, user_preset, background)
+
+    # --- Dispatch: priority queue, failover, hedging, breaker ---
+    async def _run(self, task: str, *args):
+        t0 = time.perf_counter()
+        outcome = "error"
+        try:
+            async with scheduler.slot():
+                tracing.record("queue", t0, time.perf_counter(), task=task)
+                result = await self._dispatch(task, args)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            LLM_REQUESTS.observe(time.perf_counter() - t0, task=task, outcome=outcome)
+
+    async def _dispatch(self, task: str, args: tuple):
+        self._check_deadline(task)
+        chain = self._chain(task)
+        # breakers are only asked to admit a call in _attempt, so skipped fallbacks keep their probe
+        candidates = [c for c in chain if providers.health(provider_label(c)).available()]
+        forced = not candidates
+        if forced:
+            # every breaker is open: still try the last resort rather than fail outright
+            candidates = chain[-1:]
+        if _hedging_enabled() and len(candidates) > 1:
+            return await self._hedged(task, candidates, args)
+        last_exc: Optional[BaseException] = None
+        for i, cfg in enumerate(candidates):
+            try:
+                return await self._attempt(cfg, task, args, forced=forced)
+            except LLMDeadline:
+                raise
+            except Exception as e:
+                last_exc = e
+                if i + 1 < len(candidates):
+                    LLM_FALLBACKS.inc(
+                        from_provider=provider_label(cfg), to_provider=provider_label(candidates[i + 1]), task=task
+                    )
+        raise LLMUnavailable(f"all providers failed for {task}: {last_exc}") from last_exc
+
+    async def _hedged(self, task: str, candidates: list[LLMConfig], args: tuple):
+        first, second, rest = candidates[0], candidates[1], candidates[2:]
+        started: list[asyncio.Task] = []
+        try:
+            t1 = asyncio.ensure_future(self._attempt(first, task, args))
+            started.append(t1)
+            done, _ = await asyncio.wait({t1}, timeout=providers.hedge_delay(provider_label(first)))
+            if done and t1.exception() is None:
+                return t1.result()
+            racing = {t1} if not done else set()
+            LLM_HEDGES.inc(provider=provider_label(second), outcome="fired" if racing else "failover")
+            t2 = asyncio.ensure_future(self._attempt(second, task, args))
+            started.append(t2)
+            racing.add(t2)
+            last_exc: Optional[BaseException] = t1.exception() if done else None
+            while racing:
+                done, racing = await asyncio.wait(racing, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None:
+                        if t is t2:
+                            LLM_HEDGES.inc(provider=provider_label(second), outcome="won")
+                        return t.result()
+                    last_exc = t.exception()
+        finally:
+            # also when we are cancelled mid-wait: no attempt outlives the call
+            for t in started:
+                if not t.done():
+                    t.cancel()
+        if isinstance(last_exc, LLMDeadline):
+            raise last_exc
+        for cfg in rest:
+            try:
+                return await self._attempt(cfg, task, args)
+            except LLMDeadline:
+                raise
+            except Exception as e:
+                last_exc = e
+        raise LLMUnavailable(f"all providers failed for {task}: {last_exc}") from last_exc
+
+    async def _attempt(self, cfg: LLMConfig, task: str, args: tuple, forced: bool = False):
+        label = provider_label(cfg)
+        h = providers.health(label)
+        self._check_deadline(task)
+        if not forced and not h.allow():
+            # lost the half-open probe to a concurrent call since the chain was filtered
+            raise LLMUnavailable(f"{label}: circuit open")
+        t0 = time.perf_counter()
+        try:
+            with tracing.span("llm", provider=label, model=cfg.model, task=task):
+                result = await self._invoke(cfg, task, args)
+        except asyncio.CancelledError:
+            LLM_CALLS.inc(provider=label, model=cfg.model, task=task, outcome="cancelled")
+            raise
+        except LLMDeadline:
+            # the caller's budget ran out: says nothing about the provider's health
+            LLM_CALLS.inc(provider=label, model=cfg.model, task=task, outcome="deadline")
+            raise
+        except Exception as e:
+            h.record_failure()
+            LLM_CALLS.inc(provider=label, model=cfg.model, task=task, outcome="error")
+            LLM_ERRORS.inc(provider=label, model=cfg.model, task=task, error=_error_class(e))
+            log.warning("%s/%s %s failed: %s: %s", label, cfg.model, task, type(e).__name__, e)
+            raise
+        elapsed = time.perf_counter() - t0
+        h.record_success(elapsed)
+        LLM_CALLS.inc(provider=label, model=cfg.model, task=task, outcome="ok")
+        LLM_LATENCY.observe(elapsed, provider=label, model=cfg.model, task=task)
+        return result
+
+    async def _invoke(self, cfg: LLMConfig, task: str, args: tuple):
+        tape = cassette.mode()
+        if tape == "replay":
+            return await self._bounded(cfg, task, cassette.replay(task, args))
+        t0 = time.perf_counter()
+        result = await self._call_provider(cfg, task, args)
+        if tape == "record":
+            cassette.record(task, args, result, provider_label(cfg), cfg.model, time.perf_counter() - t0)
+        return result
+
+    async def _call_provider(self, cfg: LLMConfig, task: str, args: tuple):
+        if cfg.provider in {"openai", "compat"}:
+            call = {
+                "answer": self._openai_like_answer,
+                "consensus": self._openai_like_consensus,
+                "comment": self._openai_like_comment,
+                "eval": self._openai_like_evaluate,
+            }[task]
+            return await self._bounded(cfg, task, call(cfg, *args))
+        local = {
+            "answer": self._fake_answer,
+            "consensus": self._fake_consensus,
+            "comment": self._fake_comment,
+            "eval": lambda title, content, answer: self._fake_evaluate(answer),
+        }[task]
+        result = local(*args)
+        prof = fake.profile(cfg.fake_profile)
+        text = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+        if prof.active:
+            await self._bounded(cfg, task, fake.respond(prof, text))
+        if prof.tokens:
+            prompt = "\n".join(a for a in args if isinstance(a, str))
+            _record_usage(cfg, task, fake.usage(prompt, text, cfg.model))
+        return result
+
+    async def _bounded(self, cfg: LLMConfig, task: str, call: Awaitable):
+        label = provider_label(cfg)
+        timeout = self._timeout()
+        try:
+            return await asyncio.wait_for(call, timeout=timeout)
+        except asyncio.TimeoutError:
+            LLM_TIMEOUTS.inc(provider=label, task=task)
+            if timeout < _llm_timeout():
+                raise LLMDeadline(f"{label}:{task} ran out of job deadline")
+            raise LLMTimeout(f"{label}:{task} timed out")
+        except asyncio.CancelledError:
+            # straggler cancelled by the job once its deadline passed
+            d = deadline.current()
+            if d is not None and d.expired:
+                LLM_TIMEOUTS.inc(provider=label, task=task)
+            raise
+        except Exception as e:
+            if type(e).__name__ == "APITimeoutError":
+                LLM_TIMEOUTS.inc(provider=label, task=task)
+                d = deadline.current()
+                if d is not None and d.expired:
+                    raise LLMDeadline(f"{label}:{task} ran out of job deadline") from e
+                raise LLMTimeout(f"{label}:{task} timed out") from e
+            raise
+
+    def _fit(self, cfg: LLMConfig, task: str, fixed: str, parts: list) -> dict[str, str]:
+        """Trim prompt parts to the task's input budget and record the final size."""
+        out, tokens, cut = budget.fit(budget.input_budget(task), fixed, parts, cfg.model)
+        PROMPT_TOKENS.observe(tokens, provider=provider_label(cfg), model=cfg.model, task=task)
+        for name in cut:
+            PROMPT_TRIMS.inc(task=task, part=name)
+        log.debug("prompt %s/%s: ~%d tokens (trimmed: %s)", cfg.model, task, tokens, ",".join(cut) or "-")
+        return out
 
     # --- Providers ---
     def _fake_answer(
-        self, persona: str, title: str, content: Optional[str], user_preset: Optional[str]
+        self,
+        persona: str,
+        title: str,
+        content: Optional[str],
+        user_preset: Optional[str],
+        background: Optional[str] = None,
     ) -> str:
         preset = f"（自定义：{user_preset}）" if user_preset else ""
         lines = [
@@ -160,7 +578,13 @@ class LLMClient:
         }
 
     def _fake_comment(
-        self, persona: str, title: str, content: Optional[str], reply_to: Optional[str], user_preset: Optional[str]
+        self,
+        persona: str,
+        title: str,
+        content: Optional[str],
+        reply_to: Optional[str],
+        user_preset: Optional[str],
+        background: Optional[str] = None,
     ) -> str:
         base = f"（{persona}）简评："
         tail = "建议关注关键点与可执行步骤。"
@@ -171,30 +595,43 @@ class LLMClient:
         return base + body + " " + tail
 
     async def _openai_like_answer(
-        self, persona: str, title: str, content: Optional[str], user_preset: Optional[str]
+        self,
+        cfg: LLMConfig,
+        persona: str,
+        title: str,
+        content: Optional[str],
+        user_preset: Optional[str],
+        background: Optional[str] = None,
     ) -> str:
-        from openai import AsyncOpenAI  # lazy import
-
-        client = AsyncOpenAI(api_key=self.cfg.api_key, base_url=self.cfg.base_url)
+        client = openai_client(cfg)
         system = (
             f"你是{persona}。以纯文本、结构化、条理清晰的风格回答问题。"
             "不输出图片或链接，优先给出可执行的步骤。"
             "若提供了[背景]内容，可参考但保持独立判断。"
         )
-        if user_preset:
-            system += f" 用户自定义偏好：{user_preset}。"
-        user_msg = f"问题：{title}\n" + (f"补充：{content}\n" if content else "")
+        parts = self._fit(
+            cfg,
+            "answer",
+            system + f" 用户自定义偏好：。问题：{title}\n补充：\n\n[背景]\n",
+            [("background", background, 0), ("preset", user_preset, 64), ("content", content, 128)],
+        )
+        if parts["preset"]:
+            system += f" 用户自定义偏好：{parts['preset']}。"
+        merged = parts["content"]
+        if parts["background"]:
+            merged = (merged + "\n\n[背景]\n" + parts["background"]).strip()
+        user_msg = f"问题：{title}\n" + (f"补充：{merged}\n" if merged else "")
         resp = await client.chat.completions.create(
-            model=self.cfg.model,
+            model=cfg.model,
             messages=[{"role": "system", "content": system}, {"role": "user", "content": user_msg}],
-            temperature=self.cfg.temperature,
+            temperature=cfg.temperature,
+            timeout=self._timeout(),
         )
+        _record_usage(cfg, "answer", resp)
         return resp.choices[0].message.content or ""
 
-    async def _openai_like_consensus(self, title: str, answers: list[str]) -> dict:
-        from openai import AsyncOpenAI  # lazy import
-
-        client = AsyncOpenAI(api_key=self.cfg.api_key, base_url=self.cfg.base_url)
+    async def _openai_like_consensus(self, cfg: LLMConfig, title: str, answers: list[str]) -> dict:
+        client = openai_client(cfg)
         system = (
             "你是共识引擎，负责从多份答案中总结结论/依据/分歧/小结，"
             "以中文、纯文本、简明结构化输出。"
@@ -202,10 +639,12 @@ class LLMClient:
         joined = "\n\n---\n\n".join(answers)
         user_msg = f"问题：{title}\n\n以下是不同人格的答案：\n{joined}\n\n请输出：结论/依据/分歧/小结。"
         resp = await client.chat.completions.create(
-            model=self.cfg.model,
+            model=cfg.model,
             messages=[{"role": "system", "content": system}, {"role": "user", "content": user_msg}],
-            temperature=min(0.9, max(0.0, self.cfg.temperature - 0.2)),
+            temperature=min(0.9, max(0.0, cfg.temperature - 0.2)),
+            timeout=self._timeout(),
         )
+        _record_usage(cfg, "consensus", resp)
         text = resp.choices[0].message.content or ""
         # naive split for now
         def pick(tag: str) -> str:
@@ -223,69 +662,86 @@ class LLMClient:
 
     async def _openai_like_comment(
         self,
+        cfg: LLMConfig,
         persona: str,
         title: str,
         content: Optional[str],
         reply_to: Optional[str],
         user_preset: Optional[str],
+        background: Optional[str] = None,
     ) -> str:
-        from openai import AsyncOpenAI
-
-        client = AsyncOpenAI(api_key=self.cfg.api_key, base_url=self.cfg.base_url)
+        client = openai_client(cfg)
         sys = (
             f"你是{persona}，请以中文、简洁礼貌的‘评论’语气输出，不超过80字。"
             "若提供了[背景]内容，作为上下文参考；如为二级回复，请针对被回复内容作答。"
         )
-        if user_preset:
-            sys += f" 用户偏好：{user_preset}。"
+        parts = self._fit(
+            cfg,
+            "comment",
+            sys + f" 用户偏好：。问题：{title}\n（可选补充）\n\n[背景]\n\n被回复内容：",
+            [
+                ("background", background, 0),
+                ("preset", user_preset, 32),
+                ("content", content, 64),
+                ("reply_to", reply_to, 128),
+            ],
+        )
+        if parts["preset"]:
+            sys += f" 用户偏好：{parts['preset']}。"
+        merged = parts["content"]
+        if parts["background"]:
+            merged = (merged + "\n\n[背景]\n" + parts["background"]).strip()
         if reply_to:
-            user_msg = f"问题：{title}\n（可选补充）{content or ''}\n被回复内容：{reply_to}"
+            user_msg = f"问题：{title}\n（可选补充）{merged}\n被回复内容：{parts['reply_to']}"
         else:
-            user_msg = f"问题：{title}\n（可选补充）{content or ''}"
+            user_msg = f"问题：{title}\n（可选补充）{merged}"
         resp = await client.chat.completions.create(
-            model=self.cfg.model,
+            model=cfg.model,
             messages=[{"role": "system", "content": sys}, {"role": "user", "content": user_msg}],
-            temperature=min(0.9, max(0.0, self.cfg.temperature)),
+            temperature=min(0.9, max(0.0, cfg.temperature)),
+            timeout=self._timeout(),
         )
+        _record_usage(cfg, "comment", resp)
         return resp.choices[0].message.content or ""
 
     # --- Quality evaluation ---
-    async def evaluate_quality(self, title: str, content: str, answer: str) -> int:
-        if self.cfg.provider == "fake":
-            return self._fake_evaluate(answer)
-        elif self.cfg.provider in {"openai", "compat"}:
-            return await self._openai_like_evaluate(title, content, answer)
-        else:
-            return self._fake_evaluate(answer)
+    async def evaluate_quality(self, title: str, content: str, answer: str, fallback: int = 60) -> int:
+        try:
+            return await self._run("eval", title, content, answer)
+        except (LLMUnavailable, LLMTimeout) as e:
+            LLM_DEGRADED.inc(task="eval", reason="timeout" if isinstance(e, LLMTimeout) else "unavailable")
+            return fallback
 
     def _fake_evaluate(self, answer: str) -> int:
         from .ranking import quality_score as heuristic
         return int(heuristic(answer))
 
-    async def _openai_like_evaluate(self, title: str, content: str, answer: str) -> int:
-        from openai import AsyncOpenAI
-
-        client = AsyncOpenAI(api_key=self.cfg.api_key, base_url=self.cfg.base_url)
+    async def _openai_like_evaluate(self, cfg: LLMConfig, title: str, content: str, answer: str) -> int:
+        client = openai_client(cfg)
         sys = (
             "你是一名严格的内容评审。根据评分规则对回答进行打分，"
             "返回一个0到100的整数分数，不要解释。评分要考虑：结构化清晰度、正确性/合理性、可执行性、边界与风险提示、表达精炼度。"
         )
-        user_msg = (
-            f"问题：{title}\n背景：{content[:800]}\n回答：\n{answer[:4000]}\n"
-            "请只输出一个0..100的整数，不要包含其他文字。"
+        tail = "请只输出一个0..100的整数，不要包含其他文字。"
+        parts = self._fit(
+            cfg,
+            "eval",
+            sys + f"问题：{title}\n背景：\n回答：\n\n" + tail,
+            [("content", content, 128), ("answer", answer, 256)],
         )
-        try:
-            resp = await client.chat.completions.create(
-                model=self.cfg.model,
-                messages=[{"role": "system", "content": sys}, {"role": "user", "content": user_msg}],
-                temperature=0.0,
-            )
-            txt = resp.choices[0].message.content or ""
-        except Exception:
-            return 60
+        user_msg = f"问题：{title}\n背景：{parts['content']}\n回答：\n{parts['answer']}\n" + tail
+        resp = await client.chat.completions.create(
+            model=cfg.model,
+            messages=[{"role": "system", "content": sys}, {"role": "user", "content": user_msg}],
+            temperature=0.0,
+            timeout=self._timeout(),
+        )
+        _record_usage(cfg, "eval", resp)
+        txt = resp.choices[0].message.content or ""
         import re
         m = re.search(r"(\d{1,3})", txt)
         if not m:
-            return 60
+            # counted as a failed attempt; the next provider or the caller's fallback takes over
+            raise LLMBadOutput(f"unparseable score: {txt[:40]!r}")
         n = int(m.group(1))
         return max(0, min(100, n))
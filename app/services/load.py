@@ -0,0 +1,113 @@
+"""Load shedding: degrade generation in steps as the LLM backlog grows.
+
+The level is the highest step whose threshold is reached by either signal:
+calls waiting in the dispatch queue, or the worst recent p95 latency among
+providers. Steps are cumulative:
+
+1. fewer personas per question (SYNO_SHED_PERSONAS)
+2. heuristic quality score only, no LLM judge
+3. no Top-K answer context in prompts
+4. new regen requests are refused
+"""
+from __future__ import annotations
+
+import logging
+import os
+
+from .. import metrics
+from . import providers, scheduler
+
+
+FEWER_PERSONAS = 1
+HEURISTIC_SCORE = 2
+NO_CONTEXT = 3
+REFUSE_REGEN = 4
+STEPS = {
+    FEWER_PERSONAS: "fewer_personas",
+    HEURISTIC_SCORE: "heuristic_score",
+    NO_CONTEXT: "no_context",
+    REFUSE_REGEN: "refuse_regen",
+}
+
+log = logging.getLogger("syno.load")
+
+LEVEL = metrics.gauge("syno_shed_level", "Current load-shedding level (0 = normal)")
+APPLIED = metrics.counter("syno_shed_applied_total", "Degradation steps applied to generation work", ["step"])
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _thresholds(name: str, default: str) -> list[float]:
+    """Four ascending thresholds, one per step (e.g. ``32,64,128,256``)."""
+    try:
+        vals = [float(x) for x in os.getenv(name, default).split(",") if x.strip()]
+    except Exception:
+        vals = [float(x) for x in default.split(",")]
+    return (vals + [float("inf")] * 4)[:4]
+
+
+def _enabled() -> bool:
+    return os.getenv("SYNO_SHED", "1") in ("1", "true", "True", "yes", "on")
+
+
+def _step_for(value: float, thresholds: list[float]) -> int:
+    return sum(1 for t in thresholds if value >= t)
+
+
+def queue_depth() -> int:
+    s = scheduler.scheduler()
+    return s.depth() if s else 0
+
+
+def provider_p95() -> float:
+    """Worst p95 latency (seconds) among providers with enough recent samples."""
+    min_samples = _int_env("SYNO_SHED_MIN_SAMPLES", 10)
+    worst = 0.0
+    for h in providers.all_health():
+        if h.samples() >= min_samples:
+            worst = max(worst, h.quantile(0.95) or 0.0)
+    return worst
+
+
+_last_level = 0
+
+
+def level() -> int:
+    global _last_level
+    if not _enabled():
+        return 0
+    lvl = max(
+        _step_for(queue_depth(), _thresholds("SYNO_SHED_QUEUE", "32,64,128,256")),
+        _step_for(provider_p95(), _thresholds("SYNO_SHED_LATENCY", "10,15,20,25")),
+    )
+    if lvl != _last_level:
+        log.warning("load shedding level %s -> %s (queue=%s, p95=%.1fs)", _last_level, lvl, queue_depth(), provider_p95())
+        _last_level = lvl
+    LEVEL.set(lvl)
+    return lvl
+
+
+def shed_personas(items: list, lvl: int) -> list:
+    """Trim a persona list at level >= 1."""
+    keep = max(1, _int_env("SYNO_SHED_PERSONAS", 2))
+    if lvl >= FEWER_PERSONAS and len(items) > keep:
+        APPLIED.inc(step=STEPS[FEWER_PERSONAS])
+        return items[:keep]
+    return items
+
+
+def applies(step: int, lvl: int) -> bool:
+    """Whether ``step`` is in effect at ``lvl``; counts it when it is."""
+    if lvl >= step:
+        APPLIED.inc(step=STEPS[step])
+        return True
+    return False
+
+
+def status() -> dict:
+    return {"level": level(), "queue_depth": queue_depth(), "provider_p95": provider_p95()}
@@ -0,0 +1,161 @@
+"""Per-question generation status (pending/running/done per persona).
+
+Backs the long-poll endpoint ``/q/{qid}/status`` so the question page can
+wait for background generation without reloading itself.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from typing import Hashable, Iterable, Optional, Union
+
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_ACTIVE = (PENDING, RUNNING)
+# finished jobs stay visible for a while so late pollers still see them
+_KEEP_SECONDS = 600
+
+
+class _QuestionState:
+    def __init__(self) -> None:
+        self.version = 0
+        # job_id -> {"kind", "started", "updated", "items": {key: state}, "labels": {key: persona}}
+        self.jobs: dict[str, dict] = {}
+        self.waiters: list[asyncio.Future] = []
+        self.touched = time.time()
+
+
+_states: dict[int, _QuestionState] = {}
+
+
+def _state(question_id: int) -> _QuestionState:
+    st = _states.get(question_id)
+    if st is None:
+        st = _states[question_id] = _QuestionState()
+    return st
+
+
+def _notify(question_id: int, job: Optional[dict] = None) -> None:
+    st = _state(question_id)
+    st.version += 1
+    st.touched = time.time()
+    if job is not None:
+        job["updated"] = st.touched
+    waiters, st.waiters = st.waiters, []
+    for fut in waiters:
+        if not fut.done():
+            fut.set_result(None)
+
+
+def _active(job: dict) -> bool:
+    return any(s in _ACTIVE for s in job["items"].values())
+
+
+def _gc() -> None:
+    """Drop jobs settled more than _KEEP_SECONDS ago, then questions left without jobs."""
+    cutoff = time.time() - _KEEP_SECONDS
+    for qid, st in list(_states.items()):
+        for jid in [j for j, job in st.jobs.items() if job["updated"] < cutoff and not _active(job)]:
+            del st.jobs[jid]
+        if not st.jobs and not st.waiters and st.touched < cutoff:
+            del _states[qid]
+
+
+# items: persona labels, or (key, label) pairs when labels may repeat (e.g. answer ids)
+Items = Iterable[Union[str, tuple[Hashable, str]]]
+
+
+def _job(kind: str, items: Items) -> dict:
+    pairs = [it if isinstance(it, tuple) else (it, it) for it in items]
+    now = time.time()
+    return {
+        "kind": kind,
+        "started": now,
+        "updated": now,
+        "items": {k: PENDING for k, _ in pairs},
+        "labels": {k: label for k, label in pairs},
+    }
+
+
+def enqueue(question_id: int, kind: str, personas: Optional[Items] = None) -> str:
+    """Register a job before it is scheduled; returns its id."""
+    _gc()
+    job_id = uuid.uuid4().hex[:12]
+    job = _state(question_id).jobs[job_id] = _job(kind, personas or ["*"])
+    _notify(question_id, job)
+    return job_id
+
+
+def start(question_id: int, job_id: Optional[str], kind: str, personas: Items) -> str:
+    """Replace the placeholder of a queued job with the resolved persona list."""
+    st = _state(question_id)
+    job_id = job_id or uuid.uuid4().hex[:12]
+    job = _job(kind, personas)
+    if job_id in st.jobs:
+        job["started"] = st.jobs[job_id]["started"]
+    st.jobs[job_id] = job
+    _notify(question_id, job)
+    return job_id
+
+
+def mark(question_id: int, job_id: Optional[str], key: Hashable, state: str) -> None:
+    st = _states.get(question_id)
+    job = st.jobs.get(job_id or "") if st else None
+    if job is None or key not in job["items"]:
+        return
+    job["items"][key] = state
+    _notify(question_id, job)
+
+
+def settle(question_id: int, job_id: Optional[str]) -> None:
+    """Close a job: anything still pending/running is marked failed."""
+    st = _states.get(question_id)
+    job = st.jobs.get(job_id or "") if st else None
+    if job is None:
+        return
+    for k, s in job["items"].items():
+        if s in _ACTIVE:
+            job["items"][k] = FAILED
+    _notify(question_id, job)
+
+
+def snapshot(question_id: int) -> dict:
+    _gc()
+    st = _states.get(question_id)
+    if st is None:
+        return {"question_id": question_id, "version": 0, "active": False, "jobs": []}
+    jobs = [
+        {
+            "id": jid,
+            "kind": job["kind"],
+            "items": [{"persona": job["labels"][k], "state": s} for k, s in job["items"].items()],
+        }
+        for jid, job in st.jobs.items()
+    ]
+    active = any(s in _ACTIVE for job in st.jobs.values() for s in job["items"].values())
+    return {"question_id": question_id, "version": st.version, "active": active, "jobs": jobs}
+
+
+async def wait(question_id: int, since: int, timeout: float) -> dict:
+    """Long-poll: return as soon as the version moves past ``since`` or on timeout.
+
+    Questions without tracked jobs answer immediately; polling never creates state.
+    """
+    _gc()
+    st = _states.get(question_id)
+    if st is not None and st.version <= since and timeout > 0:
+        fut = asyncio.get_running_loop().create_future()
+        st.waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if fut in st.waiters:
+                st.waiters.remove(fut)
+    return snapshot(question_id)
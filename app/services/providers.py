@@ -0,0 +1,120 @@
+"""Provider health: circuit breaker and recent-latency window per provider."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from .. import metrics
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+BREAKER_OPEN = metrics.gauge("syno_llm_breaker_open", "1 while a provider's circuit breaker is open", ["provider"])
+
+
+class ProviderHealth:
+    """Consecutive-failure breaker: closed -> open (cooldown) -> half-open (one probe)."""
+
+    def __init__(self, label: str, failures: int = 5, cooldown: float = 30.0, window: int = 200) -> None:
+        self.label = label
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        # when the current half-open probe was handed out (None = no probe in flight)
+        self.probe_at: Optional[float] = None
+        self.latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def available(self) -> bool:
+        """Whether ``allow`` would admit a call right now; takes no probe slot."""
+        with self._lock:
+            st = self.state
+            if st == "closed":
+                return True
+            return st == "half-open" and (self.probe_at is None or time.monotonic() - self.probe_at >= self.cooldown)
+
+    def allow(self) -> bool:
+        """Admit a call; in half-open this hands out the single probe, so call it only right before calling."""
+        with self._lock:
+            st = self.state
+            if st == "closed":
+                return True
+            now = time.monotonic()
+            if st == "half-open" and (self.probe_at is None or now - self.probe_at >= self.cooldown):
+                self.probe_at = now
+                return True
+            return False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.failures = 0
+            self.probe_at = None
+            if self.opened_at is not None:
+                self.opened_at = None
+                BREAKER_OPEN.set(0, provider=self.label)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.probe_at = None
+            if self.opened_at is not None or self.failures >= self.max_failures:
+                self.opened_at = time.monotonic()
+                BREAKER_OPEN.set(1, provider=self.label)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            data = sorted(self.latencies)
+        if not data:
+            return None
+        return data[min(len(data) - 1, int(q * len(data)))]
+
+    def samples(self) -> int:
+        return len(self.latencies)
+
+
+_registry: dict[str, ProviderHealth] = {}
+_registry_lock = threading.Lock()
+
+
+def health(label: str) -> ProviderHealth:
+    with _registry_lock:
+        h = _registry.get(label)
+        if h is None:
+            h = _registry[label] = ProviderHealth(
+                label,
+                failures=int(_float_env("SYNO_LLM_BREAKER_FAILURES", 5)),
+                cooldown=_float_env("SYNO_LLM_BREAKER_COOLDOWN", 30.0),
+            )
+        return h
+
+
+def all_health() -> list[ProviderHealth]:
+    with _registry_lock:
+        return list(_registry.values())
+
+
+def hedge_delay(label: str) -> float:
+    """Observed p95 for the provider, or SYNO_LLM_HEDGE_DELAY until enough samples."""
+    h = health(label)
+    p95 = h.quantile(0.95)
+    if p95 is None or h.samples() < int(_float_env("SYNO_LLM_HEDGE_MIN_SAMPLES", 20)):
+        return _float_env("SYNO_LLM_HEDGE_DELAY", 2.0)
+    return p95
@@ -0,0 +1,247 @@
+"""Per-user rate limits and daily generation quotas.
+
+Handlers call ``admit`` for an endpoint class (``ask`` / ``regen`` /
+``answer`` / ``comment``): an in-memory token bucket limits bursts, and a
+request is refused up front once the day's quota is gone. The returned
+``Ticket`` travels with the generation job, which charges the daily quota
+per persona it actually generates (``Ticket.take``) and trims its persona
+list to what is left. Daily usage is persisted in ``usage_quotas`` and
+cached in memory.
+
+Limits depend on the user's tier: ``anon``, ``default``, ``pro`` (users
+listed in SYNO_USER_TIERS) and ``admin`` (unlimited).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+from .. import metrics
+from ..db import SessionLocal
+from ..models import UsageQuota
+
+
+CLASSES = ("ask", "regen", "answer", "comment")
+
+
+@dataclass(frozen=True)
+class Limit:
+    burst: float  # bucket capacity (0 = no rate limit)
+    per_minute: float  # refill rate
+    daily: int  # generations per UTC day (0 = unlimited)
+
+
+_UNLIMITED = Limit(0, 0, 0)
+
+DEFAULT_LIMITS: dict[str, dict[str, Limit]] = {
+    "anon": {
+        "ask": Limit(3, 1, 30),
+        "regen": Limit(1, 0.5, 10),
+        "answer": Limit(1, 0.5, 10),
+        "comment": Limit(1, 0.5, 10),
+    },
+    "default": {
+        "ask": Limit(5, 2, 200),
+        "regen": Limit(2, 1, 60),
+        "answer": Limit(3, 2, 60),
+        "comment": Limit(5, 4, 100),
+    },
+    "pro": {
+        "ask": Limit(10, 5, 1000),
+        "regen": Limit(5, 3, 300),
+        "answer": Limit(6, 4, 300),
+        "comment": Limit(10, 8, 500),
+    },
+    "admin": {c: _UNLIMITED for c in CLASSES},
+}
+
+DENIED = metrics.counter("syno_rate_limited_total", "Requests refused by rate limit or daily quota", ["cls", "tier", "reason"])
+TRIMMED = metrics.counter("syno_quota_trimmed_total", "Generations dropped by jobs because the daily quota ran out", ["cls"])
+
+
+class RateLimited(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason  # "rate" or "quota"
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+def _parse_tiers() -> dict[str, str]:
+    tiers: dict[str, str] = {}
+    for item in os.getenv("SYNO_USER_TIERS", "").split(","):
+        name, _, tier = item.partition(":")
+        if name.strip() and tier.strip():
+            tiers[name.strip()] = tier.strip().lower()
+    return tiers
+
+
+_TIERS = _parse_tiers()
+
+
+def load_tiers() -> dict[str, str]:
+    """(Re)read SYNO_USER_TIERS (``alice:pro,bob:pro``); called at startup."""
+    global _TIERS
+    _TIERS = _parse_tiers()
+    _limit.cache_clear()
+    return _TIERS
+
+
+def tier_for(user) -> str:
+    if user is None:
+        return "anon"
+    tier = _TIERS.get(getattr(user, "username", ""))
+    if tier:
+        return tier
+    return "admin" if getattr(user, "is_admin", False) else "default"
+
+
+def _limit_from_env(tier: str, cls: str, base: Limit) -> Limit:
+    raw = os.getenv(f"SYNO_RATE_{tier.upper()}_{cls.upper()}")
+    if not raw:
+        return base
+    try:
+        burst, per_minute, daily = (x.strip() for x in raw.split(","))
+        return Limit(float(burst), float(per_minute), int(daily))
+    except Exception:
+        return base
+
+
+@lru_cache(maxsize=64)
+def _limit(tier: str, cls: str) -> Limit:
+    base = DEFAULT_LIMITS.get(tier, DEFAULT_LIMITS["default"]).get(cls, _UNLIMITED)
+    return _limit_from_env(tier, cls, base)
+
+
+def limit_for(tier: str, cls: str) -> Limit:
+    """Limit for ``tier``/``cls``; override with SYNO_RATE_<TIER>_<CLASS>=burst,per_minute,daily."""
+    return _limit(tier, cls)
+
+
+# --- token buckets (in memory) ---
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float) -> None:
+        self.tokens = tokens
+        self.updated = time.monotonic()
+
+
+_buckets: OrderedDict[tuple[str, str], _Bucket] = OrderedDict()
+_BUCKETS_MAX = 10000
+_lock = threading.Lock()
+
+
+def _take_token(subject: str, cls: str, lim: Limit) -> float:
+    """0.0 if a token was taken, else seconds until the next one."""
+    if lim.burst <= 0:
+        return 0.0
+    rate = lim.per_minute / 60.0
+    now = time.monotonic()
+    with _lock:
+        b = _buckets.get((subject, cls))
+        if b is None:
+            b = _buckets[(subject, cls)] = _Bucket(lim.burst)
+            while len(_buckets) > _BUCKETS_MAX:
+                _buckets.popitem(last=False)
+        _buckets.move_to_end((subject, cls))
+        b.tokens = min(lim.burst, b.tokens + (now - b.updated) * rate)
+        b.updated = now
+        if b.tokens >= 1.0:
+            b.tokens -= 1.0
+            return 0.0
+        return (1.0 - b.tokens) / rate if rate > 0 else 3600.0
+
+
+# --- daily usage (SQLite, cached) ---
+_daily: dict[tuple[str, str, str], int] = {}
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _seconds_to_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+def used_today(subject: str, cls: str) -> int:
+    day = _today()
+    key = (subject, cls, day)
+    with _lock:
+        if key in _daily:
+            return _daily[key]
+    db = SessionLocal()
+    try:
+        row = db.get(UsageQuota, (subject, cls, day))
+        used = row.used if row else 0
+    finally:
+        db.close()
+    with _lock:
+        # drop other days once the date rolls over
+        for k in [k for k in _daily if k[2] != day]:
+            del _daily[k]
+        return _daily.setdefault(key, used)
+
+
+def _charge(subject: str, cls: str, n: int) -> None:
+    day = _today()
+    used_today(subject, cls)
+    with _lock:
+        _daily[(subject, cls, day)] = _daily.get((subject, cls, day), 0) + n
+    db = SessionLocal()
+    try:
+        row = db.get(UsageQuota, (subject, cls, day))
+        if row is None:
+            db.add(UsageQuota(subject=subject, cls=cls, day=day, used=n))
+        else:
+            row.used = row.used + n
+        db.commit()
+    finally:
+        db.close()
+
+
+@dataclass(frozen=True)
+class Ticket:
+    subject: str
+    tier: str
+    cls: str
+
+    def take(self, n: int) -> int:
+        """Charge up to ``n`` generations against today's quota; returns how many are allowed."""
+        lim = limit_for(self.tier, self.cls)
+        if lim.daily <= 0 or n <= 0:
+            return max(0, n)
+        granted = max(0, min(n, lim.daily - used_today(self.subject, self.cls)))
+        if granted:
+            _charge(self.subject, self.cls, granted)
+        if granted < n:
+            TRIMMED.inc(n - granted, cls=self.cls)
+        return granted
+
+
+def subject_for(user, client_host: Optional[str]) -> str:
+    return f"u:{user.id}" if user is not None else f"ip:{client_host or '-'}"
+
+
+def admit(user, client_host: Optional[str], cls: str) -> Ticket:
+    """Check the rate limit and remaining daily quota; raise ``RateLimited`` if refused."""
+    tier = tier_for(user)
+    subject = subject_for(user, client_host)
+    lim = limit_for(tier, cls)
+    if lim.daily > 0 and used_today(subject, cls) >= lim.daily:
+        DENIED.inc(cls=cls, tier=tier, reason="quota")
+        raise RateLimited("quota", _seconds_to_midnight())
+    wait = _take_token(subject, cls, lim)
+    if wait > 0:
+        DENIED.inc(cls=cls, tier=tier, reason="rate")
+        raise RateLimited("rate", wait)
+    return Ticket(subject, tier, cls)
+
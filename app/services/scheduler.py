@@ -0,0 +1,181 @@
+"""Priority-aware dispatch queue in front of LLM calls.
+
+Three classes share SYNO_LLM_CONCURRENCY slots: ``interactive`` (a user is
+waiting on the click), ``background`` (answer fan-out after /ask, regen) and
+``backfill`` (bulk ingest). Higher classes are always served first and
+SYNO_LLM_INTERACTIVE_RESERVE slots are kept free of lower-class work. Within
+a class, waiters are served round-robin per user so one heavy user can't
+monopolize throughput.
+
+The class and user come from a context variable set by the job (``bind``),
+so ``LLMClient`` callers don't have to thread them through.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from .. import metrics
+
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+BACKFILL = "backfill"
+CLASSES = (INTERACTIVE, BACKGROUND, BACKFILL)
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+QUEUE_DEPTH = metrics.gauge("syno_llm_queue_depth", "LLM calls waiting for a dispatch slot", ["cls"])
+RUNNING = metrics.gauge("syno_llm_running", "LLM calls holding a dispatch slot", ["cls"])
+QUEUE_WAIT = metrics.histogram("syno_llm_queue_wait_seconds", "Time spent waiting for a dispatch slot", ["cls"])
+
+
+_current: ContextVar[tuple[str, str]] = ContextVar("syno_llm_class", default=(BACKGROUND, "-"))
+
+
+def bind(cls: str, user_id: Optional[int] = None) -> None:
+    """Tag LLM calls made from the current task with a priority class and user."""
+    _current.set((cls if cls in CLASSES else BACKGROUND, str(user_id) if user_id is not None else "-"))
+
+
+def current() -> tuple[str, str]:
+    return _current.get()
+
+
+class Scheduler:
+    def __init__(self, limit: int, reserve: int) -> None:
+        self.limit = max(1, limit)
+        self.reserve = max(0, min(reserve, self.limit - 1))
+        self.running = {c: 0 for c in CLASSES}
+        # cls -> user -> waiters (FIFO); users rotate round-robin
+        self._queues: dict[str, OrderedDict[str, deque[asyncio.Future]]] = {c: OrderedDict() for c in CLASSES}
+
+    def depth(self, cls: Optional[str] = None) -> int:
+        classes = [cls] if cls else list(CLASSES)
+        return sum(len(q) for c in classes for q in self._queues[c].values())
+
+    def _can_run(self, cls: str) -> bool:
+        total = sum(self.running.values())
+        if total >= self.limit:
+            return False
+        if cls != INTERACTIVE and total - self.running[INTERACTIVE] >= self.limit - self.reserve:
+            return False
+        return True
+
+    def _queued_ahead(self, cls: str) -> bool:
+        return any(self._queues[c] for c in CLASSES[: CLASSES.index(cls) + 1])
+
+    def _take(self, cls: str) -> None:
+        self.running[cls] += 1
+        RUNNING.set(self.running[cls], cls=cls)
+
+    def _pop(self, cls: str) -> Optional[asyncio.Future]:
+        users = self._queues[cls]
+        while users:
+            user, waiters = users.popitem(last=False)
+            fut = waiters.popleft()
+            if waiters:
+                users[user] = waiters  # back of the rotation
+            if not fut.done():
+                return fut
+        return None
+
+    def _dispatch(self) -> None:
+        for cls in CLASSES:
+            while self._queues[cls] and self._can_run(cls):
+                fut = self._pop(cls)
+                if fut is None:
+                    break
+                self._take(cls)
+                fut.set_result(None)
+            if self._queues[cls]:
+                break
+        for cls in CLASSES:
+            QUEUE_DEPTH.set(self.depth(cls), cls=cls)
+
+    async def acquire(self, cls: str, user: str) -> None:
+        t0 = time.perf_counter()
+        if not self._queued_ahead(cls) and self._can_run(cls):
+            self._take(cls)
+            QUEUE_WAIT.observe(0.0, cls=cls)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._queues[cls].setdefault(user, deque()).append(fut)
+        QUEUE_DEPTH.set(self.depth(cls), cls=cls)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(cls)  # slot was handed over just before the cancel
+            else:
+                self._discard(cls, user, fut)
+            raise
+        QUEUE_WAIT.observe(time.perf_counter() - t0, cls=cls)
+
+    def _discard(self, cls: str, user: str, fut: asyncio.Future) -> None:
+        waiters = self._queues[cls].get(user)
+        if waiters is not None:
+            try:
+                waiters.remove(fut)
+            except ValueError:
+                pass
+            if not waiters:
+                del self._queues[cls][user]
+        QUEUE_DEPTH.set(self.depth(cls), cls=cls)
+
+    def release(self, cls: str) -> None:
+        self.running[cls] -= 1
+        RUNNING.set(self.running[cls], cls=cls)
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "reserve": self.reserve,
+            "running": dict(self.running),
+            "queued": {c: self.depth(c) for c in CLASSES},
+            "users_queued": {c: len(self._queues[c]) for c in CLASSES},
+        }
+
+
+# one scheduler per event loop (futures are loop-bound), dropped with the loop
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Scheduler]" = weakref.WeakKeyDictionary()
+
+
+def scheduler() -> Optional[Scheduler]:
+    """Scheduler for the running loop, or None when SYNO_LLM_CONCURRENCY=0 (unbounded)."""
+    limit = _int_env("SYNO_LLM_CONCURRENCY", 16)
+    if limit <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    s = _schedulers.get(loop)
+    if s is None:
+        s = _schedulers[loop] = Scheduler(limit, _int_env("SYNO_LLM_INTERACTIVE_RESERVE", 2))
+    return s
+
+
+@asynccontextmanager
+async def slot():
+    """Hold one dispatch slot for the current task's class and user."""
+    s = scheduler()
+    if s is None:
+        yield
+        return
+    cls, user = _current.get()
+    await s.acquire(cls, user)
+    try:
+        yield
+    finally:
+        s.release(cls)
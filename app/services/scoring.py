@@ -0,0 +1,133 @@
+"""Cascaded answer scoring: heuristic first, LLM judge only when it matters.
+
+``ranking.quality_score`` already separates a two-line stub from a
+structured answer. The judge is only asked about answers whose heuristic
+score falls in an ambiguous band, or that sit close enough to the top-K cut
+(used by ``context.build_answer_background``) to change which answers are
+fed back as context.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Optional
+
+from .. import metrics
+from .ranking import quality_score
+
+
+def _env(name: str, default: str) -> str:
+    return os.getenv(name, default)
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(_env(name, str(default)))
+    except Exception:
+        return default
+
+
+def judge_mode() -> str:
+    """``cascade`` (default), ``always`` (judge every answer) or ``off``."""
+    mode = _env("SYNO_JUDGE", "cascade").strip().lower()
+    return mode if mode in ("cascade", "always", "off") else "cascade"
+
+
+def judge_band() -> tuple[float, float]:
+    """Heuristic scores in ``[low, high]`` are ambiguous (SYNO_JUDGE_BAND, e.g. ``50,70``)."""
+    raw = _env("SYNO_JUDGE_BAND", "50,70").replace("-", ",")
+    try:
+        low, high = (float(x) for x in raw.split(",")[:2])
+    except Exception:
+        return 50.0, 70.0
+    return (low, high) if low <= high else (high, low)
+
+
+DECISIONS = metrics.counter(
+    "syno_judge_decisions_total",
+    "Answers scored, by whether the LLM judge was called and why",
+    ["decision", "reason"],
+)
+
+
+def plan(heuristic: list[int], existing: list[int], topk: int) -> list[Optional[str]]:
+    """Escalation reason per candidate (``band`` / ``topk`` / ``always``) or None.
+
+    ``existing`` are the stored scores of answers already on the question;
+    together with the candidates they decide where the top-K cut falls.
+    """
+    mode = judge_mode()
+    if mode == "off":
+        return [None] * len(heuristic)
+    if mode == "always":
+        return ["always"] * len(heuristic)
+    low, high = judge_band()
+    margin = _float_env("SYNO_JUDGE_TOPK_MARGIN", 5.0)
+    pool = sorted([*existing, *heuristic], reverse=True)
+    cut = (pool[topk - 1] + pool[topk]) / 2 if 0 < topk < len(pool) else None
+    reasons: list[Optional[str]] = []
+    for h in heuristic:
+        if low <= h <= high:
+            reasons.append("band")
+        elif cut is not None and abs(h - cut) <= margin:
+            reasons.append("topk")
+        else:
+            reasons.append(None)
+    return reasons
+
+
+async def score_answers(
+    client,
+    title: str,
+    content: str,
+    texts: list[str],
+    existing: Optional[list[int]] = None,
+    topk: int = 2,
+    judge: bool = True,
+) -> list[int]:
+    """Final quality score for each of ``texts``; judge calls run concurrently.
+
+    ``judge=False`` (load shedding) keeps the heuristic scores as final.
+    """
+    heuristic = [quality_score(t) for t in texts]
+    reasons = plan(heuristic, list(existing or []), topk) if judge else [None] * len(texts)
+    scores = list(heuristic)
+    escalate = [i for i, r in enumerate(reasons) if r]
+    if escalate:
+        judged = await asyncio.gather(
+            *(client.evaluate_quality(title, content, texts[i], fallback=heuristic[i]) for i in escalate),
+            return_exceptions=True,
+        )
+        for i, s in zip(escalate, judged):
+            if not isinstance(s, BaseException):
+                scores[i] = int(s)
+    skip_reason = "shed" if not judge else ("off" if judge_mode() == "off" else "clear")
+    for r in reasons:
+        if r:
+            DECISIONS.inc(decision="judged", reason=r)
+        else:
+            DECISIONS.inc(decision="skipped", reason=skip_reason)
+    return scores
+
+
+def report() -> dict:
+    """Judge calls made vs. saved since startup."""
+    by_reason: dict[str, int] = {}
+    judged = skipped = 0
+    for labels, v in DECISIONS.samples():
+        n = int(v)
+        by_reason[f"{labels['decision']}:{labels['reason']}"] = n
+        if labels["decision"] == "judged":
+            judged += n
+        else:
+            skipped += n
+    total = judged + skipped
+    return {
+        "mode": judge_mode(),
+        "band": judge_band(),
+        "scored": total,
+        "judged": judged,
+        "saved": skipped,
+        "saved_ratio": (skipped / total) if total else 0.0,
+        "by_reason": by_reason,
+    }
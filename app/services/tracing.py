@@ -0,0 +1,170 @@
+"""Span tracing for generation jobs.
+
+A trace is bound to the job's task (like the job deadline); ``span`` records
+one timed stage (context, queue, llm, dedupe, score, commit) with the persona
+of the branch it runs in. Spans are buffered on the trace and appended to a
+JSONL file (SYNO_TRACE_FILE; tracing is off while it is unset) in one write
+when the job finishes, so tracing costs a context-variable lookup when no job
+is active and a list append when one is.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def trace_file() -> str:
+    """JSONL sink; tracing is off unless SYNO_TRACE_FILE is set."""
+    return os.getenv("SYNO_TRACE_FILE", "")
+
+
+class Trace:
+    def __init__(self, question_id: int, job_id: str, kind: str) -> None:
+        self.question_id = question_id
+        self.job_id = job_id
+        self.kind = kind
+        self.ts = time.time()
+        self.t0 = time.perf_counter()
+        self.spans: list[dict] = []
+
+    def add(self, stage: str, start: float, end: float, persona: Optional[str], ok: bool, attrs: dict) -> None:
+        span = {
+            "job": self.job_id,
+            "question": self.question_id,
+            "kind": self.kind,
+            "persona": persona,
+            "stage": stage,
+            "start": round(start - self.t0, 4),
+            "duration": round(end - start, 4),
+            "ok": ok,
+        }
+        if attrs:
+            span.update(attrs)
+        self.spans.append(span)
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("syno_trace", default=None)
+_persona: ContextVar[Optional[str]] = ContextVar("syno_trace_persona", default=None)
+
+
+def start(question_id: int, job_id: str, kind: str) -> Optional[Trace]:
+    """Bind a new trace to the current task (no-op when tracing is disabled)."""
+    if not trace_file():
+        return None
+    t = Trace(question_id, job_id, kind)
+    _trace.set(t)
+    return t
+
+
+def persona(name: Optional[str]) -> None:
+    """Attribute spans recorded from here on (in this task) to ``name``."""
+    _persona.set(name)
+
+
+def record(stage: str, start: float, end: float, ok: bool = True, **attrs) -> None:
+    """Record a span measured by the caller (``time.perf_counter`` values)."""
+    t = _trace.get()
+    if t is not None:
+        t.add(stage, start, end, _persona.get(), ok, attrs)
+
+
+@contextmanager
+def span(stage: str, persona: Optional[str] = None, **attrs) -> Iterator[None]:
+    """Time the enclosed block as ``stage``; ``persona`` defaults to the task's."""
+    t = _trace.get()
+    if t is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        t.add(stage, t0, time.perf_counter(), persona or _persona.get(), ok, attrs)
+
+
+_lock = threading.Lock()
+
+
+def finish(trace: Optional[Trace]) -> None:
+    """Close the job span and append all spans to the sink."""
+    if trace is None:
+        return
+    _persona.set(None)
+    trace.add("job", trace.t0, time.perf_counter(), None, True, {"ts": round(trace.ts, 3)})
+    path = trace_file()
+    if not path:
+        return
+    lines = "".join(json.dumps(s, ensure_ascii=False) + "\n" for s in trace.spans)
+    max_bytes = _float_env("SYNO_TRACE_MAX_MB", 20.0) * 1024 * 1024
+    with _lock:
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError:
+            pass
+
+
+def jobs_for_question(question_id: int, limit: int = 10) -> list[dict]:
+    """Most recent traced jobs of a question: ``{job, kind, ts, total, spans}``."""
+    path = trace_file()
+    if not path:
+        return []
+    by_job: dict[str, list[dict]] = {}
+    for p in (path + ".1", path):
+        if not os.path.exists(p):
+            continue
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                if f'"question": {question_id},' not in line:
+                    continue
+                try:
+                    s = json.loads(line)
+                except ValueError:
+                    continue
+                if s.get("question") == question_id:
+                    by_job.setdefault(s["job"], []).append(s)
+    out = []
+    for job, spans in by_job.items():
+        head = next((s for s in spans if s["stage"] == "job"), None)
+        if head is None:
+            continue
+        body = sorted((s for s in spans if s is not head), key=lambda s: s["start"])
+        out.append({"job": job, "kind": head["kind"], "ts": head.get("ts", 0), "total": head["duration"], "spans": body})
+    out.sort(key=lambda j: -j["ts"])
+    return out[:limit]
+
+
+def recent_jobs(limit: int = 50) -> list[dict]:
+    """Job-level spans of the most recently finished traces, newest first."""
+    path = trace_file()
+    if not path:
+        return []
+    out: list[dict] = []
+    for p in (path + ".1", path):
+        if not os.path.exists(p):
+            continue
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                if '"stage": "job"' not in line:
+                    continue
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    continue
+    return out[::-1][:limit]
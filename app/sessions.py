@@ -0,0 +1,225 @@
+"""Server-side sessions: the cookie carries only a signed opaque id.
+
+Session payloads (user_id, llm_cfg incl. api_key) live in the
+``server_sessions`` table with a small in-process LRU in front of it, so
+regular page loads neither upload nor re-verify the whole blob.
+
+A session expires SYNO_SESSION_MAX_AGE seconds after its last use; use is
+written back to ``updated_at`` at most every SYNO_SESSION_TOUCH seconds.
+The LRU is per process and only rechecks the table on those writes, so with
+several workers a logout or login change in one can be missed by another
+for up to that long: run a single worker, or set SYNO_SESSION_CACHE_SIZE=0.
+"""
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from itsdangerous import BadSignature, Signer
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .db import SessionLocal
+from .models import ServerSession
+
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _dump(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+class SessionStore:
+    def __init__(self, max_entries: int = 1024, touch_interval: int = 300) -> None:
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        # sid -> (payload, updated_at as last written or read)
+        self._lru: OrderedDict[str, tuple[str, datetime]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, sid: str, payload: str, updated_at: datetime) -> None:
+        with self._lock:
+            self._lru[sid] = (payload, updated_at)
+            self._lru.move_to_end(sid)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _forget(self, sid: str) -> None:
+        with self._lock:
+            self._lru.pop(sid, None)
+
+    def load(self, sid: str, max_age: Optional[int] = None) -> Optional[str]:
+        """Payload of a live session, or None if unknown or idle for more than ``max_age`` seconds."""
+        now = datetime.utcnow()
+        with self._lock:
+            hit = self._lru.get(sid)
+            if hit is not None:
+                self._lru.move_to_end(sid)
+        if hit is not None and (now - hit[1]).total_seconds() < self.touch_interval:
+            return hit[0]
+        db = SessionLocal()
+        try:
+            row = db.get(ServerSession, sid)
+            if row is None or (max_age is not None and (now - row.updated_at).total_seconds() > max_age):
+                self._forget(sid)
+                return None
+            payload, updated_at = row.data, row.updated_at
+            if (now - updated_at).total_seconds() >= self.touch_interval:
+                row.updated_at = updated_at = now
+                db.commit()
+        finally:
+            db.close()
+        self._remember(sid, payload, updated_at)
+        return payload
+
+    def save(self, sid: str, payload: str) -> None:
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            row = db.get(ServerSession, sid)
+            if row:
+                row.data = payload
+                row.updated_at = now
+            else:
+                db.add(ServerSession(id=sid, data=payload, updated_at=now))
+            db.commit()
+        finally:
+            db.close()
+        self._remember(sid, payload, now)
+
+    def rotate(self, sid: str, payload: str) -> str:
+        """Move the session to a fresh opaque id and drop the old row; returns the new id."""
+        new_sid = secrets.token_urlsafe(32)
+        self.save(new_sid, payload)
+        self.delete(sid)
+        return new_sid
+
+    def delete(self, sid: str) -> None:
+        self._forget(sid)
+        db = SessionLocal()
+        try:
+            db.query(ServerSession).filter(ServerSession.id == sid).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_expired(self, max_age: int) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+        db = SessionLocal()
+        try:
+            n = db.query(ServerSession).filter(ServerSession.updated_at < cutoff).delete()
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            self._lru.clear()
+        return int(n or 0)
+
+
+store = SessionStore(
+    max_entries=_int_env("SYNO_SESSION_CACHE_SIZE", 1024),
+    touch_interval=_int_env("SYNO_SESSION_TOUCH", 300),
+)
+
+
+_ROTATE = "syno.session.rotate"
+
+
+def regenerate(request: HTTPConnection) -> None:
+    """Issue a new session id when this response is sent (call on login/logout).
+
+    The old id stops working, so a session id planted before authentication
+    cannot be used to share the authenticated session.
+    """
+    request.scope[_ROTATE] = True
+
+
+class ServerSessionMiddleware:
+    """Drop-in replacement for starlette's SessionMiddleware.
+
+    ``request.session`` behaves the same; the store is only written when the
+    session content actually changed during the request.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        secret_key: str,
+        session_cookie: str = "syno_sid",
+        max_age: int = 14 * 24 * 60 * 60,
+        same_site: str = "lax",
+        https_only: bool = False,
+        session_store: Optional[SessionStore] = None,
+    ) -> None:
+        self.app = app
+        self.signer = Signer(secret_key, salt="syno.session")
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.store = session_store or store
+        self.security_flags = "httponly; samesite=" + same_site
+        if https_only:
+            self.security_flags += "; secure"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        sid: Optional[str] = None
+        before = "{}"
+        raw = connection.cookies.get(self.session_cookie)
+        if raw:
+            try:
+                sid = self.signer.unsign(raw.encode("utf-8")).decode("utf-8")
+            except BadSignature:
+                sid = None
+        if sid:
+            payload = self.store.load(sid, self.max_age)
+            if payload is None:
+                sid = None
+            else:
+                before = payload
+        scope["session"] = json.loads(before)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal sid
+            if message["type"] == "http.response.start":
+                data = scope["session"]
+                headers = MutableHeaders(scope=message)
+                if data:
+                    after = _dump(data)
+                    fresh = sid is None or bool(scope.get(_ROTATE))
+                    if sid is None:
+                        sid = secrets.token_urlsafe(32)
+                        self.store.save(sid, after)
+                    elif fresh:
+                        sid = self.store.rotate(sid, after)
+                    elif after != before:
+                        self.store.save(sid, after)
+                    if fresh:
+                        signed = self.signer.sign(sid.encode("utf-8")).decode("utf-8")
+                        headers.append(
+                            "Set-Cookie",
+                            f"{self.session_cookie}={signed}; path=/; Max-Age={self.max_age}; {self.security_flags}",
+                        )
+                elif sid is not None:
+                    self.store.delete(sid)
+                    headers.append(
+                        "Set-Cookie",
+                        f"{self.session_cookie}=null; path=/; expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.security_flags}",
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
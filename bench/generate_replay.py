@@ -0,0 +1,101 @@
+"""Deterministic ``generate_for_question`` benchmark using an LLM cassette.
+
+    # once, against any provider (the real one, the stub or fake):
+    python -m bench.generate_replay --mode record --cassette gen.jsonl --questions 20
+    # then as often as needed, without a provider:
+    python -m bench.generate_replay --mode replay --cassette gen.jsonl --questions 20 [--scale 0]
+
+Each run uses a throwaway SQLite file with the same seeded questions, so a
+replay sees exactly the recorded requests and produces the same answers.
+Prints job latency percentiles, LLM calls and a digest of the stored
+answers; equal digests across runs mean identical outputs.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+from bench.login_burst import _summary
+
+
+TOPICS = ["学习 Python", "准备技术面试", "提高睡眠质量", "入门机器学习", "管理个人财务", "写好技术文档", "带领小团队", "坚持跑步"]
+
+
+def _questions(n: int) -> list[tuple[str, str]]:
+    return [(f"如何{TOPICS[i % len(TOPICS)]}（{i}）", f"背景 {i}：希望得到可执行的步骤与注意事项。") for i in range(n)]
+
+
+async def run(questions: int, concurrency: int) -> int:
+    from app.db import SessionLocal, init_db
+    from app.models import Answer, Question
+    from app.services.generate import generate_for_question
+    from app.services.llm import LLM_CALLS
+
+    init_db()
+    db = SessionLocal()
+    try:
+        qs = [Question(title=t, content=c) for t, c in _questions(questions)]
+        db.add_all(qs)
+        db.commit()
+        ids = [q.id for q in qs]
+    finally:
+        db.close()
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+    durations: list[float] = []
+
+    async def one(qid: int) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            await generate_for_question(qid)
+            durations.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in ids))
+    wall = time.perf_counter() - t0
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Answer.question_id, Answer.persona, Answer.content, Answer.quality_score).order_by(
+            Answer.question_id, Answer.persona
+        )
+        digest = hashlib.sha256()
+        count = 0
+        for qid, persona, content, score in rows:
+            digest.update(f"{qid}|{persona}|{score}|{content}\n".encode("utf-8"))
+            count += 1
+    finally:
+        db.close()
+    calls = int(sum(v for labels, v in LLM_CALLS.samples() if labels.get("outcome") == "ok"))
+    print(_summary("generate job", durations))
+    print(f"wall={wall:.2f}s answers={count} llm_calls={calls} digest={digest.hexdigest()[:16]}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mode", choices=("record", "replay"), required=True)
+    ap.add_argument("--cassette", required=True, help="JSONL cassette file")
+    ap.add_argument("--questions", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=4, help="questions generated at once")
+    ap.add_argument("--scale", type=float, default=1.0, help="replay latency scale (0 = instant)")
+    args = ap.parse_args(argv)
+
+    if args.mode == "record" and os.path.exists(args.cassette):
+        os.remove(args.cassette)
+    tmpdir = tempfile.mkdtemp(prefix="syno-bench-")
+    os.environ["SYNO_DB_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ["SYNO_TRACE_FILE"] = ""
+    os.environ["SYNO_LLM_CASSETTE"] = args.cassette
+    os.environ["SYNO_LLM_CASSETTE_MODE"] = args.mode
+    os.environ["SYNO_LLM_CASSETTE_SCALE"] = str(args.scale)
+    return asyncio.run(run(args.questions, args.concurrency))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Feed latency while a burst of logins hammers /login.
+
+    python -m bench.login_burst --logins 50 --feed 200
+
+Runs the app in-process over an ASGI transport against a throwaway SQLite
+file, measures GET / latency alone, then again while ``--logins`` concurrent
+POST /login requests are in flight. With hashing on the bounded pool the two
+feed distributions should be close; rejected logins show up as 503s.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def _pct(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    i = min(len(s) - 1, max(0, int(round(p / 100.0 * (len(s) - 1)))))
+    return s[i]
+
+
+def _summary(label: str, values: list[float]) -> str:
+    ms = [v * 1000 for v in values]
+    return (
+        f"{label:<18} n={len(ms):<4} p50={_pct(ms, 50):7.1f}ms p95={_pct(ms, 95):7.1f}ms "
+        f"p99={_pct(ms, 99):7.1f}ms max={max(ms) if ms else 0:7.1f}ms"
+    )
+
+
+async def _feed_loop(client, n: int, out: list[float]) -> None:
+    for _ in range(n):
+        t0 = time.perf_counter()
+        r = await client.get("/")
+        out.append(time.perf_counter() - t0)
+        assert r.status_code == 200, r.status_code
+
+
+async def _login(client, username: str, password: str, statuses: list[int], latencies: list[float]) -> None:
+    t0 = time.perf_counter()
+    r = await client.post("/login", data={"username": username, "password": password})
+    latencies.append(time.perf_counter() - t0)
+    statuses.append(r.status_code)
+
+
+async def run(logins: int, feed: int) -> int:
+    import httpx
+
+    from app.main import app
+
+    await app.router.startup()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/signup", data={"username": "bench", "password": "bench-pw"})
+        assert r.status_code in (200, 302), r.status_code
+        client.cookies.clear()
+
+        quiet: list[float] = []
+        await _feed_loop(client, feed, quiet)
+
+        loaded: list[float] = []
+        statuses: list[int] = []
+        login_lat: list[float] = []
+        burst = [
+            _login(
+                httpx.AsyncClient(transport=transport, base_url="http://bench"),
+                "bench",
+                "bench-pw",
+                statuses,
+                login_lat,
+            )
+            for _ in range(logins)
+        ]
+        await asyncio.gather(_feed_loop(client, feed, loaded), *burst)
+
+    await app.router.shutdown()
+    print(_summary("feed (quiet)", quiet))
+    print(_summary("feed (login burst)", loaded))
+    print(_summary("login", login_lat))
+    codes = {c: statuses.count(c) for c in sorted(set(statuses))}
+    print(f"login statuses: {codes}")
+    ratio = statistics.median(loaded) / max(1e-9, statistics.median(quiet))
+    print(f"feed p50 ratio (burst/quiet): {ratio:.2f}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--logins", type=int, default=50)
+    ap.add_argument("--feed", type=int, default=200, help="feed requests per phase")
+    args = ap.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix="syno-bench-")
+    os.environ["SYNO_DB_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    return asyncio.run(run(args.logins, args.feed))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""Microbenchmarks for the pure helpers in ``app/services`` that run on every generation.
+
+    python -m bench.micro --out bench/micro_baseline.json
+    python -m bench.micro --compare bench/micro_baseline.json [--threshold 0.3]
+
+Covers ``dedupe.normalize`` / ``content_hash`` / ``is_similar`` /
+``is_duplicate``, ``ranking.quality_score`` and ``context._snip`` /
+``ctx_from_dict`` on deterministic Chinese and English answer-like texts
+from 50 to 10k characters, plus scaling curves of ``is_duplicate`` over the
+number of already accepted answers (the candidate is not a duplicate, so
+every accepted answer is compared).
+
+Each case reports the best per-call time over ``--repeat`` interleaved
+rounds (each round runs long enough to be measurable). ``--compare`` exits non-zero when
+a case is slower than the baseline by more than ``--threshold``; cases
+faster than ``--floor`` microseconds are reported but never gate. Times are
+compared after scaling by a fixed calibration workload measured in both
+runs, so the gate tracks code changes rather than machine load.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import re
+import sys
+import time
+from typing import Callable
+
+from bench.suite import _commit
+
+
+LENGTHS = (50, 200, 1000, 3000, 10000)
+SCALING_N = (1, 2, 4, 8, 16, 32)
+SCALING_LEN = 1000
+
+ZH = [
+    "结论：先明确目标与约束，再列出必须满足的条件。",
+    "步骤：从最小可行方案开始，每一步都能验证结果。",
+    "依据：记录过程中的问题，定期复盘并调整节奏。",
+    "方法：借助社区与文档，避免重复踩坑，节省时间。",
+    "风险：注意边界条件与失败时的回退方案。",
+    "建议：为关键决策写下理由，便于之后回看与交接。",
+]
+EN = [
+    "Conclusion: measure before optimizing and keep a baseline to compare against.",
+    "Steps: start from the smallest working version and verify every change.",
+    "Evidence: write down problems as they appear and review them weekly.",
+    "Method: lean on documentation and the community to avoid known pitfalls.",
+    "Risk: watch the edge cases and keep a rollback plan for failures.",
+    "Advice: prefer small, reversible changes over large rewrites.",
+]
+
+
+def text(lang: str, length: int, seed: int = 0) -> str:
+    """An answer-like text of exactly ``length`` characters: numbered lines, sections, bullets."""
+    rng = random.Random(f"{lang}-{length}-{seed}")
+    pool = ZH if lang == "zh" else EN
+    lines: list[str] = []
+    size = 0
+    i = 0
+    while size < length:
+        i += 1
+        line = f"{i}) {rng.choice(pool)}" if rng.random() < 0.7 else f"- {rng.choice(pool)}"
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)[:length]
+
+
+def _variant(s: str) -> str:
+    """A near-duplicate of ``s``: the same content with whitespace and one line changed."""
+    lines = s.splitlines()
+    if len(lines) > 2:
+        lines[len(lines) // 2] = lines[len(lines) // 2][::-1]
+    return "  " + "\n\n".join(lines) + "\n"
+
+
+def _loops(fn: Callable[[], object], min_time: float) -> tuple[int, float]:
+    """Calls per round so one round takes at least ``min_time``; also returns that round's per-call time."""
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or number >= 1 << 20:
+            return number, elapsed / number
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+
+def _round(fn: Callable[[], object], number: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - t0) / number
+
+
+def _calibration() -> int:
+    # fixed pure-Python work (string scans, dict and list churn) to gauge machine speed
+    total = 0
+    for i in range(2000):
+        s = str(i) * 3
+        total += len({c: s.count(c) for c in s}) + sum(1 for c in s if c.isdigit())
+    return total
+
+
+def cases() -> dict[str, Callable[[], object]]:
+    from app.services import context, dedupe, ranking
+
+    out: dict[str, Callable[[], object]] = {}
+    for lang in ("zh", "en"):
+        for n in LENGTHS:
+            s = text(lang, n)
+            v = _variant(s)
+            out[f"dedupe.normalize/{lang}/{n}"] = lambda s=s: dedupe.normalize(s)
+            out[f"dedupe.content_hash/{lang}/{n}"] = lambda s=s: dedupe.content_hash(s)
+            out[f"dedupe.is_similar/{lang}/{n}"] = lambda s=s, v=v: dedupe.is_similar(v, s)
+            out[f"ranking.quality_score/{lang}/{n}"] = lambda s=s: ranking.quality_score(s)
+            out[f"context._snip/{lang}/{n}"] = lambda s=s: context._snip(s, 200)
+        for k in SCALING_N:
+            accepted = [text(lang, SCALING_LEN, seed=i + 1) for i in range(k)]
+            cand = text(lang, SCALING_LEN, seed=0)
+            out[f"dedupe.is_duplicate/{lang}/n={k}"] = lambda c=cand, a=accepted: dedupe.is_duplicate(c, a)
+    cfg = {"answer_ctx": "topk", "ctx_topk": 3, "ctx_snippet": 300}
+    out["context.ctx_from_dict/override"] = lambda: context.ctx_from_dict(cfg)
+    out["context.ctx_from_dict/env"] = lambda: context.ctx_from_dict(None)
+    return out
+
+
+def run(pattern: str, repeat: int, min_time: float) -> dict:
+    """Best per-call microseconds per case.
+
+    Rounds are interleaved (one round of every case per pass, ``repeat``
+    passes) so a burst of machine load inflates one sample of each case
+    rather than every sample of a few.
+    """
+    rx = re.compile(pattern) if pattern else None
+    selected = {"_calibration": _calibration}
+    selected.update({n: fn for n, fn in cases().items() if not rx or rx.search(n)})
+    plan: dict[str, tuple[Callable[[], object], int]] = {}
+    best: dict[str, float] = {}
+    for name, fn in selected.items():
+        number, per_call = _loops(fn, min_time)
+        plan[name] = (fn, number)
+        best[name] = per_call
+    for _ in range(repeat - 1):
+        for name, (fn, number) in plan.items():
+            best[name] = min(best[name], _round(fn, number))
+    cal = best.pop("_calibration") * 1e6
+    results = {name: {"us": round(sec * 1e6, 3)} for name, sec in best.items()}
+    for name, r in results.items():
+        print(f"{name:<40} {r['us']:>12.2f}us")
+    return {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "repeat": repeat,
+            "min_time": min_time,
+            "calibration_us": round(cal, 3),
+        },
+        "cases": results,
+    }
+
+
+def curves(result: dict) -> None:
+    """Print dedupe cost per accepted answer; roughly flat means linear scaling."""
+    for lang in ("zh", "en"):
+        row = []
+        for k in SCALING_N:
+            r = result["cases"].get(f"dedupe.is_duplicate/{lang}/n={k}")
+            if r:
+                row.append(f"n={k}: {r['us'] / 1000:.2f}ms ({r['us'] / k:.0f}us/ans)")
+        if row:
+            print(f"is_duplicate {lang} @{SCALING_LEN} chars: " + ", ".join(row))
+
+
+def compare(result: dict, baseline: dict, threshold: float, floor: float, normalize: bool = True) -> int:
+    """Print per-case deltas; returns the number of regressions.
+
+    With ``normalize`` the baseline is scaled by the ratio of the two runs'
+    calibration times, so a slower or busier machine does not read as a
+    regression.
+    """
+    bad = 0
+    scale = 1.0
+    cal_b = baseline.get("meta", {}).get("calibration_us")
+    cal_r = result.get("meta", {}).get("calibration_us")
+    if normalize and cal_b and cal_r:
+        scale = cal_r / cal_b
+    print(
+        f"\nvs baseline {baseline.get('meta', {}).get('commit') or '?'} "
+        f"(threshold {threshold:.0%}, floor {floor}us, machine speed x{1 / scale:.2f}):"
+    )
+    for name, r in result["cases"].items():
+        b = baseline.get("cases", {}).get(name)
+        if not b or not b["us"]:
+            print(f"  {name:<40} new")
+            continue
+        expected = b["us"] * scale
+        delta = r["us"] / expected - 1
+        flag = delta > threshold and max(r["us"], expected) >= floor
+        bad += flag
+        print(f"  {name:<40} {expected:>10.2f} -> {r['us']:>10.2f}us ({delta:+.0%}){'  REGRESSION' if flag else ''}")
+    return bad
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-k", "--filter", default="", help="only run cases matching this regex")
+    ap.add_argument("--repeat", type=int, default=7, help="measuring rounds per case")
+    ap.add_argument("--min-time", type=float, default=0.05, help="seconds per measuring round")
+    ap.add_argument("--out", help="write results as JSON (a baseline for --compare)")
+    ap.add_argument("--compare", help="baseline JSON to diff against")
+    ap.add_argument("--threshold", type=float, default=0.3, help="allowed slowdown per case (default 0.3)")
+    ap.add_argument("--floor", type=float, default=1.0, help="cases under this many microseconds never gate")
+    ap.add_argument("--no-normalize", action="store_true", help="compare raw times without machine-speed calibration")
+    args = ap.parse_args(argv)
+
+    result = run(args.filter, max(1, args.repeat), args.min_time)
+    curves(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            return 1 if compare(result, json.load(f), args.threshold, args.floor, not args.no_normalize) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
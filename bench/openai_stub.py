@@ -0,0 +1,208 @@
+"""OpenAI-compatible stub server for offline end-to-end runs.
+
+    python -m bench.openai_stub --port 8009 [--profile "latency=lognormal:0.8,0.5;429=0.05"] [--script rules.json]
+    SYNO_LLM_PROVIDER=compat SYNO_LLM_BASE_URL=http://127.0.0.1:8009/v1 SYNO_LLM_API_KEY=stub python -m uvicorn app.main:app
+
+Implements ``POST /v1/chat/completions`` (plain JSON and ``stream: true``
+server-sent events, with ``usage``) and ``GET /v1/models``. Timing and
+failures use the fake provider's profile format (services/fake.py): latency
+distribution, 500 / 429 rates with Retry-After, chunk pacing.
+
+Responses can be scripted with a JSON list of rules, first match wins::
+
+    [{"match": "0到100", "content": "82"},
+     {"match": "工程师", "content": "...", "profile": "latency=fixed:3"},
+     {"match": "限流测试", "status": 429, "retry_after": 5}]
+
+``match`` is a regular expression searched in the concatenated messages.
+Without a match, scoring prompts get a number and everything else a short
+structured answer.
+
+In tests, ``serve()`` starts the stub on a free port in a background thread::
+
+    @pytest.fixture
+    def llm_stub():
+        with serve(profile="latency=fixed:0.05") as base_url:
+            yield base_url
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.services import fake
+
+
+_SCORE = re.compile(r"0\s*(?:到|\.\.|-|~)\s*100")
+
+
+def _default_reply(prompt: str, rng: random.Random) -> str:
+    if _SCORE.search(prompt):
+        return str(rng.randint(55, 90))
+    return (
+        "结论：先明确目标，再按步骤推进。\n"
+        "1) 关键点：拆解问题，列出约束与依赖。\n"
+        "2) 方法：从最小可行方案开始，逐步验证并迭代。\n"
+        "3) 风险：注意边界条件、成本与回退方案。"
+    )
+
+
+def _match(rules: list[dict], prompt: str) -> dict:
+    for rule in rules:
+        if re.search(rule.get("match") or "", prompt):
+            return rule
+    return {}
+
+
+def _error(status: int, message: str, retry_after: Optional[float] = None) -> JSONResponse:
+    kind = {429: "rate_limit_exceeded", 500: "server_error"}.get(status, "invalid_request_error")
+    headers = {"Retry-After": f"{retry_after:g}"} if retry_after is not None else None
+    return JSONResponse({"error": {"message": message, "type": kind, "code": status}}, status_code=status, headers=headers)
+
+
+def create_app(profile: Optional[str] = None, script: Optional[list[dict]] = None, seed: Optional[int] = None) -> Starlette:
+    rules = list(script or [])
+    rng = random.Random(seed)
+    stats = {"requests": 0, "streams": 0, "errors": 0}
+
+    async def chat(request: Request):
+        stats["requests"] += 1
+        try:
+            body = await request.json()
+        except ValueError:
+            return _error(400, "invalid JSON body")
+        messages = body.get("messages") or []
+        prompt = "\n".join(str(m.get("content") or "") for m in messages if isinstance(m, dict))
+        rule = _match(rules, prompt)
+        if rule.get("status"):
+            stats["errors"] += 1
+            return _error(int(rule["status"]), "scripted error", rule.get("retry_after"))
+        prof = fake.profile(";".join(p for p in (profile, rule.get("profile")) if p))
+        content = rule.get("content") or _default_reply(prompt, rng)
+        model = body.get("model") or "stub"
+        cid = "chatcmpl-" + uuid.uuid4().hex[:24]
+        created = int(time.time())
+        usage = fake.usage(prompt, content, model).usage
+        usage_d = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens, "total_tokens": usage.total_tokens}
+        chunks = fake.stream(prof, content, rng)
+        try:
+            # the first chunk decides the status code: failures surface before any body is sent
+            first = await chunks.__anext__()
+        except fake.RateLimitError as e:
+            stats["errors"] += 1
+            return _error(429, str(e), e.retry_after)
+        except fake.InternalServerError as e:
+            stats["errors"] += 1
+            return _error(500, str(e))
+
+        if not body.get("stream"):
+            rest = [c async for c in chunks]
+            return JSONResponse(
+                {
+                    "id": cid,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": first + "".join(rest)}, "finish_reason": "stop"}
+                    ],
+                    "usage": usage_d,
+                }
+            )
+
+        stats["streams"] += 1
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        def event(delta: dict, finish: Optional[str] = None) -> str:
+            chunk = {
+                "id": cid,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            return "data: " + json.dumps(chunk, ensure_ascii=False) + "\n\n"
+
+        async def sse():
+            yield event({"role": "assistant", "content": ""})
+            yield event({"content": first})
+            async for c in chunks:
+                yield event({"content": c})
+            yield event({}, "stop")
+            if include_usage:
+                tail = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model, "choices": [], "usage": usage_d}
+                yield "data: " + json.dumps(tail) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    async def models(request: Request):
+        return JSONResponse({"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "syno"}]})
+
+    app = Starlette(routes=[Route("/v1/chat/completions", chat, methods=["POST"]), Route("/v1/models", models)])
+    app.state.stats = stats
+    return app
+
+
+@contextmanager
+def serve(
+    profile: Optional[str] = None,
+    script: Optional[list[dict]] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    seed: Optional[int] = None,
+) -> Iterator[str]:
+    """Run the stub in a background thread; yields its base URL (``http://host:port/v1``)."""
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(create_app(profile, script, seed), host=host, port=port, log_level="warning", lifespan="off")
+    )
+    thread = threading.Thread(target=server.run, name="openai-stub", daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("openai stub failed to start")
+        time.sleep(0.01)
+    bound = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://{host}:{bound}/v1"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8009)
+    ap.add_argument("--profile", help='fake provider profile, e.g. "latency=lognormal:0.8,0.5;429=0.05"')
+    ap.add_argument("--script", help="JSON file with scripted response rules")
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args(argv)
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+
+    import uvicorn
+
+    uvicorn.run(create_app(args.profile, script, args.seed), host=args.host, port=args.port, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
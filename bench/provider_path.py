@@ -0,0 +1,70 @@
+"""Benchmark the real-provider code path against the bundled OpenAI stub.
+
+    python -m bench.provider_path --calls 200 --concurrency 32 --profile "latency=lognormal:0.3,0.5;429=0.02"
+
+Starts ``bench.openai_stub`` on a free port and drives ``LLMClient`` with a
+``compat`` config pointing at it, so client pooling, the scheduler, timeouts
+and error handling run exactly as they would against a vendor. Prints
+latency percentiles per task and the error classes recorded by the client.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+
+from bench.login_burst import _summary
+from bench.openai_stub import serve
+
+
+async def run(base_url: str, calls: int, concurrency: int, eval_ratio: float) -> int:
+    from app.services.llm import LLM_ERRORS, LLMClient, LLMConfig
+
+    client = LLMClient(LLMConfig(provider="compat", model="stub", compat_name="stub", base_url=base_url, api_key="stub"))
+    sem = asyncio.Semaphore(max(1, concurrency))
+    latencies: dict[str, list[float]] = {"answer": [], "eval": []}
+    failed: dict[str, int] = {"answer": 0, "eval": 0}
+
+    async def one(i: int) -> None:
+        task = "eval" if (i % 100) < eval_ratio * 100 else "answer"
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                if task == "eval":
+                    # -1 = the client fell back instead of returning a model score
+                    if await client.evaluate_quality("如何学习 Python", "零基础", "1) 先学语法 2) 做小项目", fallback=-1) < 0:
+                        failed[task] += 1
+                        return
+                else:
+                    await client.generate_answer("工程师", "如何学习 Python", "零基础")
+            except Exception:
+                failed[task] += 1
+                return
+            latencies[task].append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    wall = time.perf_counter() - t0
+    for task, values in latencies.items():
+        if values or failed[task]:
+            print(_summary(task, values) + f" failed={failed[task]}")
+    print(f"throughput: {calls / wall:.1f} calls/s over {wall:.2f}s")
+    errors = {labels["error"]: int(v) for labels, v in LLM_ERRORS.samples()}
+    print(f"errors by class: {errors or '-'}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--calls", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--eval-ratio", type=float, default=0.5, help="share of calls that are quality evaluations")
+    ap.add_argument("--profile", default="latency=lognormal:0.2,0.5", help="stub latency / error profile")
+    args = ap.parse_args(argv)
+    with serve(profile=args.profile) as base_url:
+        return asyncio.run(run(base_url, args.calls, args.concurrency, args.eval_ratio))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
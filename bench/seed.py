@@ -0,0 +1,203 @@
+"""Seeded synthetic data for benchmarks.
+
+    python -m bench.seed --db sqlite:///bench.db --users 500 [--seed 7]
+
+Creates users, questions, answers, votes, comments, personas and persona-hub
+entries at fixed ratios per user (see ``RATIOS``); the same seed always
+produces the same rows. Every user's password is ``PASSWORD`` (hashed once).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+
+PASSWORD = "bench-pw"
+
+# rows per user (answers and comments are per question)
+RATIOS = {
+    "questions": 0.6,
+    "answers_per_question": 3.0,
+    "votes": 12.0,
+    "comments_per_question": 1.5,
+    "personas": 1.2,
+    "hub": 0.1,
+}
+
+TOPICS = [
+    "学习 Python", "准备技术面试", "提高睡眠质量", "入门机器学习", "管理个人财务", "写好技术文档",
+    "带领小团队", "坚持跑步", "选择数据库", "设计缓存", "做产品需求评审", "学习英语口语",
+]
+PERSONAS = ["学者", "工程师", "创作者"]
+STEPS = [
+    "先明确目标与约束，列出必须满足的条件。",
+    "从最小可行方案开始，每一步都能验证结果。",
+    "记录过程中的问题，定期复盘并调整节奏。",
+    "借助社区与文档，避免重复踩坑。",
+    "为关键决策写下理由，便于之后回看。",
+    "注意边界条件与失败时的回退方案。",
+    "Measure before optimizing; keep a baseline to compare against.",
+    "Prefer small, reversible changes over large rewrites.",
+]
+
+
+@dataclass
+class Seeded:
+    users: int
+    questions: int
+    answers: int
+    votes: int
+    comments: int
+    personas: int
+    hub: int
+    usernames: list[str]
+    question_ids: list[int]
+    answer_ids: list[int]
+
+
+def _answer_text(rng: random.Random, persona: str, title: str) -> str:
+    n = rng.randint(3, 8)
+    lines = [f"[{persona}] 针对《{title}》："]
+    lines += [f"{i + 1}) {rng.choice(STEPS)}" for i in range(n)]
+    if rng.random() < 0.5:
+        lines.append("风险：" + rng.choice(STEPS))
+    return "\n".join(lines)
+
+
+def seed(users: int, seed: int = 7) -> Seeded:
+    """Insert a synthetic dataset into the configured database (SYNO_DB_URL)."""
+    from app.auth import hash_password
+    from app.db import SessionLocal, init_db
+    from app.models import Answer, Comment, Persona, PersonaHub, Question, User, Vote, VoteTarget
+
+    init_db()
+    rng = random.Random(seed)
+    pw = hash_password(PASSWORD)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        base_user = (db.query(User.id).order_by(User.id.desc()).limit(1).scalar() or 0) + 1
+        db.execute(
+            insert(User),
+            [
+                {"username": f"bench{base_user + i}", "password_hash": pw, "created_at": now - timedelta(days=rng.randint(0, 365))}
+                for i in range(users)
+            ],
+        )
+        rows = db.query(User.id, User.username).filter(User.id >= base_user).order_by(User.id).all()
+        user_ids = [i for i, _ in rows]
+
+        n_q = max(1, int(users * RATIOS["questions"]))
+        questions = []
+        for i in range(n_q):
+            topic = rng.choice(TOPICS)
+            questions.append(
+                {
+                    "title": f"如何{topic}？（{i}）",
+                    "content": ("背景：" + "".join(rng.choice(STEPS) for _ in range(rng.randint(1, 3)))) if rng.random() < 0.7 else None,
+                    "author_id": rng.choice(user_ids),
+                    "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+                }
+            )
+        first_q = (db.query(Question.id).order_by(Question.id.desc()).limit(1).scalar() or 0) + 1
+        db.execute(insert(Question), questions)
+        q_ids = [i for (i,) in db.query(Question.id).filter(Question.id >= first_q).order_by(Question.id)]
+
+        answers = []
+        for qid, q in zip(q_ids, questions):
+            for _ in range(max(0, int(rng.gauss(RATIOS["answers_per_question"], 1.0) + 0.5))):
+                persona = rng.choice(PERSONAS)
+                answers.append(
+                    {
+                        "question_id": qid,
+                        "persona": persona,
+                        "content": _answer_text(rng, persona, q["title"]),
+                        "quality_score": rng.randint(40, 95),
+                        "created_at": q["created_at"] + timedelta(seconds=rng.randint(5, 120)),
+                    }
+                )
+        first_a = (db.query(Answer.id).order_by(Answer.id.desc()).limit(1).scalar() or 0) + 1
+        if answers:
+            db.execute(insert(Answer), answers)
+        a_ids = [i for (i,) in db.query(Answer.id).filter(Answer.id >= first_a).order_by(Answer.id)]
+
+        # votes: one per (user, target), mostly up, skewed towards a few popular targets
+        seen: set[tuple[int, str, int]] = set()
+        votes = []
+        for _ in range(int(users * RATIOS["votes"])):
+            if a_ids and rng.random() < 0.7:
+                ttype, pool = VoteTarget.answer, a_ids
+            else:
+                ttype, pool = VoteTarget.question, q_ids
+            target = pool[min(len(pool) - 1, int(rng.paretovariate(1.2)) - 1)] if rng.random() < 0.3 else rng.choice(pool)
+            uid = rng.choice(user_ids)
+            if (uid, ttype.value, target) in seen:
+                continue
+            seen.add((uid, ttype.value, target))
+            votes.append({"user_id": uid, "target_type": ttype, "target_id": target, "value": 1 if rng.random() < 0.85 else -1, "created_at": now})
+        if votes:
+            db.execute(insert(Vote), votes)
+
+        comments = []
+        for qid in q_ids:
+            for _ in range(int(rng.expovariate(1.0 / RATIOS["comments_per_question"]))):
+                comments.append(
+                    {
+                        "user_id": rng.choice(user_ids),
+                        "target_type": VoteTarget.question,
+                        "target_id": qid,
+                        "content": f"（{rng.choice(PERSONAS)}）简评：" + rng.choice(STEPS),
+                        "created_at": now,
+                    }
+                )
+        if comments:
+            db.execute(insert(Comment), comments)
+
+        personas = [
+            {"user_id": rng.choice(user_ids), "name": f"人格{i}", "prompt": "偏好：" + rng.choice(STEPS), "is_active": 1, "created_at": now}
+            for i in range(int(users * RATIOS["personas"]))
+        ]
+        if personas:
+            db.execute(insert(Persona), personas)
+
+        hub = [
+            {
+                "source_user_id": rng.choice(user_ids),
+                "name": f"广场人格{i}",
+                "prompt": "风格：" + rng.choice(STEPS),
+                "uses_count": int(rng.paretovariate(1.5)),
+                "created_at": now - timedelta(days=rng.randint(0, 60)),
+            }
+            for i in range(max(1, int(users * RATIOS["hub"])))
+        ]
+        db.execute(insert(PersonaHub), hub)
+        db.commit()
+        return Seeded(len(user_ids), len(q_ids), len(a_ids), len(votes), len(comments), len(personas), len(hub), [n for _, n in rows], q_ids, a_ids)
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", help="database URL (default SYNO_DB_URL)")
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+    if args.db:
+        os.environ["SYNO_DB_URL"] = args.db
+    s = seed(args.users, args.seed)
+    print(
+        f"users={s.users} questions={s.questions} answers={s.answers} votes={s.votes} "
+        f"comments={s.comments} personas={s.personas} hub={s.hub}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
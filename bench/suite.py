@@ -0,0 +1,247 @@
+"""End-to-end load benchmark against ``app.main:app`` over an ASGI client.
+
+    python -m bench.suite --users 500 --ops 2000 --workers 8 --out bench/baseline.json
+    python -m bench.suite --users 500 --ops 2000 --workers 8 --compare bench/baseline.json
+
+Seeds a throwaway SQLite database (bench.seed), logs a pool of seeded users
+in, then runs a weighted mix of scripted operations on concurrent workers:
+
+- ``feed``: browse the hot / new feed, open a question, sometimes the hub
+- ``vote``: a short burst of votes on one question's answers
+- ``ask``: post a question and long-poll its status until generation ends
+
+Reports throughput and p50/p95/p99 per route. ``--out`` writes the results
+as JSON; ``--compare`` diffs the run against such a file and exits non-zero
+when a route's p95 (or the throughput) regresses past ``--threshold``.
+Rate limits are lifted for the run unless ``--keep-limits`` is given; LLM
+calls use whatever provider is configured (fake by default, see SYNO_FAKE_*).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from bench.login_burst import _pct
+
+
+MIX = {"feed": 0.8, "vote": 0.15, "ask": 0.05}
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, route: str, coro, ok=(200, 302, 303)):
+        """Await one request; exceptions and unexpected statuses count as errors (returns None on exceptions)."""
+        t0 = time.perf_counter()
+        try:
+            r = await coro
+        except Exception as e:
+            self.latencies[route].append(time.perf_counter() - t0)
+            self.errors[route] += 1
+            print(f"{route}: {type(e).__name__}: {e}", file=sys.stderr)
+            return None
+        self.latencies[route].append(time.perf_counter() - t0)
+        if r.status_code not in ok:
+            self.errors[route] += 1
+        return r
+
+
+async def _feed(c, rec: Recorder, rng: random.Random, q_ids: list[int]) -> None:
+    sort = "hot" if rng.random() < 0.7 else "new"
+    await rec.call(f"GET /?sort={sort}", c.get("/", params={"sort": sort}))
+    for _ in range(rng.randint(1, 3)):
+        qid = rng.choice(q_ids)
+        await rec.call("GET /q/{qid}", c.get(f"/q/{qid}"))
+    if rng.random() < 0.1:
+        await rec.call("GET /personas", c.get("/personas"))
+
+
+async def _vote(c, rec: Recorder, rng: random.Random, q_ids: list[int], answers_by_q: dict[int, list[int]]) -> None:
+    qid = rng.choice(q_ids)
+    await rec.call("POST /vote", c.post("/vote", data={"target_type": "question", "target_id": qid, "value": 1}))
+    for aid in answers_by_q.get(qid, [])[: rng.randint(1, 4)]:
+        value = 1 if rng.random() < 0.8 else -1
+        await rec.call("POST /vote", c.post("/vote", data={"target_type": "answer", "target_id": aid, "value": value}))
+
+
+async def _ask(c, rec: Recorder, rng: random.Random, n: int) -> None:
+    t0 = time.perf_counter()
+    r = await rec.call("POST /ask", c.post("/ask", data={"title": f"压测问题 {n}：如何{rng.choice(['学习', '规划', '复盘'])}？", "content": "请给出步骤"}))
+    loc = r.headers.get("location", "") if r is not None else ""
+    if not loc.startswith("/q/"):
+        return
+    qid = int(loc.rsplit("/", 1)[-1])
+    version = 0
+    for _ in range(20):
+        s = await rec.call("GET /q/{qid}/status", c.get(f"/q/{qid}/status", params={"since": version, "wait": 10}))
+        if s is None:
+            return
+        snap = s.json()
+        version = snap.get("version", version)
+        if version and not snap.get("active"):
+            break
+    rec.latencies["ask→answers"].append(time.perf_counter() - t0)
+
+
+async def run(users: int, ops: int, workers: int, seed: int, logged_in: int) -> dict:
+    import httpx
+
+    from app.main import app
+    from bench.seed import PASSWORD, seed as seed_data
+
+    data = seed_data(users, seed)
+    from app.db import SessionLocal
+    from app.models import Answer
+
+    db = SessionLocal()
+    try:
+        answers_by_q: dict[int, list[int]] = defaultdict(list)
+        for aid, qid in db.query(Answer.id, Answer.question_id):
+            answers_by_q[qid].append(aid)
+    finally:
+        db.close()
+
+    await app.router.startup()
+    transport = httpx.ASGITransport(app=app)
+    clients = []
+    for name in data.usernames[: max(1, logged_in)]:
+        c = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60)
+        r = await c.post("/login", data={"username": name, "password": PASSWORD})
+        assert r.status_code in (200, 302), r.status_code
+        clients.append(c)
+    anon = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60)
+
+    rec = Recorder()
+    counter = {"n": 0}
+    kinds, weights = zip(*MIX.items())
+
+    async def worker(w: int) -> None:
+        rng = random.Random(seed * 1000 + w)
+        while counter["n"] < ops:
+            counter["n"] += 1
+            kind = rng.choices(kinds, weights)[0]
+            c = rng.choice(clients)
+            if kind == "feed":
+                await _feed(anon if rng.random() < 0.5 else c, rec, rng, data.question_ids)
+            elif kind == "vote":
+                await _vote(c, rec, rng, data.question_ids, answers_by_q)
+            else:
+                await _ask(c, rec, rng, counter["n"])
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(workers)))
+    wall = time.perf_counter() - t0
+    for c in clients + [anon]:
+        await c.aclose()
+    await app.router.shutdown()
+
+    requests = sum(len(v) for k, v in rec.latencies.items() if not k.startswith("ask→"))
+    routes = {}
+    for route, values in sorted(rec.latencies.items()):
+        ms = [v * 1000 for v in values]
+        routes[route] = {
+            "n": len(ms),
+            "errors": rec.errors.get(route, 0),
+            "mean_ms": round(sum(ms) / len(ms), 2),
+            "p50_ms": round(_pct(ms, 50), 2),
+            "p95_ms": round(_pct(ms, 95), 2),
+            "p99_ms": round(_pct(ms, 99), 2),
+        }
+    return {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "users": users,
+            "ops": ops,
+            "workers": workers,
+            "seed": seed,
+            "dataset": {k: getattr(data, k) for k in ("users", "questions", "answers", "votes", "comments", "personas", "hub")},
+        },
+        "wall_s": round(wall, 3),
+        "requests": requests,
+        "throughput_rps": round(requests / wall, 2) if wall else 0.0,
+        "routes": routes,
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def report(result: dict) -> None:
+    print(f"{'route':<22} {'n':>6} {'err':>4} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for route, r in result["routes"].items():
+        print(f"{route:<22} {r['n']:>6} {r['errors']:>4} {r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms")
+    print(f"throughput: {result['throughput_rps']:.1f} req/s ({result['requests']} requests in {result['wall_s']:.2f}s)")
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> int:
+    """Print per-route p95 deltas; returns the number of regressions."""
+    bad = 0
+    print(f"\nvs baseline {baseline.get('meta', {}).get('commit') or '?'} (threshold {threshold:.0%}):")
+    for route, r in result["routes"].items():
+        b = baseline.get("routes", {}).get(route)
+        if not b or not b["p95_ms"]:
+            print(f"  {route:<22} new")
+            continue
+        delta = r["p95_ms"] / b["p95_ms"] - 1
+        flag = delta > threshold
+        bad += flag
+        print(f"  {route:<22} p95 {b['p95_ms']:.1f} -> {r['p95_ms']:.1f}ms ({delta:+.0%}){'  REGRESSION' if flag else ''}")
+    tb, tr = baseline.get("throughput_rps") or 0, result["throughput_rps"]
+    if tb:
+        delta = tr / tb - 1
+        flag = delta < -threshold
+        bad += flag
+        print(f"  {'throughput':<22} {tb:.1f} -> {tr:.1f} req/s ({delta:+.0%}){'  REGRESSION' if flag else ''}")
+    return bad
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=500, help="seeded users (other rows follow bench.seed.RATIOS)")
+    ap.add_argument("--ops", type=int, default=2000, help="scripted operations to run")
+    ap.add_argument("--workers", type=int, default=8, help="concurrent virtual users")
+    ap.add_argument("--logged-in", type=int, default=50, help="seeded users with a session")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", help="write results as JSON (a baseline for --compare)")
+    ap.add_argument("--compare", help="baseline JSON to diff against")
+    ap.add_argument("--threshold", type=float, default=0.2, help="allowed p95 / throughput regression (default 0.2)")
+    ap.add_argument("--keep-limits", action="store_true", help="keep per-user rate limits and quotas")
+    args = ap.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix="syno-bench-")
+    os.environ["SYNO_DB_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ.setdefault("SYNO_TRACE_FILE", os.path.join(tmpdir, "traces.jsonl"))
+    if not args.keep_limits:
+        for cls in ("ASK", "REGEN", "ANSWER", "COMMENT"):
+            os.environ[f"SYNO_RATE_DEFAULT_{cls}"] = "0,0,0"
+
+    result = asyncio.run(run(args.users, args.ops, args.workers, args.seed, args.logged_in))
+    report(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            return 1 if compare(result, json.load(f), args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Time-to-first-byte and transfer size of the heaviest HTML pages.
+
+    python -m bench.ttfb --requests 30 --out before.json
+    python -m bench.ttfb --requests 30 --compare before.json
+
+Serves ``app.main`` with uvicorn in a child process on a free port (real
+sockets, so streamed bodies arrive in pieces) against a throwaway SQLite database seeded by
+``bench.seed`` plus one large question (long answers and a comment tree).
+Requests the hot feed, that question and an admin list the way a browser
+does (``Accept-Encoding: gzip, deflate, br``) and reports per page:
+
+- ``ttfb``: response headers received
+- ``first``: first body bytes received
+- ``total``: body complete
+- ``wire``: bytes on the wire (after any Content-Encoding) vs. decoded size
+
+``SYNO_STREAM_TEMPLATES=0`` / ``SYNO_COMPRESS=0`` reproduce buffered,
+uncompressed responses for a before/after comparison in one tree.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Iterator
+
+from bench.login_burst import _pct
+
+
+ACCEPT = "gzip, deflate, br"
+
+
+@contextlib.contextmanager
+def _serve() -> Iterator[str]:
+    """Run ``app.main:app`` under uvicorn in a child process (its own GIL); yields the base URL."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ),
+    )
+    deadline = time.monotonic() + 30
+    try:
+        while True:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                    break
+            except OSError:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("app failed to start")
+                time.sleep(0.05)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _big_question(answers: int, comments: int, seed: int) -> int:
+    """One question with ``answers`` long answers and ``comments`` comments (a third are replies)."""
+    from app.db import SessionLocal
+    from app.models import Answer, Comment, Question, User, VoteTarget
+    from bench.micro import text
+
+    rng = random.Random(seed)
+    db = SessionLocal()
+    try:
+        user_ids = [i for (i,) in db.query(User.id).limit(200)]
+        q = Question(title="如何系统地学习分布式系统？（长页面）", content=text("zh", 600, seed))
+        db.add(q)
+        db.flush()
+        for i in range(answers):
+            lang = "zh" if i % 3 else "en"
+            db.add(Answer(question_id=q.id, persona=f"人格{i}", content=text(lang, 3000, seed + i), quality_score=rng.randint(40, 95)))
+        top: list[int] = []
+        for i in range(comments):
+            parent = rng.choice(top) if top and i % 3 == 2 else None
+            c = Comment(
+                user_id=rng.choice(user_ids),
+                target_type=VoteTarget.question,
+                target_id=q.id,
+                parent_id=parent,
+                content=text("zh", rng.randint(40, 300), seed * 1000 + i),
+            )
+            db.add(c)
+            db.flush()
+            if parent is None:
+                top.append(c.id)
+        db.commit()
+        return q.id
+    finally:
+        db.close()
+
+
+async def _measure(client, path: str, n: int) -> dict:
+    ttfb, first, total, wire, size = [], [], [], 0, 0
+    encoding = ""
+    for _ in range(n):
+        t0 = time.perf_counter()
+        async with client.stream("GET", path, headers={"accept-encoding": ACCEPT}) as r:
+            t_head = time.perf_counter()
+            assert r.status_code == 200, (path, r.status_code)
+            encoding = r.headers.get("content-encoding", "identity")
+            t_first = None
+            got = 0
+            async for chunk in r.aiter_raw():
+                if t_first is None and chunk:
+                    t_first = time.perf_counter()
+                got += len(chunk)
+            t_end = time.perf_counter()
+        ttfb.append(t_head - t0)
+        first.append((t_first or t_end) - t0)
+        total.append(t_end - t0)
+        wire = got
+    async with client.stream("GET", path, headers={"accept-encoding": "identity"}) as r:
+        size = len(await r.aread())
+    ms = lambda values, p: round(_pct([v * 1000 for v in values], p), 2)  # noqa: E731
+    return {
+        "n": n,
+        "encoding": encoding,
+        "ttfb_p50_ms": ms(ttfb, 50),
+        "ttfb_p95_ms": ms(ttfb, 95),
+        "first_p50_ms": ms(first, 50),
+        "first_p95_ms": ms(first, 95),
+        "total_p50_ms": ms(total, 50),
+        "total_p95_ms": ms(total, 95),
+        "wire_bytes": wire,
+        "bytes": size,
+    }
+
+
+async def run(base_url: str, qid: int, admin: str, password: str, n: int) -> dict:
+    import httpx
+
+    pages = {"feed": "/?sort=hot", "question": f"/q/{qid}", "admin": "/admin?tab=answers"}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        r = await client.post("/login", data={"username": admin, "password": password})
+        assert r.status_code in (200, 302), r.status_code
+        for path in pages.values():  # warm up templates and caches
+            await client.get(path)
+        return {name: await _measure(client, path, n) for name, path in pages.items()}
+
+
+def report(result: dict) -> None:
+    print(f"{'page':<10} {'enc':<9} {'ttfb p50':>9} {'first p50':>10} {'total p50':>10} {'total p95':>10} {'wire':>9} {'size':>9}")
+    for name, r in result["pages"].items():
+        print(
+            f"{name:<10} {r['encoding']:<9} {r['ttfb_p50_ms']:>7.1f}ms {r['first_p50_ms']:>8.1f}ms "
+            f"{r['total_p50_ms']:>8.1f}ms {r['total_p95_ms']:>8.1f}ms {r['wire_bytes']:>8}B {r['bytes']:>8}B"
+        )
+
+
+def compare(result: dict, baseline: dict) -> None:
+    print(f"\nvs {baseline.get('label') or 'baseline'}:")
+    for name, r in result["pages"].items():
+        b = baseline.get("pages", {}).get(name)
+        if not b:
+            continue
+        print(
+            f"  {name:<10} first byte {b['first_p50_ms']:.1f} -> {r['first_p50_ms']:.1f}ms, "
+            f"total {b['total_p50_ms']:.1f} -> {r['total_p50_ms']:.1f}ms, "
+            f"wire {b['wire_bytes']} -> {r['wire_bytes']}B"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=30, help="requests per page")
+    ap.add_argument("--users", type=int, default=200, help="seeded users for the feed (bench.seed)")
+    ap.add_argument("--answers", type=int, default=12, help="answers on the large question")
+    ap.add_argument("--comments", type=int, default=150, help="comments on the large question")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--label", default="", help="name stored with --out results")
+    ap.add_argument("--out", help="write results as JSON")
+    ap.add_argument("--compare", help="results JSON to compare against")
+    args = ap.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix="syno-bench-")
+    os.environ["SYNO_DB_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ["SYNO_TRACE_FILE"] = ""
+    os.environ["SYNO_PERF_SAMPLE"] = "0"
+
+    from bench.seed import PASSWORD, seed as seed_data
+
+    data = seed_data(args.users, args.seed)
+    qid = _big_question(args.answers, args.comments, args.seed)
+    admin = data.usernames[0]
+    os.environ["SYNO_ADMIN_USERS"] = admin
+
+    with _serve() as base_url:
+        pages = asyncio.run(run(base_url, qid, admin, PASSWORD, args.requests))
+    result = {
+        "label": args.label,
+        "env": {k: os.environ[k] for k in ("SYNO_STREAM_TEMPLATES", "SYNO_COMPRESS", "SYNO_COMPRESS_MIN_BYTES") if k in os.environ},
+        "pages": pages,
+    }
+    report(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
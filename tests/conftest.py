@@ -0,0 +1,8 @@
+"""Point the app at a throwaway SQLite database before anything imports it."""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="syno-test-")
+os.environ["SYNO_DB_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ["SYNO_TRACE_FILE"] = ""
+os.environ.setdefault("SYNO_LLM_PROVIDER", "fake")
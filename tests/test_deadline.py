@@ -0,0 +1,117 @@
+"""Job deadlines against a deliberately slow fake provider."""
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from app.db import SessionLocal, init_db
+from app.models import Question
+from app.services import deadline, providers
+from app.services.llm import LLM_TIMEOUTS, LLMClient, LLMConfig, LLMDeadline, LLMTimeout, provider_label
+
+
+ARGS = ("学者", "如何学习分布式系统", None, None, None)
+
+
+def slow(seconds: float, model: str) -> LLMConfig:
+    return LLMConfig(provider="fake", model=model, fake_profile=f"latency=fixed:{seconds}")
+
+
+def timeouts(label: str) -> float:
+    return sum(v for labels, v in LLM_TIMEOUTS.samples() if labels.get("provider") == label)
+
+
+def run_with_deadline(seconds, coro_fn):
+    async def main():
+        if seconds is not None:
+            deadline._current.set(deadline.Deadline(seconds))
+        return await coro_fn()
+
+    return asyncio.run(main())
+
+
+def test_gather_within_cancels_stragglers_and_commits_partial_results():
+    init_db()
+    cancelled = []
+
+    async def answer(title: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(title)
+            raise
+        return title
+
+    async def main():
+        d = deadline.Deadline(0.2)
+        results = await deadline.gather_within(d, [answer("快", 0.01), answer("慢", 5)])
+        db = SessionLocal()
+        try:
+            db.add_all([Question(title=t) for t in results if t])
+            deadline.commit_within(db, d)
+        finally:
+            db.close()
+        return results
+
+    assert asyncio.run(main()) == ["快", None]
+    assert cancelled == ["慢"]
+    db = SessionLocal()
+    try:
+        assert db.query(Question).filter(Question.title.in_(["快", "慢"])).count() == 1
+    finally:
+        db.close()
+
+
+def test_bounded_raises_deadline_when_the_job_budget_runs_out(monkeypatch):
+    monkeypatch.setenv("SYNO_LLM_TIMEOUT", "30")
+    cfg = slow(2, "slow-deadline")
+    client = LLMClient(providers=[cfg])
+    with pytest.raises(LLMDeadline):
+        run_with_deadline(0.1, lambda: client._call_provider(cfg, "answer", ARGS))
+
+
+def test_bounded_raises_plain_timeout_for_the_provider_timeout(monkeypatch):
+    monkeypatch.setenv("SYNO_LLM_TIMEOUT", "0.1")
+    cfg = slow(2, "slow-timeout")
+    client = LLMClient(providers=[cfg])
+    with pytest.raises(LLMTimeout) as e:
+        run_with_deadline(None, lambda: client._call_provider(cfg, "answer", ARGS))
+    assert not isinstance(e.value, LLMDeadline)
+
+
+def test_timeout_counter_increments_per_provider(monkeypatch):
+    monkeypatch.setenv("SYNO_LLM_TIMEOUT", "0.05")
+    cfg = slow(2, "slow-counter")
+    label = provider_label(cfg)
+    client = LLMClient(providers=[cfg])
+    before = timeouts(label)
+    for _ in range(2):
+        with pytest.raises(LLMTimeout):
+            run_with_deadline(None, lambda: client._call_provider(cfg, "answer", ARGS))
+    assert timeouts(label) == before + 2
+
+
+def test_deadline_timeouts_do_not_trip_the_breaker(monkeypatch):
+    monkeypatch.setenv("SYNO_LLM_TIMEOUT", "30")
+    cfg = LLMConfig(provider="compat", compat_name="slow-breaker", model="m")
+    client = LLMClient(providers=[cfg])
+    monkeypatch.setattr(client, "_call_provider", lambda c, task, args: client._bounded(c, task, asyncio.sleep(2)))
+    h = providers.health(provider_label(cfg))
+    with pytest.raises(LLMTimeout):
+        run_with_deadline(0.05, lambda: client._run("answer", *ARGS))
+    assert h.failures == 0 and h.state == "closed"
+
+
+def test_commit_within_restores_busy_timeout_on_the_pooled_connection():
+    db = SessionLocal()
+    raw = db.connection().connection.dbapi_connection
+    before = db.execute(text("PRAGMA busy_timeout")).scalar()
+    deadline.commit_within(db, deadline.Deadline(20))
+    db.close()
+
+    db = SessionLocal()
+    try:
+        assert db.connection().connection.dbapi_connection is raw
+        assert db.execute(text("PRAGMA busy_timeout")).scalar() == before
+    finally:
+        db.close()